@@ -4,6 +4,9 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 from extensions import db, bcrypt, jwt, migrate, cache
 from jobs.celery_factory import celery_init_app
+from services.auth_tokens import install_token_checks, require_token_cache
+from services.engine_profiles import apply_engine_profile, install_sqlite_pragmas
+from services.query_budget import install_query_counter
 # from flask_caching import Cache
 
 # Load environment variables from .env file
@@ -12,38 +15,73 @@ load_dotenv()
 def create_app(config=None):
     """Application factory function to create and configure the Flask app"""
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=["ETag"])  # The frontend reads ETags to make conditional requests
 
     # Configuration
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DB_PROFILE"] = os.getenv("DB_PROFILE", "dev")  # dev, sqlite-prod or server-db
+    if os.getenv("REPLICA_DATABASE_URI"):
+        app.config["SQLALCHEMY_BINDS"] = {"replica": os.getenv("REPLICA_DATABASE_URI")}
+    app.config["READ_YOUR_WRITES_SECONDS"] = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+    app.config["TIMEZONE"] = os.getenv("TIMEZONE", "UTC")  # Quiz dates and the beat schedule
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "your_secret_key")
     app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "your_jwt_secret_key")
+    app.config["QUERY_BUDGET_STRICT"] = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+    app.config["CAPTURE_RESPONSES"] = os.getenv("CAPTURE_RESPONSES", "true").lower() == "true"
+    
+    # Password hashing (see services/password_hashing.py)
+    app.config["BCRYPT_LOG_ROUNDS"] = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    app.config["PASSWORD_HASH_QUEUE_LIMIT"] = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 16))
+    app.config["PASSWORD_HASH_TIMEOUT"] = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+    
+    # Write-behind submissions (requires Redis)
+    app.config["ASYNC_SUBMISSIONS"] = os.getenv("ASYNC_SUBMISSIONS", "false").lower() == "true"
+    app.config["SUBMISSION_QUEUE_URL"] = os.getenv("SUBMISSION_QUEUE_URL", os.getenv("CELERY_BROKER_URL"))
+    app.config["SUBMISSION_BATCH_SIZE"] = int(os.getenv("SUBMISSION_BATCH_SIZE", 100))
+    
+    # Rate limiting (see services/rate_limit.py)
+    app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    app.config["RATE_LIMIT_URL"] = os.getenv("RATE_LIMIT_URL", os.getenv("CELERY_BROKER_URL"))
+    app.config["RATE_LIMITS"] = os.getenv("RATE_LIMITS", "")
+    
+    # Write-behind last_login timestamps (requires Redis)
+    app.config["COALESCE_LOGINS"] = os.getenv("COALESCE_LOGINS", "false").lower() == "true"
+    app.config["LOGIN_BUFFER_URL"] = os.getenv("LOGIN_BUFFER_URL", os.getenv("CELERY_BROKER_URL"))
     
     # Cache configuration
-    app.config["CACHE_TYPE"] = os.getenv("CACHE_TYPE")
+    app.config["CACHE_TYPE"] = os.getenv("CACHE_TYPE", "NullCache")  # Required, see require_token_cache
     app.config["CACHE_DEFAULT_TIMEOUT"] = int(os.getenv("CACHE_DEFAULT_TIMEOUT", 30))
     app.config["CACHE_REDIS_HOST"] = os.getenv("CACHE_REDIS_HOST")
     app.config["CACHE_REDIS_PORT"] = int(os.getenv("CACHE_REDIS_PORT", 6379))
+    # Near-cache tier, used with CACHE_TYPE=services.near_cache.NearRedisCache
+    app.config["NEAR_CACHE_MAX_ENTRIES"] = int(os.getenv("NEAR_CACHE_MAX_ENTRIES", 1024))
+    app.config["NEAR_CACHE_TTL"] = float(os.getenv("NEAR_CACHE_TTL", 5))
     
     # Celery configuration
     app.config["CELERY"] = {
         "broker_url": os.getenv("CELERY_BROKER_URL"),
         "result_backend": os.getenv("CELERY_RESULT_BACKEND"),
-        "timezone": os.getenv("TIMEZONE", "UTC"),
+        "timezone": app.config["TIMEZONE"],
     }
     
     # Apply custom configuration if provided
     if config:
         app.config.update(config)
 
+    # Tune the database engine for the selected profile
+    apply_engine_profile(app)
+
     # Initialize extensions with the app
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    install_token_checks(jwt)
     migrate.init_app(app, db)
     cache.init_app(app)
     app.cache = cache
+    require_token_cache(app)
 
     # Register Blueprints
     from routes.admin import admin_bp
@@ -54,8 +92,24 @@ def create_app(config=None):
     app.register_blueprint(admin_bp)
     app.register_blueprint(user_bp)
 
+    # CLI commands
+    from db_routing import sync_replica_command
+    from services.auth_tokens import revoke_tokens_command
+    from services.query_budget import check_query_counts_command
+    from services.query_plans import check_query_plans_command
+    from services.quiz_stats import rebuild_quiz_stats_command
+    from services.user_month_stats import rebuild_user_month_stats_command
+    app.cli.add_command(check_query_counts_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(rebuild_quiz_stats_command)
+    app.cli.add_command(rebuild_user_month_stats_command)
+    app.cli.add_command(revoke_tokens_command)
+    app.cli.add_command(sync_replica_command)
+
     # Create admin if not exists
     with app.app_context():
+        install_sqlite_pragmas(app)
+        install_query_counter(app)
         try:
             db.create_all()
             from models import create_admin
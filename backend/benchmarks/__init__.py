@@ -0,0 +1,10 @@
+"""
+Seeded benchmarks for the performance work in services/.
+
+Each module builds an app on a throwaway SQLite file, seeds it with
+benchmarks.seed and prints its measurements. Run them from backend/, e.g.
+
+    python -m benchmarks.query_plans --users 2000
+
+The tests in tests/ seed their datasets with the same module.
+"""
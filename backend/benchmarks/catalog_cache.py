@@ -0,0 +1,147 @@
+"""
+Catalog endpoint latency with RedisCache versus NearRedisCache.
+
+Seeds a catalog, then --threads threads send --requests reads spread over
+the user and admin catalog endpoints, with an admin subject edit every
+--write-every requests so cached entries keep being invalidated. Each
+request reads several cache keys (token version, tag generations, the
+cached response), so the table shows per-endpoint p50/p99 and the share
+of lookups the local tier answered.
+
+Threads share one interpreter lock, so with more --threads than CPUs the
+tail measures lock hand-offs between CPU-bound threads rather than the
+cache; the default is one thread.
+
+With no --redis-url the cache talks to an in-process fakeredis, which has
+no network in between; --rtt-ms adds a simulated round trip to every
+command and pipeline so the Redis hops cost what they would over a LAN.
+
+    python -m benchmarks.catalog_cache --requests 5000 --rtt-ms 0.5
+    python -m benchmarks.catalog_cache --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import auth_headers, bench_app, print_table, remove_bench_db, run_concurrently, summarize
+from benchmarks.seed import seed_dataset
+
+ENDPOINTS = [
+    ("user", "/user/subjects"),
+    ("user", "/user/quizzes/{subject}"),
+    ("user", "/user/catalog"),
+    ("admin", "/admin/subjects"),
+    ("admin", "/admin/subjects/{subject}/chapters"),
+    ("admin", "/admin/catalog"),
+]
+
+
+def _slow_redis(rtt):
+    """A fakeredis client that sleeps `rtt` seconds per command and per pipeline."""
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit('Pass --redis-url or install fakeredis[lua] to run this benchmark')
+
+    class SlowRedis(fakeredis.FakeRedis):
+        def execute_command(self, *args, **options):
+            time.sleep(rtt)
+            return super().execute_command(*args, **options)
+
+        def pipeline(self, transaction=True, shard_hint=None):
+            pipe = super().pipeline(transaction, shard_hint)
+            execute = pipe.execute
+
+            def slow_execute(*args, **kwargs):
+                time.sleep(rtt)
+                return execute(*args, **kwargs)
+            pipe.execute = slow_execute
+            return pipe
+
+    return SlowRedis()
+
+
+def run(cache_type, args):
+    from extensions import cache
+    from models import User
+
+    redis_config = {"CACHE_REDIS_URL": args.redis_url} if args.redis_url else {
+        "CACHE_REDIS_HOST": _slow_redis(args.rtt_ms / 1000)}
+    app = bench_app(CACHE_TYPE=cache_type, **redis_config)
+    try:
+        with app.app_context():
+            cache.clear()
+            seeded = seed_dataset(users=1, subjects=args.subjects, chapters=4, quizzes=3, questions=1, attempts=0)
+            headers = {"user": auth_headers(seeded.user_ids[0]),
+                       "admin": auth_headers(User.query.filter_by(role="admin").first().id)}
+
+        rng = random.Random(1)
+        jobs = []
+        for n in range(args.requests):
+            role, path = rng.choice(ENDPOINTS)
+            subject_id = rng.choice(seeded.subject_ids)
+            if args.write_every and n % args.write_every == args.write_every - 1:
+                jobs.append(("PUT", "admin", f"/admin/subjects/{subject_id}", "edit"))
+            else:
+                jobs.append(("GET", role, path.format(subject=subject_id), path))
+
+        samples = {path: [] for _, path in ENDPOINTS}
+
+        def call(job):
+            method, role, url, _ = job
+            body = {"description": f"Edited at {time.monotonic()}"} if method == "PUT" else None
+            response = app.test_client().open(url, method=method, headers=headers[role], json=body)
+            assert response.status_code == 200, (url, response.status_code)
+
+        for role, path in ENDPOINTS:  # Warm every entry once
+            for subject_id in seeded.subject_ids:
+                call(("GET", role, path.format(subject=subject_id), path))
+        with app.app_context():
+            before = cache.cache.stats() if hasattr(cache.cache, "stats") else None
+
+        durations, seconds = run_concurrently(call, jobs, args.threads)
+        for (method, _, _, path), duration in zip(jobs, durations):
+            if method == "GET":
+                samples[path].append(duration)
+
+        with app.app_context():
+            stats = cache.cache.stats() if before else None
+        local_ratio = None
+        if stats:
+            lookups = sum(stats[key] - before[key] for key in ("local_hits", "remote_hits", "misses"))
+            local_ratio = (stats["local_hits"] - before["local_hits"]) / lookups
+
+        rows = []
+        for _, path in ENDPOINTS:
+            latency = summarize(samples[path])
+            rows.append({"cache": cache_type.rsplit(".", 1)[-1], "endpoint": path, "p50 ms": latency["p50"],
+                         "p99 ms": latency["p99"]})
+        all_reads = summarize([sample for values in samples.values() for sample in values])
+        rows.append({"cache": cache_type.rsplit(".", 1)[-1], "endpoint": "all reads", "p50 ms": all_reads["p50"],
+                     "p99 ms": all_reads["p99"], "requests/s": len(jobs) / seconds, "local hit ratio": local_ratio})
+        return rows
+    finally:
+        remove_bench_db(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--subjects", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--write-every", type=int, default=200, help="requests between subject edits, 0 for none")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Redis round trip (fakeredis only)")
+    parser.add_argument("--redis-url", help="a real Redis to run against instead of fakeredis (it is flushed)")
+    args = parser.parse_args()
+
+    rows = []
+    for cache_type in ("RedisCache", "services.near_cache.NearRedisCache"):
+        rows += run(cache_type, args)
+    network = args.redis_url or f"fakeredis, {args.rtt_ms:g} ms simulated round trip"
+    print_table(f"{args.requests} catalog requests from {args.threads} threads ({network})", rows,
+                ["cache", "endpoint", "p50 ms", "p99 ms", "requests/s", "local hit ratio"])
+
+
+if __name__ == "__main__":
+    main()
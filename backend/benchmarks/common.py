@@ -0,0 +1,121 @@
+"""Shared benchmark plumbing: an isolated app, auth headers and latency summaries."""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Like tests/conftest.py: keep the import of app.py off the .env database and Redis.
+# Anything already set in the environment wins, so a run can point at real services.
+for name, value in {
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "CACHE_TYPE": "SimpleCache",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "PASSWORD_HASH_WORKERS": "0",
+    "BCRYPT_LOG_ROUNDS": "4",
+    "RATE_LIMIT_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def bench_app(path=None, **config):
+    """Create an app on the SQLite file `path` (a new temporary file by default)."""
+    from app import create_app  # Import here so the environment above applies
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".db", prefix="bench_")
+        os.close(handle)
+        os.remove(path)
+    config.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{path}")
+    # SimpleCache stands in for Redis, so don't let its 500-entry default evict hot keys
+    config.setdefault("CACHE_THRESHOLD", 100000)
+    app = create_app(config)
+    app.bench_db_path = path
+    return app
+
+
+def remove_bench_db(app):
+    """Delete the app's benchmark database, with the WAL files the sqlite-prod profile leaves."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(app.bench_db_path + suffix):
+            os.remove(app.bench_db_path + suffix)
+
+
+def auth_headers(user_id):
+    """Authorization headers for `user_id`; needs an app context."""
+    from models import User
+    from services.auth_tokens import issue_token
+    return {"Authorization": f"Bearer {issue_token(User.query.get(user_id))}"}
+
+
+def timed(fn, repeat):
+    """Call fn() `repeat` times; returns the durations in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_concurrently(fn, jobs, threads):
+    """
+    Call fn(job) for every job from `threads` threads at once.
+    Returns (per-call durations in seconds, wall-clock seconds for the whole run).
+    """
+    def call(job):
+        started = time.perf_counter()
+        fn(job)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(pool.map(call, jobs))
+    return samples, time.perf_counter() - started
+
+
+def bench_redis(url=None):
+    """A Redis client for `url`, or an in-process fakeredis server when no URL is given."""
+    if url:
+        import redis
+        return redis.Redis.from_url(url)
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit('Pass --redis-url or install fakeredis[lua] to run this benchmark')
+    return fakeredis.FakeRedis()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    """p50/p95/p99/mean in milliseconds."""
+    return {
+        "p50": percentile(samples, 0.50) * 1000,
+        "p95": percentile(samples, 0.95) * 1000,
+        "p99": percentile(samples, 0.99) * 1000,
+        "mean": statistics.fmean(samples) * 1000,
+    }
+
+
+def print_table(title, rows, columns):
+    """Print rows of {column: value} as an aligned table."""
+    print(f"\n{title}")
+    widths = {column: max(len(column), *(len(_cell(row.get(column))) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(_cell(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return "" if value is None else str(value)
@@ -0,0 +1,122 @@
+"""
+Mixed reads and submissions from several processes, per DB_PROFILE.
+
+Each profile gets a fresh database seeded with attempt history. Then
+--processes worker processes (like web and Celery workers sharing one
+SQLite file) run for --seconds, each picking a submission (start + submit,
+two write transactions) with probability --write-ratio and otherwise an
+uncached read (attempt review or an admin attempt list). Failed requests -
+typically "database is locked" under the dev profile - are counted.
+
+server-db is only run against a real server database (--server-url), since
+its pool options do not apply to SQLite.
+
+    python -m benchmarks.engine_profiles --processes 4 --seconds 10
+    python -m benchmarks.engine_profiles --server-url postgresql://localhost/quiz_bench
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+
+from benchmarks.common import auth_headers, bench_app, percentile, print_table, remove_bench_db
+
+
+def _worker(uri, profile, user_ids, attempt_ids, quiz_ids, answer_key, seconds, write_ratio, seed, results):
+    from benchmarks.common import bench_app  # Spawned processes start from a clean interpreter
+    app = bench_app(SQLALCHEMY_DATABASE_URI=uri, DB_PROFILE=profile)
+    rng = random.Random(seed)
+    client = app.test_client()
+    with app.app_context():
+        admin = auth_headers(_admin_id())
+        users = [(user_id, auth_headers(user_id)) for user_id in user_ids]
+
+    reads, writes, errors = [], [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id, headers = rng.choice(users)
+        started = time.perf_counter()
+        if rng.random() < write_ratio:
+            quiz_id = rng.choice(quiz_ids)
+            response = client.post(f"/user/quiz/{quiz_id}/start", headers=headers)
+            if response.status_code == 200:
+                answers = {str(question_id): rng.randint(1, 4) for question_id, _ in answer_key[quiz_id]}
+                response = client.post("/user/quiz/submit", headers=headers,
+                                       json={"attempt_id": response.get_json()["attempt_id"], "answers": answers})
+            samples = writes
+        elif rng.random() < 0.5:
+            response = client.get(f"/user/attempts/{rng.choice(attempt_ids[user_id])}/review", headers=headers)
+            samples = reads
+        else:
+            response = client.get(f"/admin/users/{user_id}/attempts?limit=20", headers=admin)
+            samples = reads
+        if response.status_code == 200:
+            samples.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    results.put((reads, writes, errors))
+
+
+def _admin_id():
+    from models import User
+    return User.query.filter_by(role="admin").first().id
+
+
+def run(profile, args, uri=None):
+    from models import QuizAttempt
+    app = bench_app(DB_PROFILE=profile, **({"SQLALCHEMY_DATABASE_URI": uri} if uri else {}))
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    try:
+        with app.app_context():
+            from benchmarks.seed import seed_dataset
+            seeded = seed_dataset(users=args.processes * 20, subjects=2, chapters=2, quizzes=2, questions=10,
+                                  attempts=5)
+            attempt_ids = {}
+            for attempt in QuizAttempt.query.with_entities(QuizAttempt.id, QuizAttempt.user_id):
+                attempt_ids.setdefault(attempt.user_id, []).append(attempt.id)
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        share = len(seeded.user_ids) // args.processes
+        processes = [context.Process(target=_worker, args=(
+            uri, profile, seeded.user_ids[n * share:(n + 1) * share], attempt_ids, seeded.quiz_ids,
+            seeded.answer_key, args.seconds, args.write_ratio, n, results
+        )) for n in range(args.processes)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        remove_bench_db(app)
+
+    reads = [sample for outcome in outcomes for sample in outcome[0]]
+    writes = [sample for outcome in outcomes for sample in outcome[1]]
+    return {
+        "profile": profile,
+        "reads/s": len(reads) / args.seconds,
+        "submits/s": len(writes) / args.seconds,
+        "read p99 ms": percentile(reads, 0.99) * 1000 if reads else None,
+        "submit p99 ms": percentile(writes, 0.99) * 1000 if writes else None,
+        "errors": sum(outcome[2] for outcome in outcomes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="share of operations that submit")
+    parser.add_argument("--server-url", help="database URI to run the server-db profile against")
+    args = parser.parse_args()
+
+    rows = [run(profile, args) for profile in ("dev", "sqlite-prod")]
+    if args.server_url:
+        rows.append(run("server-db", args, uri=args.server_url))
+    print_table(f"{args.processes} processes, {args.write_ratio:.0%} submissions, {args.seconds:g}s per profile",
+                rows, ["profile", "reads/s", "submits/s", "read p99 ms", "submit p99 ms", "errors"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Login flood: login throughput and the latency everyone else sees.
+
+Starts the app as a threaded HTTP server in a subprocess, once per
+PASSWORD_HASH_WORKERS setting, and floods /login from --threads clients
+(honoring Retry-After on 503) while a probe keeps requesting a cheap
+authenticated endpoint. With inline hashing (0 workers) every login holds
+a request thread while it hashes, so the probe queues behind them; with a
+pool, hashing runs in separate processes and logins beyond the queue
+limit are shed with 503 and Retry-After.
+
+    python -m benchmarks.login_flood --workers 0 2 --threads 16
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import BACKEND, auth_headers, bench_app, print_table, summarize
+from benchmarks.seed import PASSWORD, seed_dataset
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """The app served by Werkzeug's threaded server in a child process."""
+
+    def __init__(self, db_path, **env):
+        self.base = f"http://127.0.0.1:{_free_port()}"
+        port = self.base.rsplit(":", 1)[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-c",
+             f"from app import app; app.run(port={port}, threaded=True, use_reloader=False)"],
+            cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**os.environ, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+                 **{name: str(value) for name, value in env.items()}},
+        )
+        for _ in range(150):
+            try:
+                self.request("/")
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("The server did not start")
+
+    def request(self, path, body=None, headers=None):
+        """Return (status, Retry-After seconds or None)."""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base + path, data=data,
+                                         headers={"Content-Type": "application/json", **(headers or {})})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Retry-After")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def _probe(server, headers, count, interval=0.02):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        status, _ = server.request("/user/subjects", headers=headers)
+        assert status == 200, status
+        samples.append(time.perf_counter() - started)
+        time.sleep(interval)
+    return samples
+
+
+def run(workers, args):
+    app = bench_app(BCRYPT_LOG_ROUNDS=args.rounds, PASSWORD_HASH_WORKERS=0)
+    with app.app_context():
+        seeded = seed_dataset(users=args.threads, subjects=2, chapters=1, quizzes=1, questions=1, attempts=0)
+        emails = [f"seed{user_id}@example.com" for user_id in seeded.user_ids]
+        headers = auth_headers(seeded.user_ids[0])
+
+    server = Server(app.bench_db_path, PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE_LIMIT=args.queue_limit,
+                    BCRYPT_LOG_ROUNDS=args.rounds, RATE_LIMIT_ENABLED="false")
+    try:
+        idle = summarize(_probe(server, headers, args.probes))
+
+        stop = threading.Event()
+        codes = {}
+        lock = threading.Lock()
+
+        def flood(email):
+            while not stop.is_set():
+                status, retry_after = server.request("/login", {"email": email, "password": PASSWORD})
+                with lock:
+                    codes[status] = codes.get(status, 0) + 1
+                if retry_after:
+                    time.sleep(float(retry_after))
+
+        threads = [threading.Thread(target=flood, args=(email,)) for email in emails]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        busy = summarize(_probe(server, headers, args.probes * 3))
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+        os.remove(app.bench_db_path)
+
+    return {
+        "hash workers": workers,
+        "logins/s": codes.get(200, 0) / elapsed,
+        "503s": codes.get(503, 0),
+        "idle p99 ms": idle["p99"],
+        "flood p50 ms": busy["p50"],
+        "flood p99 ms": busy["p99"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2], help="PASSWORD_HASH_WORKERS values")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent login clients")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_LOG_ROUNDS")
+    parser.add_argument("--queue-limit", type=int, default=4, help="PASSWORD_HASH_QUEUE_LIMIT")
+    parser.add_argument("--probes", type=int, default=50, help="idle probe requests (3x as many during the flood)")
+    args = parser.parse_args()
+
+    rows = [run(workers, args) for workers in args.workers]
+    print_table(f"Login flood from {args.threads} clients; probe is GET /user/subjects", rows,
+                ["hash workers", "logins/s", "503s", "idle p99 ms", "flood p50 ms", "flood p99 ms"])
+
+
+if __name__ == "__main__":
+    main()
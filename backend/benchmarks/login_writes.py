@@ -0,0 +1,147 @@
+"""
+Login write amplification, with and without COALESCE_LOGINS.
+
+--logins logins by --users users are interleaved with --submissions quiz
+submissions and sent from --threads threads. Without coalescing every
+login commits its own UPDATE of user.last_login. With it, logins go to a
+Redis hash that a flusher thread (standing in for the Celery beat task)
+writes back every --flush-interval seconds in one bulk UPDATE. The table
+counts the UPDATE statements and rows written to the user table and the
+write transactions of the whole run, next to login and submit latency.
+
+    python -m benchmarks.login_writes --logins 2000 --users 200
+    python -m benchmarks.login_writes --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import random
+import threading
+
+from sqlalchemy import event
+
+from benchmarks.common import bench_app, bench_redis, print_table, remove_bench_db, run_concurrently, summarize
+from benchmarks.seed import PASSWORD, seed_dataset
+from benchmarks.submit_burst import _prepare
+
+
+class WriteCounter:
+    """Count write statements, user-table rows and committed write transactions on an engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.user_updates = self.user_rows = self.transactions = 0
+        self.lock = threading.Lock()
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("INSERT", "UPDATE", "DELETE")):
+            conn.info["wrote"] = True
+            if statement.startswith("UPDATE user "):
+                with self.lock:
+                    self.user_updates += 1
+                    self.user_rows += cursor.rowcount
+
+    def commit(self, conn):
+        if conn.info.pop("wrote", False):
+            with self.lock:
+                self.transactions += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "after_cursor_execute", self.after_execute)
+        event.listen(self.engine, "commit", self.commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "after_cursor_execute", self.after_execute)
+        event.remove(self.engine, "commit", self.commit)
+
+
+def _flusher(app, interval, stop):
+    from services.login_times import flush_logins
+
+    def flush():
+        with app.app_context():
+            while not stop.wait(interval):
+                flush_logins()
+            flush_logins()  # Whatever arrived since the last tick
+
+    return threading.Thread(target=flush, daemon=True)
+
+
+def run(coalesce, args):
+    from extensions import db
+
+    app = bench_app(DB_PROFILE="sqlite-prod", COALESCE_LOGINS=coalesce)
+    try:
+        with app.app_context():
+            if coalesce:
+                client = bench_redis(args.redis_url)
+                client.flushdb()
+                app.extensions["login_times"] = client
+            submissions = _prepare(app, args.submissions, 10)
+            seeded = seed_dataset(users=args.users, subjects=1, chapters=1, quizzes=1, questions=1, attempts=0,
+                                  seed=2)
+            engine = db.engine
+
+        rng = random.Random(1)
+        logins = [("login", {"email": f"seed{rng.choice(seeded.user_ids)}@example.com", "password": PASSWORD})
+                  for _ in range(args.logins)]
+        jobs = logins + [("submit", job) for job in submissions]
+        rng.shuffle(jobs)
+
+        samples = {"login": [], "submit": []}
+
+        def call(job):
+            kind, payload = job
+            client = app.test_client()
+            if kind == "login":
+                response = client.post("/login", json=payload)
+            else:
+                headers, body = payload
+                response = client.post("/user/quiz/submit", json=body, headers=headers)
+            assert response.status_code == 200, response.get_json()
+
+        stop = threading.Event()
+        flusher = _flusher(app, args.flush_interval, stop)
+        with WriteCounter(engine) as writes:
+            if coalesce:
+                flusher.start()
+            durations, seconds = run_concurrently(call, jobs, args.threads)
+            if coalesce:
+                stop.set()
+                flusher.join()
+
+        for (kind, _), duration in zip(jobs, durations):
+            samples[kind].append(duration)
+        logins_latency, submits_latency = summarize(samples["login"]), summarize(samples["submit"])
+        return {
+            "mode": "coalesced" if coalesce else "commit per login",
+            "requests/s": len(jobs) / seconds,
+            "login p50 ms": logins_latency["p50"],
+            "submit p99 ms": submits_latency["p99"],
+            "user UPDATEs": writes.user_updates,
+            "user rows written": writes.user_rows,
+            "write transactions": writes.transactions,
+        }
+    finally:
+        remove_bench_db(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200, help="distinct users logging in")
+    parser.add_argument("--submissions", type=int, default=200, help="quiz submissions interleaved with the logins")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="seconds between flushes")
+    parser.add_argument("--redis-url", help="Redis for the login buffer (default: in-process fakeredis)")
+    args = parser.parse_args()
+
+    rows = [run(coalesce, args) for coalesce in (False, True)]
+    print_table(f"{args.logins} logins by {args.users} users and {args.submissions} submissions "
+                f"from {args.threads} threads", rows,
+                ["mode", "requests/s", "login p50 ms", "submit p99 ms", "user UPDATEs", "user rows written",
+                 "write transactions"])
+
+
+if __name__ == "__main__":
+    main()
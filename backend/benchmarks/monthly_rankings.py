@@ -0,0 +1,110 @@
+"""
+Monthly report ranking at scale: the rollup query versus a query per user.
+
+Seeds --users users (100k by default) with attempts over the last two
+months, then times monthly_rankings() (one RANK() OVER query on
+user_month_stats) and the whole send_monthly_activity_report task with
+e-mail sending stubbed out. The per-user loop the report used to run is
+timed on --baseline-sample users and extrapolated to the full user count,
+since running it for every user would take minutes.
+
+    python -m benchmarks.monthly_rankings --users 100000
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from benchmarks.common import bench_app, print_table, summarize, timed
+from benchmarks.seed import seed_dataset
+
+
+def _per_user_ranking(user_ids, month_start, month_end):
+    """The old approach: one attempts query per user, ranked in Python."""
+    from extensions import db
+    from models import QuizAttempt, Score
+
+    rankings = []
+    for user_id in user_ids:
+        scores = [row.total_score for row in db.session.query(Score.total_score).join(
+            QuizAttempt, QuizAttempt.id == Score.quiz_attempt_id
+        ).filter(
+            QuizAttempt.user_id == user_id,
+            QuizAttempt.end_time != None,
+            QuizAttempt.end_time >= month_start,
+            QuizAttempt.end_time < month_end
+        )]
+        average = round(sum(scores) / len(scores), 1) if scores else 0
+        rankings.append((user_id, average))
+    rankings.sort(key=lambda entry: entry[1], reverse=True)
+    return rankings
+
+
+def _count_statements(fn):
+    from extensions import db
+    count = [0]
+
+    def capture(*args):
+        count[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return count[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--attempts", type=int, default=2, help="attempts per user")
+    parser.add_argument("--baseline-sample", type=int, default=2000, help="users timed with the per-user loop")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = bench_app()
+    try:
+        with app.app_context():
+            from jobs import tasks
+            from services.app_time import app_today
+            from services.user_month_stats import monthly_rankings
+
+            started = time.perf_counter()
+            seeded = seed_dataset(users=args.users, subjects=5, chapters=2, quizzes=2, questions=5,
+                                  attempts=args.attempts, answers=False, days=60)
+            print(f"Seeded {args.users} users and {len(seeded.attempt_ids)} attempts "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            today = app_today()
+            month = today.strftime("%Y-%m")
+            month_start = datetime(today.year, today.month, 1)
+            month_end = datetime(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+            tasks.send_html_email = lambda *args: True
+            tasks.send_monthly_activity_report.update_state = lambda **kwargs: None
+
+            rollup = summarize(timed(lambda: monthly_rankings(month), args.repeat))
+            task = summarize(timed(tasks.send_monthly_activity_report.run, 1))
+            sample = seeded.user_ids[:args.baseline_sample]
+            baseline = summarize(timed(lambda: _per_user_ranking(sample, month_start, month_end), 1))
+            scale = args.users / len(sample)
+
+            rows = [
+                {"case": "monthly_rankings (rollup)", "ms": rollup["p50"],
+                 "statements": _count_statements(lambda: monthly_rankings(month))},
+                {"case": "per-user loop (extrapolated)", "ms": baseline["p50"] * scale,
+                 "statements": args.users},  # One query per user
+                {"case": "send_monthly_activity_report", "ms": task["p50"],
+                 "statements": _count_statements(tasks.send_monthly_activity_report.run)},
+            ]
+        print_table(f"Ranking {args.users} users for {month}", rows, ["case", "ms", "statements"])
+    finally:
+        os.remove(app.bench_db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Deep pages: OFFSET versus keyset (cursor) pagination.
+
+Seeds --users users and one user with --attempts finished attempts, then
+fetches a page of --limit rows at increasing depths through both lists the
+admin pages serve: all users, and one user's attempts newest first (with
+quiz and score joined, like GET /admin/users/<id>/attempts). OFFSET has to
+walk past every skipped row, so its latency grows with depth; keyset_page
+seeks straight to the cursor.
+
+    python -m benchmarks.pagination --users 200000 --attempts 50000
+"""
+
+import argparse
+import os
+import time
+
+from sqlalchemy.orm import joinedload
+
+from benchmarks.common import bench_app, print_table, summarize, timed
+from benchmarks.seed import seed_dataset
+
+
+def _depths(total, limit):
+    depths, depth = [0], 1000
+    while depth + limit <= total:
+        depths.append(depth)
+        depth *= 10
+    if total - limit > depths[-1]:
+        depths.append(total - limit)  # The last page
+    return depths
+
+
+def _compare(name, query, id_column, ids, limit, repeat, descending=False):
+    """Time the page starting at each depth of `ids` (already in page order) both ways."""
+    from services.pagination import keyset_page
+    order = id_column.desc() if descending else id_column.asc()
+
+    rows = []
+    for depth in _depths(len(ids), limit):
+        after = ids[depth - 1] if depth else None
+        offset_ids = [row.id for row in query.order_by(order).offset(depth).limit(limit)]
+        keyset_ids = [row.id for row in keyset_page(query, id_column, after, limit, descending)[0]]
+        assert offset_ids == keyset_ids == ids[depth:depth + limit]
+
+        offset = summarize(timed(lambda: query.order_by(order).offset(depth).limit(limit).all(), repeat))
+        keyset = summarize(timed(lambda: keyset_page(query, id_column, after, limit, descending), repeat))
+        rows.append({"list": name, "depth": depth, "offset p50 ms": offset["p50"],
+                     "keyset p50 ms": keyset["p50"], "speedup": offset["p50"] / keyset["p50"]})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--attempts", type=int, default=50000, help="attempts of the one heavy user")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = bench_app()
+    try:
+        with app.app_context():
+            from models import QuizAttempt, User
+
+            started = time.perf_counter()
+            seed_dataset(users=args.users, subjects=1, chapters=1, quizzes=1, questions=1, attempts=0)
+            heavy = seed_dataset(users=1, subjects=1, chapters=1, quizzes=5, questions=1, attempts=args.attempts,
+                                 answers=False, days=365, seed=2)
+            print(f"Seeded {args.users + 1} users and {args.attempts} attempts "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            user_ids = [row.id for row in User.query.with_entities(User.id).order_by(User.id)]
+            attempt_ids = sorted(heavy.attempt_ids, reverse=True)
+            attempts = QuizAttempt.query.filter_by(user_id=heavy.user_ids[0]).options(
+                joinedload(QuizAttempt.quiz), joinedload(QuizAttempt.score)
+            )
+
+            rows = _compare("users", User.query, User.id, user_ids, args.limit, args.repeat)
+            rows += _compare("user attempts", attempts, QuizAttempt.id, attempt_ids, args.limit, args.repeat,
+                             descending=True)
+        print_table(f"Pages of {args.limit} rows", rows,
+                    ["list", "depth", "offset p50 ms", "keyset p50 ms", "speedup"])
+    finally:
+        os.remove(app.bench_db_path)
+
+
+if __name__ == "__main__":
+    main()
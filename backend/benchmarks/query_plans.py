@@ -0,0 +1,105 @@
+"""
+Before/after timings for the hot-query indexes (migration 8a4e6d0c2b51).
+
+Seeds a dataset, times the endpoints and tasks whose plans
+tests/test_query_plans.py checks, then drops the migration's indexes and
+times them again. Every request starts from an empty cache so the
+database does the work each time.
+
+    python -m benchmarks.query_plans --users 2000 --attempts 10
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+
+from benchmarks.common import auth_headers, bench_app, print_table, summarize, timed
+from benchmarks.seed import seed_dataset
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "migrations", "versions", "8a4e6d0c2b51_hot_query_indexes.py")
+
+
+def _migration_indexes():
+    spec = importlib.util.spec_from_file_location("hot_query_indexes", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.INDEXES
+
+
+def _cases(app, seeded):
+    from extensions import cache
+    from jobs import tasks
+    from services.user_month_stats import monthly_rankings
+    from services.app_time import app_today
+
+    client = app.test_client()
+    user_id, attempt_id, quiz_id = seeded.user_ids[0], seeded.attempt_ids[0], seeded.quiz_ids[0]
+    user = auth_headers(user_id)
+    admin = auth_headers(_admin_id())
+    tasks.export_user_quiz_attempts.update_state = lambda **kwargs: None
+
+    def get(url, headers):
+        def request():
+            cache.clear()
+            assert client.get(url, headers=headers).status_code == 200, url
+        return request
+
+    month = app_today().strftime('%Y-%m')
+    return [
+        ("GET /user/history", get("/user/history", user)),
+        ("GET /user/attempts/<id>/review", get(f"/user/attempts/{attempt_id}/review", user)),
+        ("GET /admin/users/<id>/attempts", get(f"/admin/users/{user_id}/attempts", admin)),
+        ("GET /admin/statistics", get("/admin/statistics", admin)),
+        ("GET /admin/quizzes/<id>/item-analysis", get(f"/admin/quizzes/{quiz_id}/item-analysis", admin)),
+        ("monthly_rankings", lambda: monthly_rankings(month)),
+        ("export_user_quiz_attempts", lambda: tasks.export_user_quiz_attempts.run(user_id)),
+    ]
+
+
+def _admin_id():
+    from models import User
+    return User.query.filter_by(role="admin").first().id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=10, help="attempts per user")
+    parser.add_argument("--questions", type=int, default=10, help="questions per quiz")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = bench_app()
+    exports = tempfile.mkdtemp(prefix="bench_exports_")
+    os.chdir(exports)  # The export task writes under the working directory
+    try:
+        with app.app_context():
+            from extensions import db
+            seeded = seed_dataset(users=args.users, subjects=5, chapters=4, quizzes=5,
+                                  questions=args.questions, attempts=args.attempts)
+            print(f"Seeded {len(seeded.user_ids)} users, {len(seeded.attempt_ids)} attempts, "
+                  f"{len(seeded.attempt_ids) * args.questions} answers")
+            cases = _cases(app, seeded)
+
+            indexed = {name: summarize(timed(fn, args.repeat)) for name, fn in cases}
+            for name, _, _ in _migration_indexes():
+                db.session.execute(db.text(f"DROP INDEX IF EXISTS {name}"))
+            db.session.commit()
+            unindexed = {name: summarize(timed(fn, args.repeat)) for name, fn in cases}
+
+        print_table("p50 latency in ms, without and with the hot-query indexes", [{
+            "case": name,
+            "before": unindexed[name]["p50"],
+            "after": indexed[name]["p50"],
+            "speedup": unindexed[name]["p50"] / max(indexed[name]["p50"], 1e-6),
+        } for name, _ in cases], ["case", "before", "after", "speedup"])
+    finally:
+        os.remove(app.bench_db_path)
+        shutil.rmtree(exports)
+
+
+if __name__ == "__main__":
+    main()
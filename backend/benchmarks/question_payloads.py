@@ -0,0 +1,100 @@
+"""
+Quiz question payloads: pre-encoded bytes versus a memoized list.
+
+The memoized variant is how questions used to be served: the list of
+question dicts is cached (and unpickled on every hit), then re-encoded
+with jsonify alongside the attempt fields. The bytes variant serves the
+cached JSON bytes from get_questions_payload as they are. Both are timed
+on cache hits, for several quiz sizes, and the table also shows what a
+resumed quiz sends over the wire: the whole payload, a 304, or only the
+poll's metadata.
+
+    python -m benchmarks.question_payloads --questions 10 50 200
+"""
+
+import argparse
+import os
+
+from flask import jsonify
+
+from benchmarks.common import auth_headers, bench_app, print_table, summarize, timed
+from benchmarks.seed import seed_dataset
+
+
+def _memoized_questions(cache):
+    from models import Question
+
+    @cache.memoize(timeout=900)
+    def get_quiz_questions_data(quiz_id):
+        return [{
+            "id": q.id,
+            "question": q.question_text,
+            "options": [q.option1, q.option2, q.option3, q.option4]
+        } for q in Question.query.filter_by(quiz_id=quiz_id).all()]
+    return get_quiz_questions_data
+
+
+def run(app, count, repeat):
+    from extensions import cache
+    from services.question_payloads import get_questions_payload
+
+    seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=count, attempts=0)
+    quiz_id = seeded.quiz_ids[0]
+    memoized = _memoized_questions(cache)
+    fields = {"attempt_id": 1, "remaining_seconds": 1234.5}
+
+    def memoize_and_encode():
+        return jsonify({**fields, "questions": memoized(quiz_id)}).get_data()
+
+    def cached_bytes():
+        payload, _ = get_questions_payload(quiz_id)
+        return app.response_class(payload, mimetype="application/json").get_data()
+
+    with app.test_request_context():
+        full_bytes = len(memoize_and_encode())  # Also warms both caches
+        cached_bytes()
+        memoize_ms = summarize(timed(memoize_and_encode, repeat))["p50"]
+        bytes_ms = summarize(timed(cached_bytes, repeat))["p50"]
+
+    client = app.test_client()
+    headers = auth_headers(seeded.user_ids[0])
+    client.post(f"/user/quiz/{quiz_id}/start", headers=headers)
+    poll = client.get(f"/user/quiz/{quiz_id}", headers=headers)
+    full = client.get(f"/user/quiz/{quiz_id}/questions", headers=headers)
+    revalidated = client.get(f"/user/quiz/{quiz_id}/questions",
+                             headers={**headers, "If-None-Match": full.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    return {
+        "questions": count,
+        "memoize+jsonify us": memoize_ms * 1000,
+        "cached bytes us": bytes_ms * 1000,
+        "speedup": memoize_ms / max(bytes_ms, 1e-9),
+        "full bytes": full_bytes,
+        "poll bytes": len(poll.data),
+        "304 bytes": len(revalidated.data),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.questions:
+        app = bench_app()
+        try:
+            with app.app_context():
+                rows.append(run(app, count, args.repeat))
+        finally:
+            os.remove(app.bench_db_path)
+
+    print_table("Serving a quiz's questions from the cache (p50 per call)", rows,
+                ["questions", "memoize+jsonify us", "cached bytes us", "speedup", "full bytes", "poll bytes",
+                 "304 bytes"])
+
+
+if __name__ == "__main__":
+    main()
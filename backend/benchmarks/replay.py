@@ -0,0 +1,108 @@
+"""
+Replay a recorded navigation session, with and without ETag revalidation.
+
+A session (see benchmarks/sessions/) is a list of requests made as the
+seeded user or the admin; `{subjects[0]}`, `{chapters[5]}` and `{quizzes[1]}`
+in paths pick seeded ids. The session is replayed --passes times, like a
+user returning to the dashboard, by two clients: one that never sends
+validators, and one that keeps each response's ETag and sends it back with
+If-None-Match, like a browser cache. The table reports body bytes, 304s,
+latency and SQL statements for each client.
+
+    python -m benchmarks.replay --passes 5
+    python -m benchmarks.replay --session benchmarks/sessions/dashboard.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import BACKEND, auth_headers, bench_app, print_table, summarize
+from benchmarks.seed import seed_dataset
+
+DEFAULT_SESSION = os.path.join(BACKEND, "benchmarks", "sessions", "dashboard.json")
+
+
+def run(revalidate, steps, args):
+    from extensions import db
+    from models import User
+
+    app = bench_app()
+    try:
+        with app.app_context():
+            client = app.test_client()
+            seeded = seed_dataset(users=1, subjects=args.subjects, chapters=5, quizzes=3, questions=10, attempts=2)
+            ids = {"subjects": seeded.subject_ids, "chapters": seeded.chapter_ids, "quizzes": seeded.quiz_ids}
+            headers = {
+                "user": auth_headers(seeded.user_ids[0]),
+                "admin": auth_headers(User.query.filter_by(role="admin").first().id),
+            }
+
+            statements = [0]
+
+            def capture(*args):
+                statements[0] += 1
+
+            etags, samples, body_bytes, not_modified = {}, [], 0, 0
+            event.listen(db.engine, "before_cursor_execute", capture)
+            try:
+                for _ in range(args.passes):
+                    for step in steps:
+                        path = step["path"].format(**ids)
+                        request_headers = dict(headers[step["as"]])
+                        cached = etags.get((step["as"], path))
+                        if revalidate and cached:
+                            request_headers["If-None-Match"] = cached
+                        db.session.remove()
+
+                        started = time.perf_counter()
+                        response = client.open(path, method=step.get("method", "GET"), json=step.get("json"),
+                                               headers=request_headers)
+                        samples.append(time.perf_counter() - started)
+
+                        assert response.status_code in (200, 304), (path, response.status_code)
+                        assert response.status_code == 200 or cached, path
+                        body_bytes += len(response.data)
+                        not_modified += response.status_code == 304
+                        if "ETag" in response.headers:
+                            etags[(step["as"], path)] = response.headers["ETag"]
+            finally:
+                event.remove(db.engine, "before_cursor_execute", capture)
+
+        latency = summarize(samples)
+        return {
+            "client": "If-None-Match" if revalidate else "no validators",
+            "requests": len(samples),
+            "304s": not_modified,
+            "body KB": body_bytes / 1024,
+            "p50 ms": latency["p50"],
+            "p99 ms": latency["p99"],
+            "total ms": sum(samples) * 1000,
+            "statements": statements[0],
+        }
+    finally:
+        os.remove(app.bench_db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--session", default=DEFAULT_SESSION, help="session JSON file")
+    parser.add_argument("--passes", type=int, default=5, help="times the session is replayed")
+    parser.add_argument("--subjects", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.session) as f:
+        session = json.load(f)
+    rows = [run(revalidate, session["steps"], args) for revalidate in (False, True)]
+    print_table(f"{session['description']}: {len(session['steps'])} requests x {args.passes} passes", rows,
+                ["client", "requests", "304s", "body KB", "p50 ms", "p99 ms", "total ms", "statements"])
+    saved = 1 - rows[1]["body KB"] / rows[0]["body KB"]
+    print(f"\nRevalidation saved {saved:.0%} of the body bytes and "
+          f"{rows[0]['total ms'] - rows[1]['total ms']:.0f} ms of server time")
+
+
+if __name__ == "__main__":
+    main()
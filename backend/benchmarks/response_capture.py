@@ -0,0 +1,69 @@
+"""
+Submission throughput with and without CAPTURE_RESPONSES.
+
+Every user starts an attempt on one quiz, then all of them submit a full
+set of answers from --threads threads, graded inline. With capture on,
+each submit also inserts one attempt_answer row per question (one
+executemany in the same transaction as the score). The table reports
+throughput, latency, the rows written and how much the database file grew.
+
+    python -m benchmarks.response_capture --users 500 --threads 4 --questions 20 50
+"""
+
+import argparse
+import os
+
+from benchmarks.common import bench_app, print_table, remove_bench_db, run_concurrently, summarize
+from benchmarks.submit_burst import _prepare
+
+
+def run(capture, questions, args):
+    from extensions import db
+    from models import AttemptAnswer
+
+    app = bench_app(DB_PROFILE="sqlite-prod", CAPTURE_RESPONSES=capture)
+    try:
+        with app.app_context():
+            jobs = _prepare(app, args.users, questions)
+            db.session.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size_before = os.path.getsize(app.bench_db_path)
+
+        def submit(job):
+            headers, payload = job
+            response = app.test_client().post("/user/quiz/submit", json=payload, headers=headers)
+            assert response.status_code == 200, response.get_json()
+
+        samples, seconds = run_concurrently(submit, jobs, args.threads)
+
+        with app.app_context():
+            db.session.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            growth = os.path.getsize(app.bench_db_path) - size_before
+            rows = AttemptAnswer.query.count()
+        latency = summarize(samples)
+        return {
+            "capture": "on" if capture else "off",
+            "questions": questions,
+            "submits/s": len(jobs) / seconds,
+            "p50 ms": latency["p50"],
+            "p99 ms": latency["p99"],
+            "answer rows": rows,
+            "KB per submit": growth / len(jobs) / 1024,
+        }
+    finally:
+        remove_bench_db(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="submissions per run")
+    parser.add_argument("--questions", type=int, nargs="+", default=[20, 50], help="questions per quiz")
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    rows = [run(capture, questions, args) for questions in args.questions for capture in (False, True)]
+    print_table(f"{args.users} submissions from {args.threads} threads", rows,
+                ["capture", "questions", "submits/s", "p50 ms", "p99 ms", "answer rows", "KB per submit"])
+
+
+if __name__ == "__main__":
+    main()
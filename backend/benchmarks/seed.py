@@ -0,0 +1,116 @@
+"""
+Bulk-seeded datasets for benchmarks and tests.
+
+Rows go in with Core executemany inserts, so a dataset of a few hundred
+thousand attempts takes seconds rather than the minutes the ORM would
+need. The quiz_stats and monthly rollups are rebuilt from the scores, the
+same way `flask rebuild-quiz-stats` fills an existing database.
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from extensions import db
+from models import AttemptAnswer, Chapter, Question, Quiz, QuizAttempt, Score, Subject, User
+from services.password_hashing import hash_password
+from services.quiz_stats import rebuild_quiz_stats
+from services.user_month_stats import rebuild_user_month_stats
+
+PASSWORD = "secret"
+CHUNK = 5000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(model.__table__.insert(), rows[start:start + CHUNK])
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def seed_dataset(users=20, subjects=2, chapters=2, quizzes=2, questions=5, attempts=3, answers=True,
+                 days=45, seed=1):
+    """
+    Seed `users` users who each finish `attempts` attempts, spread over the
+    last `days` days. `chapters` is per subject, `quizzes` per chapter and
+    `questions` per quiz. Returns a namespace of the ids that were created;
+    `answer_key` maps each quiz to (question id, 0-based correct option) pairs.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    password = hash_password(PASSWORD)
+
+    user_start = _next_id(User)
+    user_ids = list(range(user_start, user_start + users))
+    _insert(User, [{
+        "id": user_id, "email": f"seed{user_id}@example.com", "password": password, "full_name": f"Seed User {user_id}",
+        "role": "user", "created_at": now - timedelta(days=days), "last_login": now - timedelta(days=rng.randint(0, days)),
+        "token_version": 0
+    } for user_id in user_ids])
+
+    subject_start = _next_id(Subject)
+    subject_ids = list(range(subject_start, subject_start + subjects))
+    _insert(Subject, [{"id": subject_id, "name": f"Subject {subject_id}"} for subject_id in subject_ids])
+
+    chapter_start = _next_id(Chapter)
+    chapter_rows = [{"subject_id": subject_id, "name": f"Chapter {n}"} for subject_id in subject_ids for n in range(chapters)]
+    for offset, row in enumerate(chapter_rows):
+        row["id"] = chapter_start + offset
+    _insert(Chapter, chapter_rows)
+
+    quiz_start = _next_id(Quiz)
+    quiz_rows = [{
+        "chapter_id": chapter["id"], "date_of_quiz": (now - timedelta(days=rng.randint(0, days))).date(),
+        "time_duration": 30, "remarks": f"Quiz on {chapter['name'].lower()}"
+    } for chapter in chapter_rows for _ in range(quizzes)]
+    for offset, row in enumerate(quiz_rows):
+        row["id"] = quiz_start + offset
+    _insert(Quiz, quiz_rows)
+    quiz_ids = [row["id"] for row in quiz_rows]
+
+    question_start = _next_id(Question)
+    question_rows = []
+    for quiz_id in quiz_ids:
+        for n in range(questions):
+            question_rows.append({
+                "id": question_start + len(question_rows), "quiz_id": quiz_id, "question_text": f"Question {n + 1}?",
+                "option1": "A", "option2": "B", "option3": "C", "option4": "D", "correct_option": rng.randint(0, 3)
+            })
+    _insert(Question, question_rows)
+    answer_key = {}
+    for row in question_rows:
+        answer_key.setdefault(row["quiz_id"], []).append((row["id"], row["correct_option"]))
+
+    attempt_start = _next_id(QuizAttempt)
+    attempt_rows, score_rows, answer_rows = [], [], []
+    for user_id in user_ids:
+        for _ in range(attempts):
+            quiz_id = rng.choice(quiz_ids)
+            start = now - timedelta(days=rng.uniform(0, days))
+            attempt_id = attempt_start + len(attempt_rows)
+            attempt_rows.append({"id": attempt_id, "quiz_id": quiz_id, "user_id": user_id, "start_time": start,
+                                 "end_time": start + timedelta(minutes=rng.randint(1, 30))})
+            correct = 0
+            for question_id, correct_option in answer_key[quiz_id]:
+                selected = rng.randint(1, 4)  # Selections are 1-based, correct_option 0-based
+                correct += selected - 1 == correct_option
+                if answers:
+                    answer_rows.append({"quiz_attempt_id": attempt_id, "question_id": question_id,
+                                        "selected_option": selected, "is_correct": selected - 1 == correct_option})
+            score_rows.append({"quiz_attempt_id": attempt_id, "user_id": user_id,
+                               "total_score": round(correct * 100 / max(1, questions)),
+                               "timestamp": attempt_rows[-1]["end_time"]})
+    _insert(QuizAttempt, attempt_rows)
+    _insert(Score, score_rows)
+    _insert(AttemptAnswer, answer_rows)
+    db.session.commit()
+
+    rebuild_quiz_stats()
+    rebuild_user_month_stats()
+
+    return SimpleNamespace(
+        user_ids=user_ids, subject_ids=subject_ids, chapter_ids=[row["id"] for row in chapter_rows],
+        quiz_ids=quiz_ids, attempt_ids=[row["id"] for row in attempt_rows], answer_key=answer_key
+    )
@@ -0,0 +1,120 @@
+"""
+Submission throughput under a burst, graded inline versus write-behind.
+
+Every user starts an attempt, then all of them submit at once from
+--threads threads, like a class finishing a timed quiz together. Inline
+grading commits each submission in its request; with ASYNC_SUBMISSIONS the
+request only queues the answers and a drainer thread (standing in for the
+Celery worker) grades them in batches. The table reports how fast
+submissions were accepted, their latency, and how long it took until every
+one of them was graded.
+
+    python -m benchmarks.submit_burst --users 500 --threads 16
+    python -m benchmarks.submit_burst --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import (auth_headers, bench_app, bench_redis, print_table, remove_bench_db, run_concurrently,
+                               summarize)
+from benchmarks.seed import seed_dataset
+
+
+def _prepare(app, users, questions):
+    """Seed a quiz, start an attempt for every user; returns [(headers, payload)]."""
+    client = app.test_client()
+    seeded = seed_dataset(users=users, subjects=1, chapters=1, quizzes=1, questions=questions, attempts=0)
+    quiz_id = seeded.quiz_ids[0]
+    answers = {str(question_id): option + 1 for question_id, option in seeded.answer_key[quiz_id]}
+
+    jobs = []
+    for user_id in seeded.user_ids:
+        headers = auth_headers(user_id)
+        attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+        jobs.append((headers, {"attempt_id": attempt_id, "answers": answers}))
+    return jobs
+
+
+def _drain_until(app, expected, stop):
+    """Drain the queue in a loop, like the Celery worker; returns a thread and its graded counter."""
+    from services.submission_queue import drain_submissions
+    graded = [0]
+
+    def drain():
+        with app.app_context():
+            while graded[0] < expected and not stop.is_set():
+                count = drain_submissions()
+                graded[0] += count
+                if not count:
+                    time.sleep(0.005)
+
+    thread = threading.Thread(target=drain, daemon=True)
+    return thread, graded
+
+
+def run(mode, args):
+    from jobs import tasks
+    app = bench_app(DB_PROFILE="sqlite-prod", ASYNC_SUBMISSIONS=(mode == "write-behind"),
+                    SUBMISSION_BATCH_SIZE=args.batch_size)
+    try:
+        with app.app_context():
+            if mode == "write-behind":
+                client = bench_redis(args.redis_url)
+                client.flushdb()
+                app.extensions["submission_queue"] = client
+            tasks.drain_submission_queue.delay = lambda: None  # The drainer thread below does the work
+            jobs = _prepare(app, args.users, args.questions)
+
+        expected_status = 202 if mode == "write-behind" else 200
+
+        def submit(job):
+            headers, payload = job
+            response = app.test_client().post("/user/quiz/submit", json=payload, headers=headers)
+            assert response.status_code == expected_status, response.get_json()
+
+        stop = threading.Event()
+        drainer, graded = _drain_until(app, len(jobs), stop)
+        started = time.perf_counter()
+        if mode == "write-behind":
+            drainer.start()
+        samples, burst_seconds = run_concurrently(submit, jobs, args.threads)
+        if mode == "write-behind":
+            drainer.join(timeout=300)
+            stop.set()
+        else:
+            graded[0] = len(jobs)
+        all_graded = time.perf_counter() - started
+
+        latency = summarize(samples)
+        return {
+            "mode": mode,
+            "submissions": len(jobs),
+            "accepted/s": len(jobs) / burst_seconds,
+            "p50 ms": latency["p50"],
+            "p99 ms": latency["p99"],
+            "graded": graded[0],
+            "graded/s": graded[0] / all_graded,
+            "all graded s": all_graded,
+        }
+    finally:
+        remove_bench_db(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="submissions in the burst")
+    parser.add_argument("--questions", type=int, default=20, help="questions per quiz")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=100, help="SUBMISSION_BATCH_SIZE")
+    parser.add_argument("--redis-url", help="Redis for the queue (default: in-process fakeredis)")
+    args = parser.parse_args()
+
+    rows = [run(mode, args) for mode in ("inline", "write-behind")]
+    print_table(f"Burst of {args.users} submissions from {args.threads} threads", rows,
+                ["mode", "submissions", "accepted/s", "p50 ms", "p99 ms", "graded", "graded/s", "all graded s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Submit latency against the number of questions in the quiz.
+
+For each --questions size a quiz is seeded and --repeat users each start
+an attempt and submit a full set of answers, one after another. The
+statements column is the average per submit. Submissions
+are graded from the cached answer key, so the statements a submit issues
+and its latency should not grow with the quiz. The per-question loop
+submit used to run (a COUNT, then one Question lookup per answer) is timed
+on the same answers for comparison.
+
+Responses are not captured by default, so the table shows grading alone;
+pass --capture-responses to include the per-question insert.
+
+    python -m benchmarks.submit_grading --questions 10 100 1000
+"""
+
+import argparse
+import os
+
+from sqlalchemy import event
+
+from benchmarks.common import auth_headers, bench_app, print_table, summarize, timed
+from benchmarks.seed import seed_dataset
+
+
+def _per_question_grading(quiz_id, answers):
+    """The old approach: one query per submitted answer."""
+    from extensions import db
+    from models import Question
+
+    db.session.expunge_all()  # Each request starts with an empty identity map
+    correct_answers = 0
+    total_questions = Question.query.filter_by(quiz_id=quiz_id).count()
+    for qid, selected_option in answers.items():
+        question = Question.query.get(int(qid))
+        if question and int(selected_option - 1) == question.correct_option:
+            correct_answers += 1
+    return int(correct_answers / max(total_questions, 1) * 100)
+
+
+def run(questions, args):
+    from extensions import db
+
+    app = bench_app(CAPTURE_RESPONSES=args.capture_responses)
+    try:
+        with app.app_context():
+            client = app.test_client()
+            seeded = seed_dataset(users=args.repeat, subjects=1, chapters=1, quizzes=1, questions=questions,
+                                  attempts=0)
+            quiz_id = seeded.quiz_ids[0]
+            answers = {str(question_id): option + 1 for question_id, option in seeded.answer_key[quiz_id]}
+
+            jobs = []
+            for user_id in seeded.user_ids:
+                headers = auth_headers(user_id)
+                attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+                jobs.append((headers, {"attempt_id": attempt_id, "answers": answers}))
+
+            statements = []
+
+            def capture(*args):
+                statements.append(1)
+
+            def submit():
+                headers, payload = jobs.pop()
+                db.session.remove()
+                response = client.post("/user/quiz/submit", json=payload, headers=headers)
+                assert response.get_json()["score"] == 100, response.get_json()
+
+            submit()  # Warm the answer key, as any earlier submission would
+            count = len(jobs)
+            event.listen(db.engine, "before_cursor_execute", capture)
+            try:
+                submits = summarize(timed(submit, count))
+            finally:
+                event.remove(db.engine, "before_cursor_execute", capture)
+            baseline = summarize(timed(lambda: _per_question_grading(quiz_id, answers), args.baseline_repeat))
+        return {"questions": questions, "submit p50 ms": submits["p50"], "submit p99 ms": submits["p99"],
+                "statements": len(statements) / count, "per-question grading p50 ms": baseline["p50"]}
+    finally:
+        os.remove(app.bench_db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200, help="submissions per quiz size")
+    parser.add_argument("--baseline-repeat", type=int, default=20)
+    parser.add_argument("--capture-responses", action="store_true")
+    args = parser.parse_args()
+
+    rows = [run(questions, args) for questions in args.questions]
+    print_table(f"Submitting every answer, {args.repeat} submissions per quiz size"
+                f"{' with responses captured' if args.capture_responses else ''}", rows,
+                ["questions", "submit p50 ms", "submit p99 ms", "statements", "per-question grading p50 ms"])
+
+
+if __name__ == "__main__":
+    main()
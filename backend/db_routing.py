@@ -0,0 +1,145 @@
+"""
+Read/write routing for the SQLAlchemy session.
+
+When a "replica" bind is configured, queries issued inside a
+`read_replica()` block (or a view decorated with `replica_reads`) are sent
+to the replica; flushes, INSERT/UPDATE/DELETE statements and sessions with
+pending changes always use the primary.
+
+After a request commits a write, the authenticated user's reads stay on
+the primary for READ_YOUR_WRITES_SECONDS so they never see replication
+lag on their own changes.
+
+Views whose results are cached read from the primary instead: a
+lagging replica read would otherwise be cached under the generation the
+write just created, and served until the entry expires.
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+
+def _recent_write_key(identity):
+    return f'recent_write_{identity}'
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+        event.listen(self, 'after_flush', self._mark_write)
+        event.listen(self, 'do_orm_execute', self._mark_bulk_write)
+        event.listen(self, 'after_commit', self._record_write)
+
+    def _use_replica(self, clause):
+        if not g.get('use_read_replica'):
+            return False
+        if REPLICA_BIND not in (self.app.config.get('SQLALCHEMY_BINDS') or {}):
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        return not isinstance(clause, UpdateBase)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._use_replica(clause):
+            return self.db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+    def _mark_write(self, session, flush_context):
+        session.info['wrote'] = True
+
+    def _mark_bulk_write(self, orm_execute_state):
+        if isinstance(orm_execute_state.statement, UpdateBase):
+            orm_execute_state.session.info['wrote'] = True
+
+    def _record_write(self, session):
+        if not session.info.pop('wrote', False):
+            return
+        identity = _current_identity()
+        window = self.app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+        if identity is not None and window and hasattr(self.app, 'cache'):
+            self.app.cache.set(_recent_write_key(identity), True, timeout=window)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+@contextmanager
+def read_replica():
+    """Send read-only queries issued inside the block to the replica bind."""
+    previous = g.get('use_read_replica', False)
+    g.use_read_replica = True
+    try:
+        yield
+    finally:
+        g.use_read_replica = previous
+
+
+def replica_reads(fn):
+    """Serve a read-only view from the replica unless the caller wrote recently."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        identity = _current_identity()
+        if identity is not None and current_app.cache.get(_recent_write_key(identity)):
+            return fn(*args, **kwargs)
+        with read_replica():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _sqlite_path(uri):
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or not url.database:
+        raise click.ClickException(f'sync-replica only supports file-based SQLite databases, got {uri}')
+    return url.database
+
+
+def sync_replica(primary_uri, replica_uri):
+    """Copy the primary SQLite database onto the replica with the online backup API."""
+    source = sqlite3.connect(_sqlite_path(primary_uri))
+    target = sqlite3.connect(_sqlite_path(replica_uri))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+@click.command('sync-replica')
+@click.option('--interval', type=float, default=None, help='Keep syncing every N seconds.')
+@with_appcontext
+def sync_replica_command(interval):
+    """Stand-in for replication when developing with two SQLite files."""
+    replica_uri = (current_app.config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA_BIND)
+    if not replica_uri:
+        raise click.ClickException('REPLICA_DATABASE_URI is not configured')
+
+    primary_uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+    while True:
+        sync_replica(primary_uri, replica_uri)
+        click.echo('Replica synced')
+        if not interval:
+            break
+        time.sleep(interval)
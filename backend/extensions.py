@@ -6,11 +6,12 @@ All extensions are defined here to avoid circular imports.
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 from flask_jwt_extended import JWTManager
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
+from db_routing import RoutingSQLAlchemy
+
 # Initialize extensions
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()  # Routes read-only blocks to the replica bind when configured
 bcrypt = Bcrypt()
 jwt = JWTManager()
 migrate = Migrate()
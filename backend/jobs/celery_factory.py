@@ -16,7 +16,7 @@ def celery_init_app(app: Flask) -> Celery:
     celery_app.conf.update(
         broker_url=os.getenv("CELERY_BROKER_URL"),
         result_backend=os.getenv("CELERY_RESULT_BACKEND"),
-        timezone=os.getenv("TIMEZONE", "UTC"),
+        timezone=app.config["TIMEZONE"],
         task_serializer="json",
         accept_content=["json"],
         # Configure the schedule for tasks
@@ -31,6 +31,31 @@ def celery_init_app(app: Flask) -> Celery:
                 'task': 'jobs.tasks.send_monthly_activity_report',
                 'schedule': crontab(day_of_month='30', hour='18', minute='11'),  # Run at 9:00 AM on the 1st day of each month
                 'options': {'expires': 3600}  # Expires after 1 hour (3600 seconds)
+            },
+            'warm-todays-quizzes': {
+                'task': 'jobs.tasks.warm_todays_quizzes',
+                'schedule': crontab(hour='0', minute='5'),  # Run shortly after midnight each day
+                'options': {'expires': 3600}
+            },
+            'drain-submission-queue': {
+                'task': 'jobs.tasks.drain_submission_queue',
+                'schedule': 5.0,  # Safety net for queued submissions every 5 seconds
+                'options': {'expires': 5}
+            },
+            'flush-login-times': {
+                'task': 'jobs.tasks.flush_login_times',
+                'schedule': 30.0,  # Write buffered last_login times every 30 seconds
+                'options': {'expires': 30}
+            },
+            'sweep-expired-attempts': {
+                'task': 'jobs.tasks.sweep_expired_attempts',
+                'schedule': crontab(minute='*/5'),  # Close expired attempts every 5 minutes
+                'options': {'expires': 300}
+            },
+            'refresh-item-analysis': {
+                'task': 'jobs.tasks.update_quiz_item_analysis',
+                'schedule': crontab(minute='*/15'),  # Fold in new responses every 15 minutes
+                'options': {'expires': 900}
             }
         }
     )
@@ -12,10 +12,16 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta, date, timezone
 from sqlalchemy import func, and_, desc
 from flask import current_app, render_template
+from db_routing import replica_reads
 from jobs.mail_service import send_reminder_mail
+from services.app_time import app_today
+from services.cache_tags import invalidate, user_tag
+from services.login_times import pending_logins
+from services.user_month_stats import monthly_rankings
 
 # Database imports
-from models import User, Quiz, QuizAttempt, Score, Chapter, Subject
+from models import (User, Quiz, QuizAttempt, QuizStats, Score, Chapter, Subject, UserMonthStats,
+                    UserMonthSubjectStats)
 import calendar
 
 @shared_task(ignore_result=True)
@@ -37,6 +43,9 @@ def send_conditional_daily_email():
     hr = now.hour()
     min = now.minute()
     users = User.query.filter(User.last_login < yesterday).all()
+    # Skip users whose newer login is still waiting to be flushed
+    recent = pending_logins([user.id for user in users])
+    users = [user for user in users if user.id not in recent or recent[user.id] < yesterday.replace(tzinfo=None)]
     # new_quizzes = Quiz.query.filter(Quiz.date_of_quiz > yesterday).all()
     # total_quiz = Quiz.query.all().count()
 
@@ -61,6 +70,7 @@ def send_conditional_daily_email():
 
 
 @shared_task(bind=True)
+@replica_reads
 def export_user_quiz_statistics(self):
     """
     Celery task to export user quiz statistics as CSV.
@@ -156,6 +166,7 @@ def export_user_quiz_statistics(self):
         }
 
 @shared_task(bind=True)
+@replica_reads
 def export_quiz_statistics(self):
     """
     Export detailed statistics for all quizzes in the system.
@@ -176,21 +187,17 @@ def export_quiz_statistics(self):
     self.update_state(state='PROGRESS', meta={'status': 'Processing quiz data...'})
     
     try:
-        # Query to fetch quiz statistics
+        # Query to fetch quiz statistics from the rollup (one row per quiz)
         quiz_stats = db.session.query(
             Quiz.id.label('quiz_id'),
             Quiz.date_of_quiz.label('date'),
             Quiz.time_duration.label('duration'),
-            func.count(QuizAttempt.id).label('total_attempts'),
-            func.avg(Score.total_score).label('avg_score'),
-            func.min(Score.total_score).label('min_score'),
-            func.max(Score.total_score).label('max_score')
+            func.coalesce(QuizStats.attempt_count, 0).label('total_attempts'),
+            (QuizStats.score_sum * 1.0 / func.nullif(QuizStats.attempt_count, 0)).label('avg_score'),
+            QuizStats.min_score.label('min_score'),
+            QuizStats.max_score.label('max_score')
         ).outerjoin(
-            QuizAttempt, Quiz.id == QuizAttempt.quiz_id
-        ).outerjoin(
-            Score, QuizAttempt.id == Score.quiz_attempt_id
-        ).group_by(
-            Quiz.id
+            QuizStats, Quiz.id == QuizStats.quiz_id
         ).all()
         
         # Write to CSV
@@ -231,6 +238,7 @@ def export_quiz_statistics(self):
         }
 
 @shared_task(bind=True)
+@replica_reads
 def export_user_quiz_attempts(self, user_id):
     """
     Export all quizzes completed by a specific user.
@@ -321,6 +329,8 @@ def export_user_quiz_attempts(self, user_id):
                     'Quiz Notes': attempt.quiz_remarks or 'N/A'
                 })
         
+        invalidate(user_tag(user_id))  # The user's export list changed
+        
         # Task completed successfully
         result = {
             'status': 'SUCCESS',
@@ -341,6 +351,121 @@ def export_user_quiz_attempts(self, user_id):
             'error': error_message
         }
 
+@shared_task(bind=True)
+def update_quiz_item_analysis(self, quiz_id=None):
+    """
+    Fold new per-question responses into the item-analysis statistics.
+    Updates a single quiz, or every quiz with recorded responses if no ID is given.
+    """
+    from extensions import db  # Import here to avoid circular import
+    from models import AttemptAnswer
+    from services.item_analysis import update_item_analysis
+
+    try:
+        if quiz_id is None:
+            quiz_ids = [row.quiz_id for row in db.session.query(QuizAttempt.quiz_id).join(
+                AttemptAnswer, AttemptAnswer.quiz_attempt_id == QuizAttempt.id
+            ).distinct().all()]
+        else:
+            quiz_ids = [quiz_id]
+
+        attempts = {}
+        for qid in quiz_ids:
+            attempts[qid] = int(update_item_analysis(qid)["n"])
+
+        return {
+            'status': 'SUCCESS',
+            'quizzes_updated': len(quiz_ids),
+            'attempts': attempts
+        }
+
+    except Exception as e:
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
+@shared_task(bind=True)
+def drain_submission_queue(self):
+    """
+    Grade queued quiz submissions in batches, committing each batch in a single transaction.
+    Runs after each queued submission and periodically as a safety net.
+    """
+    from services.submission_queue import drain_submissions
+
+    try:
+        return {
+            'status': 'SUCCESS',
+            'graded': drain_submissions()
+        }
+
+    except Exception as e:
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
+@shared_task(bind=True)
+def flush_login_times(self):
+    """
+    Write buffered last_login timestamps to the user table in one bulk UPDATE.
+    Runs periodically when COALESCE_LOGINS is enabled.
+    """
+    from services.login_times import flush_logins
+
+    if not current_app.config.get("COALESCE_LOGINS"):
+        return {'status': 'SKIPPED'}
+    try:
+        return {
+            'status': 'SUCCESS',
+            'flushed': flush_logins()
+        }
+    except Exception as e:
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
+@shared_task(bind=True)
+def warm_todays_quizzes(self):
+    """
+    Pre-warm question payloads, answer keys and catalog caches for quizzes dated today
+    (in TIMEZONE, the timezone the beat schedule runs in),
+    so the first users of each quiz don't pay the cold-cache cost.
+    """
+    from services.cache_warmup import warm_quizzes_for_day
+
+    try:
+        return {
+            'status': 'SUCCESS',
+            **warm_quizzes_for_day(app_today())
+        }
+
+    except Exception as e:
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
+@shared_task(bind=True)
+def sweep_expired_attempts(self):
+    """
+    Close every quiz attempt past its deadline in one UPDATE and record zero scores in bulk.
+    """
+    from services.attempt_sweeper import sweep_expired_attempts as sweep
+
+    try:
+        return {
+            'status': 'SUCCESS',
+            'closed': sweep()
+        }
+
+    except Exception as e:
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
 @shared_task(ignore_result = True)
 def email_reminder(to, subject, content):
     """
@@ -356,6 +481,7 @@ def email_reminder(to, subject, content):
     send_html_email(to, subject, html_content, content)
 
 @shared_task(bind=True)
+@replica_reads
 def send_monthly_activity_report(self):
     """
     Celery task to generate and send monthly activity reports to all users.
@@ -375,61 +501,20 @@ def send_monthly_activity_report(self):
         report_month = calendar.month_name[last_day_of_previous_month.month]
         report_year = last_day_of_previous_month.year
         
+        month = last_day_of_previous_month.strftime('%Y-%m')
+        month_start = datetime.combine(first_day_of_previous_month, datetime.min.time())
+        month_end = datetime.combine(first_day_of_current_month, datetime.min.time())
+        
         # Get all users with role 'user'
         users = User.query.filter_by(role='user').all()
         
-        # Calculate average scores and rankings for all users for the previous month
-        user_rankings = []
-        for user in users:
-            # Find all completed quiz attempts for this user in the previous month
-            month_attempts = db.session.query(QuizAttempt).join(Score).filter(
-                QuizAttempt.user_id == user.id,
-                QuizAttempt.end_time != None,
-                QuizAttempt.end_time >= first_day_of_previous_month,
-                QuizAttempt.end_time <= last_day_of_previous_month
-            ).all()
-            
-            # Calculate average score if there are attempts
-            total_score = 0
-            highest_score = 0
-            
-            if month_attempts:
-                for attempt in month_attempts:
-                    if attempt.score and attempt.score.total_score > highest_score:
-                        highest_score = attempt.score.total_score
-                    if attempt.score:
-                        total_score += attempt.score.total_score
-                
-                avg_score = round(total_score / len(month_attempts), 1)
-            else:
-                avg_score = 0
-            
-            user_rankings.append({
-                'user_id': user.id,
-                'average_score': avg_score,
-                'attempts': len(month_attempts)
-            })
-        
-        # Sort users by average score to determine rankings
-        user_rankings.sort(key=lambda x: x['average_score'], reverse=True)
-        
-        # Assign rankings
-        rank = 1
-        prev_score = None
-        for i, user_rank in enumerate(user_rankings):
-            if prev_score is not None and user_rank['average_score'] < prev_score:
-                rank = i + 1
-            user_rank['rank'] = rank
-            prev_score = user_rank['average_score']
-        
-        # Create a lookup for quick rank retrieval
-        ranking_lookup = {ur['user_id']: ur for ur in user_rankings}
+        # Rank users by average score for the month with a single RANK() OVER query on the rollup
+        ranking_lookup = monthly_rankings(month)
         
         # Get the total number of active users who attempted a quiz in the past month
-        total_active_users = db.session.query(func.count(func.distinct(QuizAttempt.user_id))).filter(
-            QuizAttempt.end_time != None,
-            QuizAttempt.end_time >= first_day_of_previous_month,
-            QuizAttempt.end_time <= last_day_of_previous_month
+        total_active_users = db.session.query(func.count(UserMonthStats.user_id)).filter(
+            UserMonthStats.month == month,
+            UserMonthStats.attempts > 0
         ).scalar()
         
         # Find new quizzes created in the last month
@@ -451,6 +536,55 @@ def send_monthly_activity_report(self):
                 'chapter': chapter.name
             })
         
+        # Get every user's quiz attempts from the past month in one query
+        month_attempts = db.session.query(
+            QuizAttempt.user_id,
+            QuizAttempt.end_time,
+            Chapter.name.label('chapter_name'),
+            Subject.name.label('subject_name'),
+            Score.total_score
+        ).join(
+            Quiz, QuizAttempt.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        ).join(
+            Score, QuizAttempt.id == Score.quiz_attempt_id
+        ).filter(
+            QuizAttempt.end_time != None,
+            QuizAttempt.end_time >= month_start,
+            QuizAttempt.end_time < month_end
+        ).order_by(
+            QuizAttempt.end_time.desc()
+        ).all()
+        
+        attempts_by_user = {}
+        for attempt in month_attempts:
+            attempts_by_user.setdefault(attempt.user_id, []).append({
+                'date': attempt.end_time.strftime('%Y-%m-%d %H:%M'),
+                'subject': attempt.subject_name,
+                'chapter': attempt.chapter_name,
+                'score': attempt.total_score
+            })
+        
+        # Identify subjects that need improvement (below 70% average) from the per-subject rollup
+        improvement_by_user = {}
+        subject_stats = db.session.query(
+            UserMonthSubjectStats.user_id,
+            Subject.name,
+            UserMonthSubjectStats.attempts,
+            UserMonthSubjectStats.score_sum
+        ).join(
+            Subject, Subject.id == UserMonthSubjectStats.subject_id
+        ).filter(
+            UserMonthSubjectStats.month == month,
+            UserMonthSubjectStats.attempts > 0
+        ).all()
+        for stat in subject_stats:
+            if stat.score_sum / stat.attempts < 70:
+                improvement_by_user.setdefault(stat.user_id, []).append(stat.name)
+        
         reports_sent = 0
         
         # Generate and send report for each user
@@ -459,53 +593,13 @@ def send_monthly_activity_report(self):
             if user.id not in ranking_lookup and not formatted_new_quizzes:
                 continue
             
-            # Get user's quiz attempts from the past month
-            user_attempts = db.session.query(
-                QuizAttempt, Quiz, Chapter, Subject, Score
-            ).join(
-                Quiz, QuizAttempt.quiz_id == Quiz.id
-            ).join(
-                Chapter, Quiz.chapter_id == Chapter.id
-            ).join(
-                Subject, Chapter.subject_id == Subject.id
-            ).join(
-                Score, QuizAttempt.id == Score.quiz_attempt_id
-            ).filter(
-                QuizAttempt.user_id == user.id,
-                QuizAttempt.end_time != None,
-                QuizAttempt.end_time >= first_day_of_previous_month,
-                QuizAttempt.end_time <= last_day_of_previous_month
-            ).order_by(
-                QuizAttempt.end_time.desc()
-            ).all()
-            
-            # Format the attempts for the template
-            formatted_attempts = []
-            subject_scores = {}
-            
-            for attempt, quiz, chapter, subject, score in user_attempts:
-                formatted_attempts.append({
-                    'date': attempt.end_time.strftime('%Y-%m-%d %H:%M'),
-                    'subject': subject.name,
-                    'chapter': chapter.name,
-                    'score': score.total_score
-                })
-                
-                # Track scores by subject for improvement recommendations
-                if subject.name not in subject_scores:
-                    subject_scores[subject.name] = []
-                subject_scores[subject.name].append(score.total_score)
-            
-            # Identify subjects that need improvement (below 70% average)
-            improvement_areas = []
-            for subject, scores in subject_scores.items():
-                subject_avg = sum(scores) / len(scores)
-                if subject_avg < 70:
-                    improvement_areas.append(subject)
+            formatted_attempts = attempts_by_user.get(user.id, [])
+            improvement_areas = improvement_by_user.get(user.id, [])
             
             # Get user's ranking information
             user_ranking = ranking_lookup.get(user.id, {
                 'average_score': 0,
+                'highest_score': 0,
                 'attempts': 0,
                 'rank': 'N/A'
             })
@@ -517,7 +611,7 @@ def send_monthly_activity_report(self):
                 'report_year': report_year,
                 'total_attempts': user_ranking['attempts'],
                 'average_score': user_ranking['average_score'],
-                'highest_score': max([a['score'] for a in formatted_attempts]) if formatted_attempts else 0,
+                'highest_score': user_ranking['highest_score'],
                 'ranking': user_ranking['rank'] if user_ranking['attempts'] > 0 else None,
                 'total_users': total_active_users,
                 'quiz_attempts': formatted_attempts,
@@ -0,0 +1,29 @@
+"""partial index on open quiz attempts
+
+Revision ID: 3f1c2a7b9d10
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: db.create_all() already builds this index on fresh databases
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_quiz_attempt_open '
+        'ON quiz_attempt (user_id, quiz_id, start_time) '
+        'WHERE end_time IS NULL'
+    )
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_quiz_attempt_open')
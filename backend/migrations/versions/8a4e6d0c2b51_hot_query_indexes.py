@@ -0,0 +1,42 @@
+"""indexes for hot query paths
+
+Revision ID: 8a4e6d0c2b51
+Revises: 3f1c2a7b9d10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d0c2b51'
+down_revision = '3f1c2a7b9d10'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns) - names match what db.create_all() generates
+INDEXES = [
+    ('ix_user_created_at', 'user', ['created_at']),
+    ('ix_user_last_login', 'user', ['last_login']),
+    ('ix_chapter_subject_id', 'chapter', ['subject_id']),
+    ('ix_quiz_chapter_id', 'quiz', ['chapter_id']),
+    ('ix_quiz_date_of_quiz', 'quiz', ['date_of_quiz']),
+    ('ix_question_quiz_id', 'question', ['quiz_id']),
+    ('ix_quiz_attempt_quiz_id', 'quiz_attempt', ['quiz_id']),
+    ('ix_quiz_attempt_end_time', 'quiz_attempt', ['end_time']),
+    ('ix_quiz_attempt_user_end', 'quiz_attempt', ['user_id', 'end_time']),
+    ('ix_score_quiz_attempt_id', 'score', ['quiz_attempt_id']),
+    ('ix_score_user_id', 'score', ['user_id']),
+    ('ix_attempt_answer_quiz_attempt_id', 'attempt_answer', ['quiz_attempt_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({", ".join(columns)})')
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
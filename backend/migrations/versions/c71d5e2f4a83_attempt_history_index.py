@@ -0,0 +1,24 @@
+"""index for keyset-paginated attempt history
+
+Revision ID: c71d5e2f4a83
+Revises: 8a4e6d0c2b51
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71d5e2f4a83'
+down_revision = '8a4e6d0c2b51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_quiz_attempt_user_id ON quiz_attempt (user_id, id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_quiz_attempt_user_id')
@@ -1,5 +1,7 @@
 from datetime import datetime, timezone, time
-from extensions import db, bcrypt, migrate
+from extensions import db, migrate
+from services.app_time import app_today
+from services.password_hashing import hash_password, needs_rehash, verify_password
 from flask_migrate import Migrate
 
 ### 1️⃣ User Model (Admin & User) ###
@@ -14,19 +16,23 @@ class User(db.Model):
     qualification = db.Column(db.String(100))
     dob = db.Column(db.Date)
     role = db.Column(db.String(10), default="user")  # 'admin' or 'user'
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    last_login = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    last_login = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     user_preferences = db.Column(db.Time,default=time(18,0), nullable=True)
+    token_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # Raised to revoke issued tokens
     # Relationships
     quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy=True)
     scores = db.relationship('Score', back_populates='user', lazy=True)
     # UserPreference relationship is defined in the UserPreference model with backref
     
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = hash_password(password)
         
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password)
 
     def __repr__(self):
         return f"User('{self.email}', '{self.role}')"
@@ -48,7 +54,7 @@ class Subject(db.Model):
 class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     subject_id = db.Column(db.Integer, db.ForeignKey(
-        'subject.id'), nullable=False)
+        'subject.id'), nullable=False, index=True)
     name = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=True)
 
@@ -62,8 +68,8 @@ class Chapter(db.Model):
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     chapter_id = db.Column(db.Integer, db.ForeignKey(
-        'chapter.id'), nullable=False)
-    date_of_quiz = db.Column(db.Date, nullable=False, default=lambda: datetime.now(timezone.utc).date())
+        'chapter.id'), nullable=False, index=True)
+    date_of_quiz = db.Column(db.Date, nullable=False, default=app_today, index=True)  # Day in TIMEZONE
     time_duration = db.Column(
         db.Integer, nullable=False)  # Duration in minutes
     remarks = db.Column(db.Text, nullable=True)
@@ -78,7 +84,7 @@ class Quiz(db.Model):
 ### 5️⃣ Question Model ###
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     question_text = db.Column(db.Text, nullable=False)
     option1 = db.Column(db.String(255), nullable=False)
     option2 = db.Column(db.String(255), nullable=False)
@@ -93,13 +99,25 @@ class Question(db.Model):
 
 ### 6️⃣ Quiz Attempt Model ###
 class QuizAttempt(db.Model):
+    __table_args__ = (
+        # Open attempts only: active-attempt lookups and the expired-attempt sweeper
+        db.Index('ix_quiz_attempt_open', 'user_id', 'quiz_id', 'start_time',
+                 sqlite_where=db.text('end_time IS NULL'),
+                 postgresql_where=db.text('end_time IS NULL')),
+        # History, exports and monthly reports: a user's attempts by end time
+        db.Index('ix_quiz_attempt_user_end', 'user_id', 'end_time'),
+        # Keyset-paginated history: a user's attempts newest first
+        db.Index('ix_quiz_attempt_user_id', 'user_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    end_time = db.Column(db.DateTime, nullable=True)
+    end_time = db.Column(db.DateTime, nullable=True, index=True)
 
     score = db.relationship('Score', uselist=False, back_populates='quiz_attempt')
+    answers = db.relationship('AttemptAnswer', backref='quiz_attempt', lazy=True)
 
     def __repr__(self):
         return f"QuizAttempt(User ID: {self.user_id}, Quiz ID: {self.quiz_id})"
@@ -109,8 +127,8 @@ class QuizAttempt(db.Model):
 class Score(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     quiz_attempt_id = db.Column(db.Integer, db.ForeignKey(
-        'quiz_attempt.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+        'quiz_attempt.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     total_score = db.Column(db.Integer, nullable=False)
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
@@ -121,7 +139,60 @@ class Score(db.Model):
         return f"Score('{self.total_score}', Attempt ID: {self.quiz_attempt_id}')"
 
 
-# ### 8️⃣ UserPreference Model ###
+### 8️⃣ Attempt Answer Model ###
+class AttemptAnswer(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_attempt_id = db.Column(db.Integer, db.ForeignKey(
+        'quiz_attempt.id'), nullable=False, index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    selected_option = db.Column(db.Integer, nullable=True)  # As sent by the client (1-4)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f"AttemptAnswer(Attempt ID: {self.quiz_attempt_id}, Question ID: {self.question_id})"
+
+
+### 9️⃣ Quiz Statistics Rollup ###
+class QuizStats(db.Model):
+    """Per-quiz score aggregates, updated in the same transaction as every Score insert."""
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_sq_sum = db.Column(db.Integer, nullable=False, default=0)
+    min_score = db.Column(db.Integer, nullable=True)
+    max_score = db.Column(db.Integer, nullable=True)
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"QuizStats(Quiz ID: {self.quiz_id}, Attempts: {self.attempt_count})"
+
+
+### 🔟 Monthly User Activity Rollups ###
+class UserMonthStats(db.Model):
+    """Per-user score aggregates for a calendar month ('YYYY-MM'), updated with every Score insert."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    max_score = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f"UserMonthStats(User ID: {self.user_id}, Month: {self.month})"
+
+
+class UserMonthSubjectStats(db.Model):
+    """Per-user, per-subject score sums for a calendar month."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"UserMonthSubjectStats(User ID: {self.user_id}, Month: {self.month}, Subject ID: {self.subject_id})"
+
+
+# ### 1️⃣1️⃣ UserPreference Model ###
 # class UserPreference(db.Model):
 #     id = db.Column(db.Integer, primary_key=True)
 #     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -1,13 +1,24 @@
 from functools import wraps
 
-from flask import Blueprint, jsonify, request, send_file
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import joinedload
 import os
 from datetime import datetime
 
+from db_routing import replica_reads
 from extensions import cache, db
-from models import Chapter, Question, Quiz, Subject, User, QuizAttempt, Score
+from models import Chapter, Question, Quiz, QuizStats, Subject, User, QuizAttempt, Score
 from jobs.tasks import export_user_quiz_statistics, export_quiz_statistics
+from services.auth_tokens import has_role
+from services.cache_tags import chapter_tags, invalidate, quiz_tags, subject_tags, tagged, user_tag
+from services.catalog import get_catalog_snapshot
+from services.conditional import conditional
+from services.item_analysis import summarize_item_analysis, update_item_analysis
+from services.pagination import keyset_page, page_args
+from services.query_budget import query_budget
+from services.rate_limit import rate_limit
+from services.stampede import cached_view
 
 # Define Blueprint
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -17,11 +28,8 @@ def admin_required(fn):
     @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        
-        # Check if user has admin role in database
-        user = User.query.get(user_id)
-        if not user or user.role != "admin":
+        # Role comes from the token; revoked tokens are rejected by jwt_required
+        if not has_role("admin"):
             return jsonify({"error": "Admin access required"}), 403
             
         return fn(*args, **kwargs)
@@ -30,7 +38,7 @@ def admin_required(fn):
 ### 2️⃣ Admin Dashboard - Welcome Endpoint ###
 @admin_bp.route("/statistics", methods=["GET"])
 @admin_required
-@cache.cached(timeout=300, key_prefix='admin_statistics')  # Cache for 5 minutes
+@cached_view(timeout=300, key_prefix=tagged('admin_statistics', 'stats'))  # Cache for 5 minutes
 def get_dashboard_statistics():
     # Get counts of various entities
     total_users = User.query.filter_by(role="user").count()
@@ -48,19 +56,19 @@ def get_dashboard_statistics():
         "joined": user.created_at.strftime("%Y-%m-%d")
     } for user in recent_users]
 
-    # Get quiz statistics
+    # Get quiz statistics from the rollup
     quiz_stats = db.session.query(
         Quiz.id,
         Quiz.date_of_quiz,
-        db.func.count(QuizAttempt.id).label('total_attempts'),
-        db.func.avg(Score.total_score).label('avg_score')
-    ).select_from(Quiz).outerjoin(QuizAttempt).outerjoin(Score).group_by(Quiz.id).limit(5).all()
+        QuizStats.attempt_count,
+        QuizStats.score_sum
+    ).outerjoin(QuizStats, QuizStats.quiz_id == Quiz.id).order_by(Quiz.id).limit(5).all()
 
     quiz_stats_data = [{
         "quiz_id": stat.id,
         "date": stat.date_of_quiz.strftime("%Y-%m-%d") if stat.date_of_quiz else None,
-        "total_attempts": int(stat.total_attempts),
-        "avg_score": round(float(stat.avg_score if stat.avg_score else 0), 2)
+        "total_attempts": int(stat.attempt_count or 0),
+        "avg_score": round(stat.score_sum / stat.attempt_count, 2) if stat.attempt_count else 0
     } for stat in quiz_stats]
 
     # Get subject-wise chapter counts
@@ -109,6 +117,7 @@ def update_user(user_id):
 
     try:
         db.session.commit()
+        invalidate('stats', user_tag(user_id))
         return jsonify({
             "message": "User updated successfully",
             "user": {
@@ -125,10 +134,19 @@ def update_user(user_id):
 
 @admin_bp.route("/users", methods=["GET"])
 @admin_required
-@cache.cached(timeout=600, key_prefix='admin_all_users')
+@replica_reads
+@query_budget(1)
 def get_users():
-    users = User.query.all()
-    return jsonify([{"id": user.id, "email": user.email, "name": user.full_name, "role": user.role} for user in users]), 200
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    users, next_cursor = keyset_page(User.query, User.id, after, limit)
+    return jsonify({
+        "items": [{"id": user.id, "email": user.email, "name": user.full_name, "role": user.role} for user in users],
+        "next_cursor": next_cursor
+    }), 200
 
 
 @admin_bp.route("/dashboard", methods=["GET"])
@@ -137,6 +155,16 @@ def admin_dashboard():
     return jsonify({"message": "Welcome to the Admin Dashboard"}), 200
 
 
+# ➤ Cache Hit Ratios (this worker process)
+@admin_bp.route("/cache/stats", methods=["GET"])
+@admin_required
+def get_cache_stats():
+    backend = cache.cache
+    if not hasattr(backend, "stats"):
+        return jsonify({"backend": type(backend).__name__, "tiers": None}), 200
+    return jsonify({"backend": type(backend).__name__, "pid": os.getpid(), "tiers": backend.stats()}), 200
+
+
 ### 3️⃣ CRUD Operations ###
 
 # ➤ Create Subject
@@ -153,9 +181,7 @@ def create_subject():
     subject = Subject(name=name, description=description)
     db.session.add(subject)
     db.session.commit()
-    
-    # Clear subject caches
-    cache.delete('all_subjects')
+    invalidate(*subject_tags(subject.id))
     
     return jsonify({"message": "Subject created successfully", "subject_id": subject.id}), 201
 
@@ -163,12 +189,24 @@ def create_subject():
 # ➤ Get All Subjects
 @admin_bp.route("/subjects", methods=["GET"])
 @admin_required
-@cache.cached(timeout=300, key_prefix='admin_subjects')  # Cache for 5 minutes
+@conditional('subjects')
+@cached_view(timeout=3600, key_prefix=tagged('admin_subjects', 'subjects'))  # Cache for 1 hour
 def get_subjects():
     subjects = Subject.query.all()
     return jsonify([{"id": s.id, "name": s.name, "description": s.description} for s in subjects]), 200
 
 
+# ➤ Get the Whole Subject -> Chapter -> Quiz Tree
+@admin_bp.route("/catalog", methods=["GET"])
+@admin_required
+def get_catalog():
+    payload, etag = get_catalog_snapshot(admin=True)
+    response = current_app.response_class(payload, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
 # ➤ Update Subject
 @admin_bp.route("/subjects/<int:subject_id>", methods=["PUT"])
 @admin_required
@@ -183,15 +221,7 @@ def update_subject(subject_id):
     subject.description = data.get("description", subject.description)
 
     db.session.commit()
-    
-    # Clear subject caches
-    cache.delete('all_subjects')
-    cache.delete('admin_subjects')
-    
-    # Clear related quiz caches
-    chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-    for chapter in chapters:
-        cache.delete(f'subject_quizzes_{subject_id}')
+    invalidate(*subject_tags(subject_id))
     
     return jsonify({"message": "Subject updated successfully"}), 200
 
@@ -205,13 +235,10 @@ def delete_subject(subject_id):
     if not subject:
         return jsonify({"error": "Subject not found"}), 404
 
+    chapter_ids = [chapter.id for chapter in subject.chapters]
     db.session.delete(subject)
     db.session.commit()
-    
-    # Clear subject caches
-    cache.delete('all_subjects')
-    cache.delete('admin_subjects')
-    cache.delete(f'subject_quizzes_{subject_id}')
+    invalidate(*subject_tags(subject_id), *(f'chapter:{chapter_id}' for chapter_id in chapter_ids))
     
     return jsonify({"message": "Subject deleted successfully"}), 200
 
@@ -231,10 +258,7 @@ def create_chapter(subject_id):
                       description=description)
     db.session.add(chapter)
     db.session.commit()
-    
-    # Clear related caches
-    cache.delete(f'subject_chapters_{subject_id}')
-    cache.delete('admin_statistics')
+    invalidate(*chapter_tags(chapter))
     
     return jsonify({"message": "Chapter created successfully", "chapter_id": chapter.id}), 201
 
@@ -242,7 +266,8 @@ def create_chapter(subject_id):
 # ➤ Get Chapters of a Subject
 @admin_bp.route("/subjects/<int:subject_id>/chapters", methods=["GET"])
 @admin_required
-@cache.cached(timeout=1800, key_prefix=lambda: f'subject_chapters_{request.view_args["subject_id"]}')  # Cache for 30 minutes
+@conditional('subject:{subject_id}')
+@cached_view(timeout=3600, key_prefix=tagged('subject_chapters_{subject_id}', 'subject:{subject_id}'))  # Cache for 1 hour
 def get_chapters(subject_id):
     chapters = Chapter.query.filter_by(subject_id=subject_id).all()
     return jsonify([{"id": c.id, "name": c.name, "description": c.description} for c in chapters]), 200
@@ -260,21 +285,18 @@ def create_quiz(chapter_id):
                 time_duration=time_duration, remarks=remarks)
     db.session.add(quiz)
     db.session.commit()
-    
-    # Clear related caches
-    chapter = Chapter.query.get(chapter_id)
-    if chapter:
-        cache.delete(f'subject_quizzes_{chapter.subject_id}')
-    cache.delete(f'chapter_quizzes_{chapter_id}')
-    cache.delete('admin_statistics')
+    invalidate(*quiz_tags(quiz))
     
     return jsonify({"message": "Quiz created successfully", "quiz_id": quiz.id}), 201
 
 
 # ➤ Get Quizzes Under a Chapter
+chapter_quizzes_key = tagged('chapter_quizzes_{chapter_id}', 'chapter:{chapter_id}')
+
 @admin_bp.route("/chapters/<int:chapter_id>/quizzes", methods=["GET"])
 @admin_required
-@cache.cached(timeout=300, key_prefix=lambda: f'chapter_quizzes_{request.view_args["chapter_id"]}')  # Cache for 5 minutes
+@conditional('chapter:{chapter_id}')
+@cached_view(timeout=3600, key_prefix=chapter_quizzes_key)  # Cache for 1 hour
 def get_quizzes(chapter_id):
     quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
     return jsonify([{"id": q.id, "time_duration": q.time_duration, "remarks": q.remarks} for q in quizzes]), 200
@@ -312,9 +334,7 @@ def create_question(quiz_id):
     )
     db.session.add(question)
     db.session.commit()
-    
-    # Clear question cache
-    cache.delete(f'quiz_questions_{quiz_id}')
+    invalidate(f'quiz:{quiz_id}')
     
     return jsonify({"message": "Question created successfully", "question_id": question.id}), 201
 
@@ -322,7 +342,8 @@ def create_question(quiz_id):
 # ➤ Get Questions of a Quiz
 @admin_bp.route("/quizzes/<int:quiz_id>/questions", methods=["GET"])
 @admin_required
-@cache.cached(timeout=1800, key_prefix=lambda: f'admin_quiz_questions_{request.view_args["quiz_id"]}')  # Cache for 30 minutes
+@conditional('quiz:{quiz_id}')
+@cached_view(timeout=3600, key_prefix=tagged('admin_quiz_questions_{quiz_id}', 'quiz:{quiz_id}'))  # Cache for 1 hour
 def get_questions(quiz_id):
     questions = Question.query.filter_by(quiz_id=quiz_id).all()
     return jsonify([{
@@ -336,6 +357,19 @@ def get_questions(quiz_id):
     } for q in questions]), 200
 
 
+# ➤ Get Item Analysis of a Quiz
+@admin_bp.route("/quizzes/<int:quiz_id>/item-analysis", methods=["GET"])
+@admin_required
+def get_item_analysis(quiz_id):
+    quiz = Quiz.query.get(quiz_id)
+    if not quiz:
+        return jsonify({"error": "Quiz not found"}), 404
+
+    # Only responses recorded since the last update are read
+    state = update_item_analysis(quiz_id)
+    return jsonify({"quiz_id": quiz_id, **summarize_item_analysis(state)}), 200
+
+
 # ➤ Update Question
 @admin_bp.route("/questions/<int:question_id>", methods=["PUT"])
 @admin_required
@@ -361,10 +395,7 @@ def update_question(question_id):
         question.correct_option = data["correct_option"]
 
     db.session.commit()
-    
-    # Clear question caches
-    cache.delete(f'quiz_questions_{question.quiz_id}')
-    cache.delete(f'admin_quiz_questions_{question.quiz_id}')
+    invalidate(f'quiz:{question.quiz_id}')
     
     return jsonify({"message": "Question updated successfully"}), 200
 
@@ -381,10 +412,7 @@ def delete_question(question_id):
     quiz_id = question.quiz_id
     db.session.delete(question)
     db.session.commit()
-    
-    # Clear question caches
-    cache.delete(f'quiz_questions_{quiz_id}')
-    cache.delete(f'admin_quiz_questions_{quiz_id}')
+    invalidate(f'quiz:{quiz_id}')
     
     return jsonify({"message": "Question deleted successfully"}), 200
 
@@ -403,13 +431,7 @@ def update_quiz(quiz_id):
     quiz.remarks = data.get("remarks", quiz.remarks)
 
     db.session.commit()
-    
-    # Clear related caches
-    chapter = Chapter.query.get(quiz.chapter_id)
-    if chapter:
-        cache.delete(f'subject_quizzes_{chapter.subject_id}')
-    cache.delete(f'chapter_quizzes_{quiz.chapter_id}')
-    cache.delete(f'quiz_{quiz_id}')
+    invalidate(*quiz_tags(quiz))
     
     return jsonify({"message": "Quiz updated successfully"}), 200
 
@@ -423,20 +445,12 @@ def delete_quiz(quiz_id):
     if not quiz:
         return jsonify({"error": "Quiz not found"}), 404
     
-    chapter_id = quiz.chapter_id
-    chapter = Chapter.query.get(chapter_id)
+    tags = quiz_tags(quiz)
     
+    QuizStats.query.filter_by(quiz_id=quiz_id).delete()
     db.session.delete(quiz)
     db.session.commit()
-    
-    # Clear related caches
-    if chapter:
-        cache.delete(f'subject_quizzes_{chapter.subject_id}')
-    cache.delete(f'chapter_quizzes_{chapter_id}')
-    cache.delete(f'quiz_{quiz_id}')
-    cache.delete(f'quiz_questions_{quiz_id}')
-    cache.delete(f'admin_quiz_questions_{quiz_id}')
-    cache.delete('admin_statistics')
+    invalidate(*tags)
     
     return jsonify({"message": "Quiz deleted successfully"}), 200
 
@@ -444,18 +458,26 @@ def delete_quiz(quiz_id):
 # ➤ Get User Quiz Attempts for Admin
 @admin_bp.route("/users/<int:user_id>/attempts", methods=["GET"])
 @admin_required
-@cache.memoize(timeout=30)
+@replica_reads
+@query_budget(2)  # User, attempts + quizzes + scores
 def get_user_attempts(user_id):
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    attempts = QuizAttempt.query.filter_by(user_id=user_id).all()
+    attempts, next_cursor = keyset_page(QuizAttempt.query.filter_by(user_id=user_id).options(
+        joinedload(QuizAttempt.quiz), joinedload(QuizAttempt.score)
+    ), QuizAttempt.id, after, limit, descending=True)
     attempts_data = []
 
     for attempt in attempts:
         try:
-            quiz = Quiz.query.get(attempt.quiz_id)
+            quiz = attempt.quiz
             score_value = attempt.score.total_score if attempt.score else None
 
             attempts_data.append({
@@ -470,12 +492,13 @@ def get_user_attempts(user_id):
             # Skip invalid attempts
             continue
 
-    return jsonify(attempts_data), 200
+    return jsonify({"items": attempts_data, "next_cursor": next_cursor}), 200
 
 
 # ➤ Search Users
 @admin_bp.route("/search/users", methods=["GET"])
 @admin_required
+@replica_reads
 def search_users():
     query = request.args.get("q", "")
     if not query or len(query) < 2:
@@ -497,6 +520,7 @@ def search_users():
 # ➤ Search Subjects
 @admin_bp.route("/search/subjects", methods=["GET"])
 @admin_required
+@replica_reads
 def search_subjects():
     query = request.args.get("q", "")
     if not query or len(query) < 2:
@@ -515,24 +539,27 @@ def search_subjects():
 # ➤ Search Quizzes
 @admin_bp.route("/search/quizzes", methods=["GET"])
 @admin_required
+@replica_reads
+@query_budget(1)
 def search_quizzes():
     query = request.args.get("q", "")
     if not query or len(query) < 1:  # Allow searching by quiz ID, which might be just one digit
         return jsonify({"error": "Search query required"}), 400
 
     # Search by ID if the query is a number
+    quizzes = Quiz.query.options(joinedload(Quiz.chapter).joinedload(Chapter.subject))
     if query.isdigit():
-        quizzes = Quiz.query.filter_by(id=int(query)).all()
+        quizzes = quizzes.filter_by(id=int(query)).all()
     else:
         # Otherwise search by remarks
-        quizzes = Quiz.query.filter(
+        quizzes = quizzes.filter(
             Quiz.remarks.like(f"%{query}%")
         ).limit(10).all()
 
     result = []
     for quiz in quizzes:
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id) if chapter else None
+        chapter = quiz.chapter
+        subject = chapter.subject if chapter else None
 
         result.append({
             "id": quiz.id,
@@ -547,6 +574,7 @@ def search_quizzes():
 
 @admin_bp.route("/exports/users/trigger", methods=["POST"])
 @admin_required
+@rate_limit('admin_export', identity='3/minute')
 def trigger_user_export():
     """Trigger an asynchronous task to export user statistics to CSV"""
     try:
@@ -565,6 +593,7 @@ def trigger_user_export():
 
 @admin_bp.route("/exports/quizzes/trigger", methods=["POST"])
 @admin_required
+@rate_limit('admin_export', identity='3/minute')
 def trigger_quiz_export():
     """Trigger an asynchronous task to export quiz statistics to CSV"""
     try:
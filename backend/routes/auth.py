@@ -1,18 +1,29 @@
-from datetime import datetime, timezone
+from datetime import datetime
 import json
 from functools import wraps
 
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import (create_access_token, get_jwt_identity,
-                                jwt_required)
+from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from extensions import cache, db
 from models import User
+from services.auth_tokens import has_role, issue_token
+from services.cache_tags import invalidate, per_identity, user_tag
+from services.login_times import latest_login, record_login
+from services.password_hashing import PasswordHashingBusy
+from services.rate_limit import login_email, rate_limit
+from services.stampede import cached_view
 from jobs.tasks import add
 from celery.result import AsyncResult
 
 auth_bp = Blueprint('auth', __name__)
 
+
+@auth_bp.errorhandler(PasswordHashingBusy)
+def hashing_busy(error):
+    return jsonify({"message": "Too many sign-ins right now, please retry shortly"}), 503, {"Retry-After": "1"}
+
+
 @auth_bp.route("/cache")
 @cache.memoize(timeout=7)
 def test_cache():
@@ -33,6 +44,7 @@ def celery_status(task_id):
 
 ### ✅ User Registration ###
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', ip='10/minute')
 def register():
     data = request.get_json()
     if User.query.filter_by(email=data['email']).first():
@@ -48,16 +60,14 @@ def register():
     new_user.set_password(data['password'])
     db.session.add(new_user)
     db.session.commit()
-    cache.delete('admin_all_users')  # Clear users list cache
-    cache.delete('admin_statistics')
-    cache.delete('admin_subjects')# Clear any related caches
-    cache.delete('all_subjects')  # Force reload of subject lists
+    invalidate('stats')  # User counts and recent users
     
     return jsonify({"message": "User registered successfully"}), 201
 
 
 ### ✅ User Login ###
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', ip='60/minute', identity='5/minute', identity_key=login_email)
 def login():
     data = request.get_json()
     user = User.query.filter_by(email=data['email']).first()
@@ -65,12 +75,17 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({"message": "Invalid credentials"}), 401
 
-    # Update last login time
-    user.last_login = datetime.now(timezone.utc)
-    db.session.commit()
+    # Upgrade the hash if BCRYPT_LOG_ROUNDS changed since it was made
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+
+    # Update last login time (buffered when COALESCE_LOGINS is on)
+    record_login(user)
+    invalidate(user_tag(user.id))  # /me shows last_login
     
     # Create access token
-    access_token = create_access_token(identity=user.id)
+    access_token = issue_token(user)
     
     return jsonify(access_token=access_token), 200
 
@@ -81,11 +96,8 @@ def admin_required(fn):
     @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        
-        # Check database for admin role
-        user = User.query.get(current_user_id)
-        if not user or user.role != "admin":
+        # Role comes from the token; revoked tokens are rejected by jwt_required
+        if not has_role("admin"):
             return jsonify({"message": "Admins only!"}), 403
             
         return fn(*args, **kwargs)
@@ -95,7 +107,7 @@ def admin_required(fn):
 ### ✅ Get Current User (Protected) ###
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=30)
+@cached_view(timeout=300, key_prefix=per_identity('me'))  # Cache for 5 minutes
 def get_current_user():
     current_user_id = get_jwt_identity()
     print(current_user_id)
@@ -107,13 +119,14 @@ def get_current_user():
         return jsonify({"message": "User not found"}), 404
     
     # Prepare user data
+    last_login = latest_login(user)
     user_data = {
         "id": user.id,
         "email": user.email,
         "full_name": user.full_name,
         "role": user.role,
         "created_at": user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-        "last_login": user.last_login.strftime("%Y-%m-%d %H:%M:%S") if user.last_login else None,
+        "last_login": last_login.strftime("%Y-%m-%d %H:%M:%S") if last_login else None,
         "user_preferences": user.user_preferences.strftime("%H:%M") if user.user_preferences else None
     }
 
@@ -158,7 +171,6 @@ def update_profile():
         
     db.session.commit()
     
-    # Clear user cache
-    cache.delete_memoized(get_current_user, current_user_id)
+    invalidate(user_tag(current_user_id))
     
     return jsonify({"message": "Profile updated successfully"}), 200
@@ -1,13 +1,27 @@
 from datetime import datetime, timezone, timedelta
-import json
 import os
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, current_app, jsonify, request, send_file
 from flask_jwt_extended import get_jwt_identity, jwt_required
-
-from extensions import cache, db
-from models import Chapter, Question, Quiz, QuizAttempt, Score, Subject, User
-from jobs.tasks import export_user_quiz_attempts, send_conditional_daily_email, send_monthly_activity_report
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from db_routing import replica_reads
+from extensions import db
+from models import AttemptAnswer, Chapter, Question, Quiz, QuizAttempt, Score, Subject, User
+from jobs.tasks import (drain_submission_queue, export_user_quiz_attempts, send_conditional_daily_email,
+                       send_monthly_activity_report)
+from services.attempt_registry import get_active_attempt, get_quiz_meta, register_attempt, unregister_attempt
+from services.cache_tags import invalidate, per_identity, tagged, user_tag
+from services.catalog import get_catalog_snapshot
+from services.conditional import conditional
+from services.grading import add_score, grade_attempt, save_responses
+from services.pagination import keyset_page, page_args
+from services.query_budget import query_budget
+from services.rate_limit import rate_limit
+from services.stampede import cached_view
+from services.question_payloads import get_questions_etag, get_questions_payload
+from services.submission_queue import enqueue_submission, get_submission_status
 
 user_bp = Blueprint('user', __name__, url_prefix='/user')
 
@@ -15,15 +29,19 @@ user_bp = Blueprint('user', __name__, url_prefix='/user')
 
 @user_bp.route('/subjects', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=3600, key_prefix='all_subjects')  # Cache for 1 hour
+@conditional('subjects')
+@cached_view(timeout=3600, key_prefix=tagged('all_subjects', 'subjects'))  # Cache for 1 hour
 def get_subjects():
     subjects = Subject.query.all()
     return jsonify([{"id": sub.id, "name": sub.name} for sub in subjects])
 
 
+subject_quizzes_key = tagged('subject_quizzes_{subject_id}', 'subject:{subject_id}')
+
 @user_bp.route('/quizzes/<int:subject_id>', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=900, key_prefix=lambda: f'subject_quizzes_{request.view_args["subject_id"]}')  # Cache for 15 minutes
+@conditional('subject:{subject_id}')
+@cached_view(timeout=3600, key_prefix=subject_quizzes_key)  # Cache for 1 hour
 def get_quizzes(subject_id):
     quizzes = Quiz.query.join(Chapter).filter(
         Chapter.subject_id == subject_id).all()
@@ -33,6 +51,16 @@ def get_quizzes(subject_id):
         "duration": quiz.time_duration
     } for quiz in quizzes])
 
+@user_bp.route('/catalog', methods=['GET'])
+@jwt_required()
+def get_catalog():
+    """Serve the whole subject -> chapter -> quiz tree, answering 304 if the client's copy is current"""
+    payload, etag = get_catalog_snapshot()
+    response = current_app.response_class(payload, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 ### 2️⃣ Start a Quiz Attempt ###
 
 @user_bp.route('/quiz/<int:quiz_id>/start', methods=['POST'])
@@ -41,46 +69,22 @@ def start_quiz_attempt(quiz_id):
     user_id = get_jwt_identity()
     
     # Check if quiz exists - use cached data if available
-    quiz_cache_key = f'quiz_{quiz_id}'
-    cached_quiz = None  # Simple cache instead of Redis
-    
-    if cached_quiz:
-        quiz_data = json.loads(cached_quiz.decode('utf-8'))
-        quiz_obj = type('Quiz', (), {
-            'id': quiz_data['id'],
-            'time_duration': quiz_data['time_duration']
-        })
-    else:
-        quiz = Quiz.query.get(quiz_id)
-        if not quiz:
-            return jsonify({"error": "Quiz not found"}), 404
-        
-        # Cache the quiz data (using in-memory cache)
-        quiz_data = {
-            'id': quiz.id,
-            'time_duration': quiz.time_duration
-        }
-        quiz_obj = quiz
+    quiz_data = get_quiz_meta(quiz_id)
+    if not quiz_data:
+        return jsonify({"error": "Quiz not found"}), 404
     
     # Check if user already has an active attempt for this quiz
-    active_attempt = QuizAttempt.query.filter_by(
-        user_id=user_id, 
-        quiz_id=quiz_id, 
-        end_time=None
-    ).first()
+    active_attempt = get_active_attempt(user_id, quiz_id)
     
     if active_attempt:
-        if active_attempt.start_time.tzinfo is None:
-            active_attempt.start_time = active_attempt.start_time.replace(tzinfo=timezone.utc)
         # Calculate remaining time
-        elapsed = datetime.now(timezone.utc) - active_attempt.start_time
-        remaining_seconds = max(0, (quiz_obj.time_duration * 60) - elapsed.total_seconds())
+        remaining_seconds = max(0, active_attempt["deadline"] - datetime.now(timezone.utc).timestamp())
         
         return jsonify({
             "message": "Quiz already started",
-            "attempt_id": active_attempt.id,
+            "attempt_id": active_attempt["attempt_id"],
             "remaining_seconds": remaining_seconds,
-            "questions": get_quiz_questions_data(quiz_id)
+            "questions_etag": get_questions_etag(quiz_id)
         })
     
     # Create new attempt
@@ -92,38 +96,18 @@ def start_quiz_attempt(quiz_id):
     )
     db.session.add(quiz_attempt)
     db.session.commit()
+    register_attempt(quiz_attempt, quiz_data['time_duration'])
     
     # Clear user history cache
-    cache.delete_memoized(get_user_history, user_id)
+    invalidate(user_tag(user_id))
     
     return jsonify({
         "message": "Quiz started",
         "attempt_id": quiz_attempt.id,
-        "remaining_seconds": quiz_obj.time_duration * 60,
-        "questions": get_quiz_questions_data(quiz_id)
+        "remaining_seconds": quiz_data['time_duration'] * 60,
+        "questions_etag": get_questions_etag(quiz_id)
     })
 
-@cache.memoize(timeout=900)  # Cache for 15 minutes
-def get_quiz_questions_data(quiz_id):
-    # Check if questions are cached in Redis
-    questions_cache_key = f'quiz_questions_{quiz_id}'
-    cached_questions = None  # Simple cache instead of Redis
-    
-    if cached_questions:
-        return json.loads(cached_questions.decode('utf-8'))
-    
-    # If not cached, fetch from database
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    result = [{
-        "id": q.id, 
-        "question": q.question_text,
-        "options": [q.option1, q.option2, q.option3, q.option4]
-    } for q in questions]
-    
-    # Cache the results (using SimpleCache)
-    
-    return result
-
 ### 3️⃣ Get Quiz Questions ###
 @user_bp.route('/quiz/<int:quiz_id>', methods=['GET'])
 @jwt_required()
@@ -131,37 +115,49 @@ def get_quiz_questions(quiz_id):
     user_id = get_jwt_identity()
     
     # Check if user has an active attempt
-    active_attempt = QuizAttempt.query.filter_by(
-        user_id=user_id, 
-        quiz_id=quiz_id, 
-        end_time=None
-    ).first()
+    active_attempt = get_active_attempt(user_id, quiz_id)
     
     if not active_attempt:
         return jsonify({"error": "No active quiz attempt found"}), 400
         
     # Check if time has expired
-    quiz = Quiz.query.get(quiz_id)
-    elapsed = datetime.now(timezone.utc) - active_attempt.start_time
-    remaining_seconds = max(0, (quiz.time_duration * 60) - elapsed.total_seconds())
+    remaining_seconds = max(0, active_attempt["deadline"] - datetime.now(timezone.utc).timestamp())
     
     if remaining_seconds <= 0:
         # Auto-submit with empty answers if time expired
-        active_attempt.end_time = datetime.now(timezone.utc)
+        QuizAttempt.query.filter_by(id=active_attempt["attempt_id"], end_time=None).update(
+            {"end_time": datetime.now(timezone.utc)}
+        )
         db.session.commit()
+        unregister_attempt(user_id, quiz_id)
         
         # Clear user history cache
-        cache.delete_memoized(get_user_history, user_id)
+        invalidate(user_tag(user_id))
         
         return jsonify({"error": "Quiz time has expired"}), 400
     
-    questions = get_quiz_questions_data(quiz_id)
+    # The questions themselves come from /questions; the ETag tells the client whether its copy is current
     return jsonify({
-        "attempt_id": active_attempt.id,
+        "attempt_id": active_attempt["attempt_id"],
         "remaining_seconds": remaining_seconds,
-        "questions": questions
+        "questions_etag": get_questions_etag(quiz_id)
     })
 
+@user_bp.route('/quiz/<int:quiz_id>/questions', methods=['GET'])
+@jwt_required()
+def get_quiz_questions_payload(quiz_id):
+    """Serve only the questions of an active quiz, answering 304 if the client's copy is current"""
+    user_id = get_jwt_identity()
+    
+    if not get_active_attempt(user_id, quiz_id):
+        return jsonify({"error": "No active quiz attempt found"}), 400
+    
+    payload, etag = get_questions_payload(quiz_id)
+    response = current_app.response_class(payload, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 ### 4️⃣ Submit Quiz Attempt ###
 @user_bp.route('/quiz/submit', methods=['POST'])
 @jwt_required()
@@ -173,6 +169,8 @@ def submit_quiz_attempt():
 
     if not attempt_id:
         return jsonify({"error": "Attempt ID required"}), 400
+    if not isinstance(answers, dict):
+        return jsonify({"error": "Answers must map question IDs to options"}), 400
 
     # Get the attempt
     quiz_attempt = QuizAttempt.query.get(attempt_id)
@@ -189,75 +187,126 @@ def submit_quiz_attempt():
     
     # Check if time has expired
     quiz = Quiz.query.get(quiz_attempt.quiz_id)
-    if quiz_attempt.start_time.tzinfo is None:
-        quiz_attempt.start_time = quiz_attempt.start_time.replace(tzinfo=timezone.utc)
-    elapsed = datetime.now(timezone.utc) - quiz_attempt.start_time
+    start_time = quiz_attempt.start_time
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)  # Not assigned back, so the row is not rewritten
+    elapsed = datetime.now(timezone.utc) - start_time
     if elapsed.total_seconds() > (quiz.time_duration * 60):
         # Time expired - give zero score
-        quiz_attempt.end_time = datetime.now(timezone.utc)
-        
-        score = Score(
-            quiz_attempt_id=quiz_attempt.id,
-            user_id=user_id,
-            total_score=0
-        )
-        db.session.add(score)
+        add_score(quiz_attempt, 0)
         db.session.commit()
+        unregister_attempt(user_id, quiz_attempt.quiz_id)
         
         # Clear user history cache
-        cache.delete_memoized(get_user_history, user_id)
+        invalidate(user_tag(user_id))
         
         return jsonify({
             "message": "Quiz time expired",
             "score": 0
         }), 200
 
-    # Set end time
-    quiz_attempt.end_time = datetime.now(timezone.utc)
-    
-    # Calculate score
-    correct_answers = 0
-    total_questions = Question.query.filter_by(quiz_id=quiz_attempt.quiz_id).count()
-    
-    if total_questions == 0:
-        total_questions = 1  # Avoid division by zero
-    
-    for qid, selected_option in answers.items():
-        question = Question.query.get(int(qid))
-        if question and int(selected_option-1) == question.correct_option:
-            correct_answers += 1
+    # Hand off grading to the batched grader when write-behind is enabled
+    if current_app.config.get("ASYNC_SUBMISSIONS"):
+        submission_id = enqueue_submission(quiz_attempt, answers)
+        if not submission_id:
+            return jsonify({"error": "Quiz already submitted"}), 400
+        unregister_attempt(user_id, quiz_attempt.quiz_id)
+        
+        try:
+            drain_submission_queue.delay()
+        except Exception:
+            pass  # The periodic drain will pick it up
+        
+        return jsonify({
+            "message": "Quiz submission queued",
+            "submission_id": submission_id,
+            "status": "QUEUED"
+        }), 202
 
-    # Create score record
-    score_value = int((correct_answers / total_questions) * 100)
-    score = Score(
-        quiz_attempt_id=quiz_attempt.id, 
-        user_id=user_id,
-        total_score=score_value
-    )
-    db.session.add(score)
+    # Calculate score against the cached answer key
+    result, responses = grade_attempt(quiz_attempt, answers)
+    
+    # Store individual responses with a single executemany insert
+    if current_app.config.get("CAPTURE_RESPONSES", True):
+        save_responses(responses)
     db.session.commit()
+    unregister_attempt(user_id, quiz_attempt.quiz_id)
     
     # Clear user history cache
-    cache.delete_memoized(get_user_history, user_id)
+    invalidate(user_tag(user_id))
 
     return jsonify({
         "message": "Quiz submitted successfully", 
-        "score": score_value,
-        "correct": correct_answers,
-        "total": total_questions
+        **result
+    })
+
+@user_bp.route('/quiz/submit/status/<submission_id>', methods=['GET'])
+@jwt_required()
+def get_submission_status_route(submission_id):
+    """Check the status of a queued quiz submission"""
+    user_id = get_jwt_identity()
+    
+    status = get_submission_status(submission_id)
+    if not status or status.pop("user_id") != user_id:
+        return jsonify({"error": "Submission not found"}), 404
+    
+    return jsonify({"submission_id": submission_id, **status}), 200
+
+@user_bp.route('/attempts/<int:attempt_id>/review', methods=['GET'])
+@jwt_required()
+@replica_reads
+def review_quiz_attempt(attempt_id):
+    """Return per-question correctness for one of the user's submitted attempts"""
+    user_id = get_jwt_identity()
+    
+    rows = db.session.query(
+        AttemptAnswer.question_id,
+        AttemptAnswer.selected_option,
+        AttemptAnswer.is_correct,
+        Question.question_text,
+        Question.correct_option
+    ).join(
+        QuizAttempt, AttemptAnswer.quiz_attempt_id == QuizAttempt.id
+    ).join(
+        Question, AttemptAnswer.question_id == Question.id
+    ).filter(
+        AttemptAnswer.quiz_attempt_id == attempt_id,
+        QuizAttempt.user_id == user_id
+    ).order_by(
+        AttemptAnswer.question_id
+    ).all()
+    
+    if not rows:
+        return jsonify({"error": "No responses found for this attempt"}), 404
+    
+    return jsonify({
+        "attempt_id": attempt_id,
+        "responses": [{
+            "question_id": row.question_id,
+            "question": row.question_text,
+            "selected_option": row.selected_option,
+            "correct_option": row.correct_option + 1,  # Same 1-based numbering as submissions
+            "is_correct": row.is_correct
+        } for row in rows]
     })
 
 ### 5️⃣ Fetch User Quiz History ###
 
 @user_bp.route('/history', methods=['GET'])
 @jwt_required()
+@query_budget(2)  # Attempts + scores, summary (first page only)
+@cached_view(timeout=300, key_prefix=per_identity('user_history'))  # Cache for 5 minutes
 def get_user_history_route():
     user_id = get_jwt_identity()
-    return jsonify(get_user_history(user_id))
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-@cache.memoize(timeout=300)  # Cache for 5 minutes
-def get_user_history(user_id):
-    attempts = QuizAttempt.query.filter_by(user_id=user_id).all()
+    # Newest attempts first
+    attempts, next_cursor = keyset_page(QuizAttempt.query.filter_by(user_id=user_id).options(
+        joinedload(QuizAttempt.score)
+    ), QuizAttempt.id, after, limit, descending=True)
 
     history = []
     for attempt in attempts:
@@ -273,12 +322,24 @@ def get_user_history(user_id):
             # Skip any attempts with missing data
             continue
 
-    return history
+    response = {"items": history, "next_cursor": next_cursor}
+    if after is None:
+        # Totals over every attempt, so the first page can show them without loading the rest
+        attempt_count, average_score, highest_score = db.session.query(
+            func.count(QuizAttempt.id), func.avg(Score.total_score), func.max(Score.total_score)
+        ).outerjoin(Score, Score.quiz_attempt_id == QuizAttempt.id).filter(QuizAttempt.user_id == user_id).one()
+        response["summary"] = {
+            "attempts": attempt_count,
+            "average_score": round(average_score) if average_score is not None else 0,
+            "highest_score": highest_score or 0
+        }
+    return jsonify(response)
 
 ### 6️⃣ User Quiz Export Endpoints ###
 
 @user_bp.route('/exports/quiz-history/trigger', methods=['POST'])
 @jwt_required()
+@rate_limit('user_export', identity='3/minute')
 def trigger_quiz_history_export():
     """Trigger an asynchronous task to export the user's quiz history to CSV"""
     user_id = get_jwt_identity()
@@ -355,6 +416,7 @@ def download_export(filename):
 
 @user_bp.route('/exports/list', methods=['GET'])
 @jwt_required()
+@cached_view(timeout=300, key_prefix=per_identity('user_exports'))  # Cache for 5 minutes
 def list_exports():
     """List export files available for the current user"""
     user_id = get_jwt_identity()
@@ -0,0 +1,61 @@
+"""
+Answer-key cache used to grade quiz submissions.
+
+Each quiz's content version is the generation of its 'quiz:<id>' cache tag.
+Answer keys are cached under the current version, so any question change
+only needs to invalidate the tag and the stale key is never read again.
+"""
+
+from extensions import cache, db
+from models import Question
+from services.cache_tags import generations
+
+ANSWER_KEY_TIMEOUT = 3600  # Cache for 1 hour
+
+
+def get_quiz_version(quiz_id):
+    """Return the current content version of a quiz."""
+    return generations(f'quiz:{quiz_id}')[0]
+
+
+def get_answer_key(quiz_id, timeout=ANSWER_KEY_TIMEOUT, refresh=False):
+    """
+    Return the answer key of a quiz as {question_id: correct_option}.
+    The key is loaded with a single query and cached per content version.
+    """
+    cache_key = f'answer_key_{quiz_id}_v{get_quiz_version(quiz_id)}'
+    answer_key = None if refresh else cache.get(cache_key)
+    if answer_key is None:
+        rows = db.session.query(Question.id, Question.correct_option).filter(
+            Question.quiz_id == quiz_id
+        ).all()
+        answer_key = {question_id: correct_option for question_id, correct_option in rows}
+        cache.set(cache_key, answer_key, timeout=timeout)
+    return answer_key
+
+
+def mark_answers(answer_key, answers):
+    """
+    Mark each submitted answer against the answer key in memory.
+
+    `answers` maps question ids to the selected option as sent by the client
+    (1-based), while `correct_option` is stored 0-based. Answers to questions
+    outside the quiz or with malformed values are skipped.
+    """
+    marked = []
+    for qid, selected_option in answers.items():
+        try:
+            question_id = int(qid)
+            selected_option = int(selected_option)
+        except (TypeError, ValueError):
+            continue
+        correct_option = answer_key.get(question_id)
+        if correct_option is None:
+            continue
+        marked.append({
+            "question_id": question_id,
+            "selected_option": selected_option,
+            "is_correct": selected_option - 1 == correct_option
+        })
+    return marked
+
@@ -0,0 +1,28 @@
+"""
+Calendar days in the application's timezone.
+
+Quiz dates, the Celery beat schedule and the daily cache warm-up all use
+the TIMEZONE setting, so "today" means the same day to each of them
+whatever timezone the host runs in.
+"""
+
+import os
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from flask import current_app, has_app_context
+
+
+def app_timezone():
+    name = current_app.config.get("TIMEZONE") if has_app_context() else None
+    return ZoneInfo(name or os.getenv("TIMEZONE", "UTC"))
+
+
+def app_today():
+    """Today's date in the application's timezone."""
+    return datetime.now(app_timezone()).date()
+
+
+def end_of_day(day):
+    """Midnight at the end of `day` in the application's timezone, as an aware datetime."""
+    return datetime.combine(day + timedelta(days=1), time.min, tzinfo=app_timezone())
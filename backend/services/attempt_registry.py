@@ -0,0 +1,129 @@
+"""
+Registry of open quiz attempts kept in the cache.
+
+Starting and polling a quiz only needs the attempt id and its deadline, so
+both are served from here instead of querying quiz_attempt and quiz on
+every call. Entries are written through on start and removed on submit or
+expiry. After a cache flush the whole registry is rebuilt from the
+quiz_attempt table with one query, and a miss for a single attempt falls
+back to the database and repopulates the entry. Attempts whose submission
+is waiting for the batched grader still have no end_time, so both skip
+them.
+"""
+
+from datetime import timezone
+
+from flask import current_app
+
+from extensions import cache, db
+from models import Quiz, QuizAttempt
+from services.cache_tags import tagged_key
+
+REGISTRY_LOADED_KEY = 'active_attempts_loaded'
+QUIZ_META_TIMEOUT = 3600  # Cache for 1 hour
+GRACE_SECONDS = 300  # Keep entries a little past the deadline so expiry can be handled
+
+
+def _attempt_key(user_id, quiz_id):
+    return f'active_attempt_{user_id}_{quiz_id}'
+
+
+def _timestamp(value):
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _without_queued(attempt_ids):
+    """Drop attempts that were submitted but not graded yet."""
+    attempt_ids = set(attempt_ids)
+    if attempt_ids and current_app.config.get("ASYNC_SUBMISSIONS"):
+        # Import here to avoid circular import
+        from services.submission_queue import queued_attempt_ids
+        attempt_ids -= queued_attempt_ids(attempt_ids)
+    return attempt_ids
+
+
+def get_quiz_meta(quiz_id, timeout=QUIZ_META_TIMEOUT, refresh=False):
+    """Return {'id', 'time_duration'} for a quiz, or None if it does not exist."""
+    cache_key = tagged_key(f'quiz_{quiz_id}', f'quiz:{quiz_id}')
+    quiz_data = None if refresh else cache.get(cache_key)
+    if quiz_data is None:
+        quiz = Quiz.query.get(quiz_id)
+        if not quiz:
+            return None
+        quiz_data = {'id': quiz.id, 'time_duration': quiz.time_duration}
+        cache.set(cache_key, quiz_data, timeout=timeout)
+    return quiz_data
+
+
+def _entry(attempt_id, start_time, time_duration):
+    start = _timestamp(start_time)
+    return {
+        'attempt_id': attempt_id,
+        'start_time': start,
+        'deadline': start + time_duration * 60
+    }
+
+
+def register_attempt(quiz_attempt, time_duration):
+    """Write an open attempt through to the registry and return its entry."""
+    entry = _entry(quiz_attempt.id, quiz_attempt.start_time, time_duration)
+    cache.set(_attempt_key(quiz_attempt.user_id, quiz_attempt.quiz_id), entry,
+              timeout=time_duration * 60 + GRACE_SECONDS)
+    return entry
+
+
+def unregister_attempt(user_id, quiz_id):
+    cache.delete(_attempt_key(user_id, quiz_id))
+
+
+def rebuild_registry():
+    """Reload every open attempt from the quiz_attempt table. Returns the number loaded."""
+    rows = db.session.query(
+        QuizAttempt.id,
+        QuizAttempt.user_id,
+        QuizAttempt.quiz_id,
+        QuizAttempt.start_time,
+        Quiz.time_duration
+    ).join(
+        Quiz, QuizAttempt.quiz_id == Quiz.id
+    ).filter(
+        QuizAttempt.end_time == None
+    ).all()
+    open_ids = _without_queued(row.id for row in rows)
+
+    for row in rows:
+        if row.id not in open_ids:
+            continue
+        cache.set(_attempt_key(row.user_id, row.quiz_id), _entry(row.id, row.start_time, row.time_duration),
+                  timeout=row.time_duration * 60 + GRACE_SECONDS)
+    cache.set(REGISTRY_LOADED_KEY, True, timeout=0)
+    return len(open_ids)
+
+
+def get_active_attempt(user_id, quiz_id):
+    """Return the registry entry of the user's open attempt for a quiz, or None."""
+    if not cache.get(REGISTRY_LOADED_KEY):
+        rebuild_registry()
+
+    entry = cache.get(_attempt_key(user_id, quiz_id))
+    if entry is not None:
+        return entry
+
+    # Entry may have been evicted; confirm with the database and write through
+    open_attempts = QuizAttempt.query.filter_by(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        end_time=None
+    ).all()
+    open_ids = _without_queued(attempt.id for attempt in open_attempts)
+    quiz_attempt = next((attempt for attempt in open_attempts if attempt.id in open_ids), None)
+    if not quiz_attempt:
+        return None
+
+    quiz_data = get_quiz_meta(quiz_id)
+    if not quiz_data:
+        return None
+    return register_attempt(quiz_attempt, quiz_data['time_duration'])
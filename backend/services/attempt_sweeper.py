@@ -0,0 +1,85 @@
+"""
+Bulk closing of expired quiz attempts.
+
+Attempts used to be closed only when their user came back to poll or
+submit. The sweeper closes every attempt past its deadline with one
+set-based UPDATE and records zero scores for them in one bulk insert.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from extensions import db
+from models import Quiz, QuizAttempt
+from services.attempt_registry import GRACE_SECONDS, unregister_attempt
+from services.cache_tags import invalidate, user_tag
+from services.grading import save_scores
+
+
+def sweep_expired_attempts():
+    """
+    Close all attempts whose deadline (plus a grace period) has passed.
+    Returns the number of attempts closed.
+    """
+
+    now = datetime.now(timezone.utc)
+
+    # One cutoff per distinct quiz duration keeps the expiry check portable across databases
+    durations = [row.time_duration for row in db.session.query(Quiz.time_duration).distinct().all()]
+    if not durations:
+        return 0
+    expired = or_(*[
+        and_(
+            Quiz.time_duration == duration,
+            QuizAttempt.start_time < now - timedelta(minutes=duration, seconds=GRACE_SECONDS)
+        )
+        for duration in durations
+    ])
+
+    candidates = db.session.query(QuizAttempt.id).join(
+        Quiz, QuizAttempt.quiz_id == Quiz.id
+    ).filter(
+        QuizAttempt.end_time == None,
+        expired
+    ).all()
+    candidate_ids = {row.id for row in candidates}
+
+    # Leave attempts whose submission is still waiting for the batched grader
+    if candidate_ids and current_app.config.get("ASYNC_SUBMISSIONS"):
+        from services.submission_queue import queued_attempt_ids
+        candidate_ids -= queued_attempt_ids(candidate_ids)
+    if not candidate_ids:
+        return 0
+
+    # The end_time guard skips attempts submitted since the select;
+    # the sweep timestamp then identifies exactly the rows this UPDATE closed
+    db.session.query(QuizAttempt).filter(
+        QuizAttempt.id.in_(candidate_ids),
+        QuizAttempt.end_time == None
+    ).update({QuizAttempt.end_time: now}, synchronize_session=False)
+
+    closed = db.session.query(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.quiz_id).filter(
+        QuizAttempt.id.in_(candidate_ids),
+        QuizAttempt.end_time == now
+    ).all()
+
+    try:
+        save_scores([{
+            "quiz_id": row.quiz_id,
+            "quiz_attempt_id": row.id,
+            "user_id": row.user_id,
+            "total_score": 0,
+            "timestamp": now
+        } for row in closed])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for row in closed:
+        unregister_attempt(row.user_id, row.quiz_id)
+    invalidate(*{user_tag(row.user_id) for row in closed})
+
+    return len(closed)
@@ -0,0 +1,100 @@
+"""
+Access tokens that carry what authorization needs.
+
+Tokens are issued with the user's role and token version as claims, so
+admin checks read the JWT instead of loading the user. Every protected
+request still compares the token's version with the user's current one,
+which lives in the cache: issue_token stores it, revoke_tokens raises it,
+and only an evicted entry is read back from the database. Revoking - on
+demotion, before deleting a user or after a password reset - rejects
+every token issued before it, and tokens of users that no longer exist
+fail the same check.
+
+The versions need a real cache, shared by every worker in production
+(RedisCache or NearRedisCache). With the null cache each request would
+query the user again, so require_token_cache refuses to start without one.
+"""
+
+import click
+from flask.cli import with_appcontext
+from flask_jwt_extended import create_access_token, get_jwt
+
+from flask_caching.backends import NullCache
+
+from extensions import cache, db
+
+TOKEN_VERSION_CACHE_SECONDS = 3600
+DELETED = -1  # Cached version for users that no longer exist
+
+
+def _version_key(user_id):
+    return f'token_version_{user_id}'
+
+
+def current_version(user_id):
+    """Return the user's token version, or DELETED."""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Import here to avoid circular import
+        from models import User
+        row = db.session.query(User.token_version).filter(User.id == user_id).first()
+        version = DELETED if row is None else (row.token_version or 0)
+        cache.set(_version_key(user_id), version, timeout=TOKEN_VERSION_CACHE_SECONDS)
+    return version
+
+
+def require_token_cache(app):
+    """Fail at startup if the app has no cache to keep token versions in."""
+    if isinstance(app.extensions['cache'][cache], NullCache):
+        raise RuntimeError(
+            'Token revocation needs a cache; set CACHE_TYPE (RedisCache, or SimpleCache for a single process)'
+        )
+
+
+def issue_token(user):
+    """Create an access token for `user` with role and version claims."""
+    # Prime the version so requests with this token are authorized without a query
+    cache.add(_version_key(user.id), user.token_version or 0, timeout=TOKEN_VERSION_CACHE_SECONDS)
+    return create_access_token(identity=user.id, additional_claims={
+        "role": user.role,
+        "ver": user.token_version or 0
+    })
+
+
+def has_role(role):
+    """True if the verified JWT in this request was issued for `role`."""
+    return get_jwt().get('role') == role
+
+
+def revoke_tokens(user):
+    """Reject every token issued to `user` so far. Commits the session."""
+    user.token_version = (user.token_version or 0) + 1
+    db.session.commit()
+    cache.set(_version_key(user.id), user.token_version, timeout=TOKEN_VERSION_CACHE_SECONDS)
+
+
+def install_token_checks(jwt):
+    """Reject tokens whose version is behind the user's, on every @jwt_required request."""
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        version = current_version(jwt_payload['sub'])
+        return version == DELETED or jwt_payload.get('ver', 0) != version
+
+
+@click.command('revoke-tokens')
+@click.argument('email')
+@click.option('--role', type=click.Choice(['admin', 'user']), help='Change the role before revoking.')
+@with_appcontext
+def revoke_tokens_command(email, role):
+    """Sign a user out everywhere, optionally changing their role."""
+    # Import here to avoid circular import
+    from models import User
+    from services.cache_tags import invalidate, user_tag
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f'No user with email {email}')
+    if role:
+        user.role = role
+    revoke_tokens(user)
+    invalidate('stats', user_tag(user.id))
+    click.echo(f'Revoked tokens for {email} (version {user.token_version}, role {user.role})')
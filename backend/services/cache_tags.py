@@ -0,0 +1,112 @@
+"""
+Tag-based cache invalidation.
+
+Cached entries declare the entities they depend on as tags, e.g.
+'subject:3' or 'quiz:12'. Each tag has a generation stored in the cache,
+and the generations of an entry's tags are part of its key. Invalidating a
+tag replaces its generation, so every dependent entry is skipped at once
+and ages out through its TTL.
+
+A tag stands for an entity and everything listed under it, so a write
+invalidates the entity and its ancestors:
+
+    catalog             the whole subject -> chapter -> quiz tree
+    subjects            the subject list
+    subject:<id>        a subject, its chapters and quizzes
+    chapter:<id>        a chapter and its quizzes
+    quiz:<id>           a quiz and its questions
+    user:<id>           responses cached for one user (profile, history, exports)
+    stats               dashboard statistics
+
+Generations are timestamps rather than counters, so a generation that is
+evicted from the cache is replaced with a new value instead of starting
+again at one that old entries were stored under.
+"""
+
+import time
+from urllib.parse import urlencode
+
+from flask import request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from extensions import cache
+
+
+def _generation_key(tag):
+    return f'tag_gen_{tag}'
+
+
+def _new_generation():
+    return time.time_ns()
+
+
+def generations(*tags):
+    """Return the current generation of each tag, creating missing ones."""
+    keys = [_generation_key(tag) for tag in tags]
+    values = list(cache.get_many(*keys)) if keys else []
+    for i, value in enumerate(values):
+        if value is None:
+            values[i] = _new_generation()
+            cache.set(keys[i], values[i], timeout=0)
+    return values
+
+
+def tagged_key(prefix, *tags):
+    """Return the cache key for `prefix` under the current generations of `tags`."""
+    if not tags:
+        return prefix
+    return f'{prefix}@' + '.'.join(str(generation) for generation in generations(*tags))
+
+
+def invalidate(*tags):
+    """Invalidate every entry cached against any of `tags`."""
+    for tag in set(tags):
+        cache.set(_generation_key(tag), _new_generation(), timeout=0)
+
+
+def tagged(prefix, *tags):
+    """
+    key_prefix for @cache.cached. `prefix` and `tags` may use the view's
+    URL arguments, e.g. tagged('chapter_quizzes_{chapter_id}', 'chapter:{chapter_id}').
+    """
+    def make_key():
+        args = request.view_args or {}
+        return tagged_key(prefix.format(**args), *(tag.format(**args) for tag in tags))
+    return make_key
+
+
+def per_identity(prefix):
+    """
+    key_prefix for @cached_view on JWT-protected views. Entries are kept per
+    identity and role, URL arguments and query string, and are invalidated
+    with invalidate(user_tag(user_id)).
+    """
+    def make_key():
+        identity = get_jwt_identity()
+        if identity is None:
+            raise RuntimeError('per_identity keys need a verified JWT; put @jwt_required() above the cache decorator')
+        role = get_jwt().get('role', '')
+        args = request.view_args or {}
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return tagged_key(f'{prefix.format(**args)}_u{identity}_{role}?{query}', user_tag(identity))
+    return make_key
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def subject_tags(subject_id):
+    return ['catalog', 'subjects', f'subject:{subject_id}', 'stats']
+
+
+def chapter_tags(chapter):
+    return ['catalog', f'chapter:{chapter.id}', f'subject:{chapter.subject_id}', 'stats']
+
+
+def quiz_tags(quiz):
+    """Tags to invalidate when a quiz or its questions change."""
+    tags = ['catalog', f'quiz:{quiz.id}', f'chapter:{quiz.chapter_id}', 'stats']
+    if quiz.chapter:
+        tags.append(f'subject:{quiz.chapter.subject_id}')
+    return tags
@@ -0,0 +1,98 @@
+"""
+Pre-warming of caches for quizzes scheduled on a given day.
+
+Question payloads and answer keys are keyed by quiz content version, so
+they can be kept for the rest of the day safely. Catalog views are warmed
+by running them in a request context so the cached entries are exactly
+what a real request would have stored.
+"""
+
+from datetime import datetime, timezone
+import time as timer
+
+from flask import current_app, request
+
+from extensions import cache, db
+from models import Chapter, Quiz
+from services.answer_keys import get_answer_key
+from services.app_time import end_of_day
+from services.attempt_registry import get_quiz_meta
+from services.question_payloads import get_questions_payload
+from services.stampede import extend
+
+
+def _seconds_until_end_of_day(day):
+    return max(60, int((end_of_day(day) - datetime.now(timezone.utc)).total_seconds()))
+
+
+def _warm_view(path, view, make_key, timeout):
+    """Run a cached view for `path` and keep its cache entry for `timeout` seconds."""
+    with current_app.test_request_context(path):
+        cache_key = make_key()
+        cache.delete(cache_key)
+        view.__wrapped__(**request.view_args)  # Skip auth, keep the cache decorator
+        return extend(cache_key, timeout)
+
+
+def warm_quizzes_for_day(day):
+    """
+    Warm question payloads, answer keys, quiz metadata and the
+    subject/chapter quiz listings for every quiz dated `day`.
+    Returns timing and coverage for each kind of entry.
+    """
+    from routes.admin import chapter_quizzes_key, get_quizzes as get_chapter_quizzes  # Import here to avoid circular import
+    from routes.user import get_quizzes as get_subject_quizzes, subject_quizzes_key
+
+    started = timer.perf_counter()
+    timeout = _seconds_until_end_of_day(day)
+
+    quizzes = db.session.query(Quiz.id, Quiz.chapter_id, Chapter.subject_id).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).filter(
+        Quiz.date_of_quiz == day
+    ).all()
+
+    timings = {}
+    warmed = {"question_payloads": 0, "answer_keys": 0, "quiz_meta": 0,
+              "subject_quizzes": 0, "chapter_quizzes": 0}
+
+    step = timer.perf_counter()
+    for quiz in quizzes:
+        get_questions_payload(quiz.id, timeout=timeout, refresh=True)
+        warmed["question_payloads"] += 1
+        get_answer_key(quiz.id, timeout=timeout, refresh=True)
+        warmed["answer_keys"] += 1
+        if get_quiz_meta(quiz.id, timeout=timeout, refresh=True):
+            warmed["quiz_meta"] += 1
+    timings["quizzes_ms"] = round((timer.perf_counter() - step) * 1000, 2)
+
+    subject_ids = sorted({quiz.subject_id for quiz in quizzes})
+    chapter_ids = sorted({quiz.chapter_id for quiz in quizzes})
+
+    step = timer.perf_counter()
+    for subject_id in subject_ids:
+        if _warm_view(f'/user/quizzes/{subject_id}', get_subject_quizzes,
+                      subject_quizzes_key, timeout):
+            warmed["subject_quizzes"] += 1
+    for chapter_id in chapter_ids:
+        if _warm_view(f'/admin/chapters/{chapter_id}/quizzes', get_chapter_quizzes,
+                      chapter_quizzes_key, timeout):
+            warmed["chapter_quizzes"] += 1
+    timings["catalog_ms"] = round((timer.perf_counter() - step) * 1000, 2)
+
+    expected = {"question_payloads": len(quizzes), "answer_keys": len(quizzes), "quiz_meta": len(quizzes),
+                "subject_quizzes": len(subject_ids), "chapter_quizzes": len(chapter_ids)}
+    coverage = {
+        name: round(warmed[name] / expected[name], 3) if expected[name] else 1.0
+        for name in expected
+    }
+
+    timings["total_ms"] = round((timer.perf_counter() - started) * 1000, 2)
+    return {
+        "date": day.isoformat(),
+        "quizzes": len(quizzes),
+        "warmed": warmed,
+        "coverage": coverage,
+        "timings": timings,
+        "ttl_seconds": timeout
+    }
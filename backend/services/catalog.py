@@ -0,0 +1,78 @@
+"""
+Subject -> chapter -> quiz catalog snapshots.
+
+The whole tree is built with one query per level, encoded to JSON bytes
+once and cached under the generation of the 'catalog' tag, which every
+subject, chapter and quiz write invalidates. Between hierarchy changes,
+catalog requests cost a single cache read, and clients revalidate with
+the snapshot's ETag.
+"""
+
+import hashlib
+import json
+
+from extensions import cache, db
+from models import Chapter, Quiz, Subject
+from services.cache_tags import tagged_key
+
+SNAPSHOT_TIMEOUT = 86400  # Rebuilt on hierarchy changes, so keep for a day
+
+
+def _user_quiz(quiz):
+    return {
+        "id": quiz.id,
+        "date": quiz.date_of_quiz.strftime('%Y-%m-%d') if quiz.date_of_quiz else None,
+        "duration": quiz.time_duration
+    }
+
+
+def _admin_quiz(quiz):
+    return {
+        "id": quiz.id,
+        "date": quiz.date_of_quiz.strftime('%Y-%m-%d') if quiz.date_of_quiz else None,
+        "time_duration": quiz.time_duration,
+        "remarks": quiz.remarks
+    }
+
+
+def build_catalog(admin=False):
+    """Return the catalog tree as a list of subjects with nested chapters and quizzes."""
+    subjects = db.session.query(Subject.id, Subject.name, Subject.description).order_by(Subject.id).all()
+    chapters = db.session.query(Chapter.id, Chapter.subject_id, Chapter.name, Chapter.description).order_by(Chapter.id).all()
+    quizzes = db.session.query(
+        Quiz.id, Quiz.chapter_id, Quiz.date_of_quiz, Quiz.time_duration, Quiz.remarks
+    ).order_by(Quiz.id).all()
+
+    quiz_fields = _admin_quiz if admin else _user_quiz
+    quizzes_by_chapter = {}
+    for quiz in quizzes:
+        quizzes_by_chapter.setdefault(quiz.chapter_id, []).append(quiz_fields(quiz))
+
+    chapters_by_subject = {}
+    for chapter in chapters:
+        node = {"id": chapter.id, "name": chapter.name, "quizzes": quizzes_by_chapter.get(chapter.id, [])}
+        if admin:
+            node["description"] = chapter.description
+        chapters_by_subject.setdefault(chapter.subject_id, []).append(node)
+
+    tree = []
+    for subject in subjects:
+        node = {"id": subject.id, "name": subject.name, "chapters": chapters_by_subject.get(subject.id, [])}
+        if admin:
+            node["description"] = subject.description
+        tree.append(node)
+    return tree
+
+
+def get_catalog_snapshot(admin=False, timeout=SNAPSHOT_TIMEOUT):
+    """Return (json_bytes, etag) for the current catalog tree."""
+    cache_key = tagged_key(f'catalog_snapshot_{"admin" if admin else "user"}', 'catalog')
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    payload = json.dumps(build_catalog(admin), separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(payload).hexdigest()[:32]
+
+    cache.set(cache_key, (payload, etag), timeout=timeout)
+    return payload, etag
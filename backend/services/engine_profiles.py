@@ -0,0 +1,86 @@
+"""
+Named database engine profiles.
+
+DB_PROFILE selects how the SQLAlchemy engine is tuned for a deployment:
+
+- dev: library defaults, suitable for a single local process
+- sqlite-prod: SQLite in WAL mode so web and Celery processes can read
+  while one of them writes, with a busy timeout instead of immediate
+  "database is locked" errors and larger page/mmap caches
+- server-db: pooled connections for PostgreSQL/MySQL with pre-ping and
+  recycling so idle connections dropped by the server are replaced
+
+Explicit SQLALCHEMY_ENGINE_OPTIONS in the app config override the profile.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from extensions import db
+
+ENGINE_PROFILES = {
+    "dev": {
+        "engine_options": {},
+        "pragmas": {},
+    },
+    "sqlite-prod": {
+        "engine_options": {
+            "poolclass": QueuePool,
+            "pool_size": 5,
+            "max_overflow": 10,
+            "connect_args": {"check_same_thread": False, "timeout": 30},
+        },
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 30000,  # Milliseconds
+            "mmap_size": 268435456,  # 256 MB
+            "cache_size": -65536,  # 64 MB (negative values are KiB)
+            "temp_store": "MEMORY",
+        },
+    },
+    "server-db": {
+        "engine_options": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "pool_pre_ping": True,
+            "pool_recycle": 1800,
+        },
+        "pragmas": {},
+    },
+}
+
+
+def apply_engine_profile(app):
+    """Merge the selected profile's engine options into the app config."""
+    name = app.config.get("DB_PROFILE") or "dev"
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{name}', expected one of: {', '.join(ENGINE_PROFILES)}")
+
+    profile = ENGINE_PROFILES[name]
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **profile["engine_options"],
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    }
+    app.config.setdefault("SQLITE_PRAGMAS", profile["pragmas"])
+
+
+def install_sqlite_pragmas(app):
+    """Run the profile's PRAGMA statements on every new SQLite connection. Needs an app context."""
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    if not pragmas:
+        return
+
+    binds = [None, *(app.config.get("SQLALCHEMY_BINDS") or {})]
+    for bind in binds:
+        engine = db.get_engine(app, bind=bind)
+        if engine.dialect.name != "sqlite":
+            continue
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
@@ -0,0 +1,94 @@
+"""
+Helpers that turn a submission into Score and AttemptAnswer rows.
+
+They only add work to the current session; callers decide when to commit,
+so the same code serves single requests and batched graders.
+"""
+
+from datetime import datetime, timezone
+
+from extensions import db
+from models import AttemptAnswer, Score
+from services.answer_keys import get_answer_key, mark_answers
+from services import quiz_stats, user_month_stats
+
+
+def record_scores(scores):
+    """Fold (quiz_id, user_id, total_score, timestamp) tuples into every score rollup."""
+    quiz_stats.record_scores(scores)
+    user_month_stats.record_scores(scores)
+
+
+def add_score(quiz_attempt, total_score, end_time=None, rollups=None):
+    """
+    Close the attempt and add its Score to the session. Batched callers pass
+    a `rollups` list to collect the score for one record_scores call.
+    """
+    quiz_attempt.end_time = end_time or datetime.now(timezone.utc)
+    score = Score(
+        quiz_attempt_id=quiz_attempt.id,
+        user_id=quiz_attempt.user_id,
+        total_score=total_score,
+        timestamp=quiz_attempt.end_time
+    )
+    db.session.add(score)
+    rollup = (quiz_attempt.quiz_id, quiz_attempt.user_id, total_score, quiz_attempt.end_time)
+    if rollups is None:
+        record_scores([rollup])
+    else:
+        rollups.append(rollup)
+    return score
+
+
+def score_answers(quiz_id, answers):
+    """
+    Mark submitted answers against the cached answer key without saving anything.
+    Returns the result plus the per-question response rows.
+    """
+    answer_key = get_answer_key(quiz_id)
+    responses = mark_answers(answer_key, answers)
+    correct_answers = sum(1 for answer in responses if answer["is_correct"])
+    total_questions = len(answer_key)
+
+    if total_questions == 0:
+        total_questions = 1  # Avoid division by zero
+
+    return {
+        "score": int((correct_answers / total_questions) * 100),
+        "correct": correct_answers,
+        "total": total_questions
+    }, responses
+
+
+def grade_attempt(quiz_attempt, answers, end_time=None, rollups=None):
+    """
+    Grade submitted answers against the cached answer key and add the Score.
+    Returns the result plus the per-question response rows to store.
+    """
+    result, responses = score_answers(quiz_attempt.quiz_id, answers)
+    add_score(quiz_attempt, result["score"], end_time, rollups)
+
+    for answer in responses:
+        answer["quiz_attempt_id"] = quiz_attempt.id
+
+    return result, responses
+
+
+def save_scores(scores):
+    """
+    Store Score rows ({quiz_id, quiz_attempt_id, user_id, total_score, timestamp})
+    with a single executemany insert and fold them into the rollups.
+    """
+    if not scores:
+        return
+    db.session.execute(Score.__table__.insert(), [
+        {key: value for key, value in score.items() if key != "quiz_id"} for score in scores
+    ])
+    record_scores([(score["quiz_id"], score["user_id"], score["total_score"], score["timestamp"])
+                   for score in scores])
+
+
+def save_responses(responses):
+    """Store response rows with a single executemany insert."""
+    if responses:
+        db.session.execute(AttemptAnswer.__table__.insert(), responses)
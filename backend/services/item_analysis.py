@@ -0,0 +1,161 @@
+"""
+Item analysis for quiz questions.
+
+Per-question responses from `attempt_answer` are folded into running
+sufficient statistics per quiz, so new attempts can be added without
+rescanning history. Each update builds an attempts x questions response
+matrix with NumPy and computes, in one vectorized pass:
+
+- p-value: share of attempts answering the question correctly
+- point-biserial discrimination: correlation between getting the question
+  right and the score on the remaining questions
+- distractor frequencies: how often each of options 1-4 was chosen
+"""
+
+import numpy as np
+
+from extensions import cache, db
+from models import AttemptAnswer, QuizAttempt
+from services.answer_keys import get_answer_key, get_quiz_version
+
+OPTIONS = np.arange(1, 5)
+
+# Thresholds used to flag questions for review
+EASY_THRESHOLD = 0.9
+HARD_THRESHOLD = 0.2
+LOW_DISCRIMINATION = 0.1
+
+
+def _state_key(quiz_id):
+    return f'item_analysis_{quiz_id}'
+
+
+def _empty_state(quiz_id):
+    question_ids = np.array(sorted(get_answer_key(quiz_id)), dtype=np.int64)
+    k = len(question_ids)
+    return {
+        "version": get_quiz_version(quiz_id),
+        "last_answer_id": 0,
+        "question_ids": question_ids,
+        "n": 0,
+        "sum_total": 0.0,
+        "sum_total_sq": 0.0,
+        "sum_correct": np.zeros(k),
+        "sum_correct_total": np.zeros(k),
+        "option_counts": np.zeros((k, len(OPTIONS)), dtype=np.int64),
+    }
+
+
+def _fold_responses(state, rows):
+    """Add a batch of (attempt_id, question_id, selected_option, is_correct) rows to the state."""
+    rows = np.array(rows, dtype=np.int64)
+    question_ids = state["question_ids"]
+    if len(question_ids) == 0:
+        return
+
+    # Drop answers to questions that are no longer part of the quiz
+    columns = np.searchsorted(question_ids, rows[:, 1]).clip(max=len(question_ids) - 1)
+    known = question_ids[columns] == rows[:, 1]
+    rows, columns = rows[known], columns[known]
+
+    attempt_ids, row_index = np.unique(rows[:, 0], return_inverse=True)
+    shape = (len(attempt_ids), len(question_ids))
+
+    selected = np.zeros(shape, dtype=np.int64)
+    selected[row_index, columns] = rows[:, 2]
+    correct = np.zeros(shape)
+    correct[row_index, columns] = rows[:, 3]
+
+    totals = correct.sum(axis=1)
+    state["n"] += len(attempt_ids)
+    state["sum_total"] += totals.sum()
+    state["sum_total_sq"] += (totals ** 2).sum()
+    state["sum_correct"] += correct.sum(axis=0)
+    state["sum_correct_total"] += correct.T @ totals
+    state["option_counts"] += (selected[:, :, None] == OPTIONS).sum(axis=0)
+
+
+def update_item_analysis(quiz_id):
+    """
+    Fold responses recorded since the last update into the quiz's statistics.
+    The state is rebuilt from scratch if the quiz content version changed.
+    """
+    state = cache.get(_state_key(quiz_id))
+    if state is None or state["version"] != get_quiz_version(quiz_id):
+        state = _empty_state(quiz_id)
+
+    rows = db.session.query(
+        AttemptAnswer.id,
+        AttemptAnswer.quiz_attempt_id,
+        AttemptAnswer.question_id,
+        AttemptAnswer.selected_option,
+        AttemptAnswer.is_correct
+    ).join(
+        QuizAttempt, AttemptAnswer.quiz_attempt_id == QuizAttempt.id
+    ).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        AttemptAnswer.id > state["last_answer_id"]
+    ).all()
+
+    if rows:
+        state["last_answer_id"] = max(row.id for row in rows)
+        _fold_responses(state, [
+            (row.quiz_attempt_id, row.question_id, row.selected_option or 0, int(row.is_correct))
+            for row in rows
+        ])
+
+    cache.set(_state_key(quiz_id), state, timeout=0)
+    return state
+
+
+def summarize_item_analysis(state):
+    """Turn the running statistics into per-question results."""
+    n = state["n"]
+    question_ids = state["question_ids"]
+    if n == 0:
+        return {"attempts": 0, "questions": [
+            {"question_id": int(qid), "p_value": None, "discrimination": None,
+             "option_counts": {str(o): 0 for o in OPTIONS}, "omitted": 0, "flags": []}
+            for qid in question_ids
+        ]}
+
+    sum_correct = state["sum_correct"]
+    p_values = sum_correct / n
+
+    # Rest score excludes the item itself (corrected item-total correlation)
+    sum_rest = state["sum_total"] - sum_correct
+    sum_rest_sq = state["sum_total_sq"] - 2 * state["sum_correct_total"] + sum_correct
+    sum_correct_rest = state["sum_correct_total"] - sum_correct
+
+    mean_rest = sum_rest / n
+    covariance = sum_correct_rest / n - p_values * mean_rest
+    variance = p_values * (1 - p_values) * (sum_rest_sq / n - mean_rest ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discrimination = np.where(variance > 0, covariance / np.sqrt(variance), np.nan)
+
+    option_counts = state["option_counts"]
+    omitted = n - option_counts.sum(axis=1)
+
+    questions = []
+    for i, qid in enumerate(question_ids):
+        p_value = float(p_values[i])
+        d = None if np.isnan(discrimination[i]) else round(float(discrimination[i]), 3)
+
+        flags = []
+        if p_value >= EASY_THRESHOLD:
+            flags.append("too_easy")
+        if p_value <= HARD_THRESHOLD:
+            flags.append("too_hard")
+        if d is not None and d < LOW_DISCRIMINATION:
+            flags.append("misleading" if d < 0 else "low_discrimination")
+
+        questions.append({
+            "question_id": int(qid),
+            "p_value": round(p_value, 3),
+            "discrimination": d,
+            "option_counts": {str(o): int(c) for o, c in zip(OPTIONS, option_counts[i])},
+            "omitted": int(omitted[i]),
+            "flags": flags
+        })
+
+    return {"attempts": int(n), "questions": questions}
@@ -0,0 +1,125 @@
+"""
+Write-behind last_login timestamps.
+
+With COALESCE_LOGINS enabled, login records the time in a Redis hash
+(one field per user, so repeated logins overwrite each other) instead of
+committing to the user table. A Celery task moves the hash aside with
+RENAME and writes it back in one bulk UPDATE, so a burst of logins costs
+one transaction per flush rather than one per login. A flush that dies
+midway leaves the renamed hash behind for the next one.
+
+Reads that need a fresh value - /me and the daily reminder - combine the
+column with pending_logins().
+"""
+
+from datetime import datetime, timezone
+
+import redis
+from flask import current_app
+from sqlalchemy import bindparam, or_
+
+from extensions import db
+from models import User
+
+BUFFER_KEY = 'login_times'
+FLUSHING_KEY = 'login_times:flushing'
+LOCK_KEY = 'login_times:lock'
+LOCK_TIMEOUT = 60
+
+
+def get_buffer_client():
+    """Return the Redis client holding buffered login times."""
+    client = current_app.extensions.get('login_times')
+    if client is None:
+        client = redis.Redis.from_url(current_app.config["LOGIN_BUFFER_URL"])
+        current_app.extensions['login_times'] = client
+    return client
+
+
+def _utc(value):
+    """Naive UTC datetime, as the column returns it."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def record_login(user, when=None):
+    """Record a login, buffered or committed depending on COALESCE_LOGINS."""
+    when = when or datetime.now(timezone.utc)
+    if not current_app.config.get("COALESCE_LOGINS"):
+        user.last_login = when
+        db.session.commit()
+        return
+    get_buffer_client().hset(BUFFER_KEY, user.id, when.isoformat())
+
+
+def pending_logins(user_ids=None):
+    """Return {user_id: naive UTC datetime} for logins not yet flushed."""
+    if not current_app.config.get("COALESCE_LOGINS"):
+        return {}
+    client = get_buffer_client()
+    pipe = client.pipeline()
+    if user_ids is None:
+        pipe.hgetall(FLUSHING_KEY)
+        pipe.hgetall(BUFFER_KEY)
+        flushing, buffered = pipe.execute()
+    else:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        pipe.hmget(FLUSHING_KEY, user_ids)
+        pipe.hmget(BUFFER_KEY, user_ids)
+        flushing, buffered = [dict(zip(user_ids, values)) for values in pipe.execute()]
+
+    pending = {}
+    for values in (flushing, buffered):  # Buffered entries are the newer ones
+        for user_id, value in values.items():
+            if value:
+                pending[int(user_id)] = _utc(datetime.fromisoformat(value.decode()))
+    return pending
+
+
+def latest_login(user):
+    """The user's last login, including one that has not been flushed yet."""
+    pending = pending_logins([user.id]).get(user.id)
+    if pending is None or (user.last_login and _utc(user.last_login) >= pending):
+        return user.last_login
+    return pending
+
+
+def flush_logins():
+    """
+    Write buffered login times to the user table in one transaction.
+    Only one flush runs at a time; returns the number of users updated.
+    """
+    client = get_buffer_client()
+    if not client.set(LOCK_KEY, "1", nx=True, ex=LOCK_TIMEOUT):
+        return 0
+
+    try:
+        # Resume a flush that died after moving the buffer aside
+        if not client.exists(FLUSHING_KEY):
+            try:
+                client.rename(BUFFER_KEY, FLUSHING_KEY)
+            except redis.ResponseError:
+                return 0  # Nothing buffered
+
+        rows = [
+            {"user_id": int(user_id), "login": datetime.fromisoformat(value.decode())}
+            for user_id, value in client.hgetall(FLUSHING_KEY).items()
+        ]
+        if rows:
+            statement = User.__table__.update().where(
+                User.id == bindparam("user_id"),
+                or_(User.last_login.is_(None), User.last_login < bindparam("login"))
+            ).values(last_login=bindparam("login"))
+            try:
+                db.session.execute(statement, rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        client.delete(FLUSHING_KEY)
+        return len(rows)
+    finally:
+        client.delete(LOCK_KEY)
@@ -0,0 +1,233 @@
+"""
+Two-tier cache backend: a per-process LRU in front of Redis.
+
+Select it with CACHE_TYPE=services.near_cache.NearRedisCache. Reads are
+served from a bounded in-process LRU when possible and fall back to Redis.
+Writes go to Redis and are published on a pub/sub channel, so every other
+process drops its local copy of the changed keys.
+
+Local entries keep the serialized bytes rather than the value itself, so
+callers never share (and mutate) one object, and they expire with the
+Redis key or after NEAR_CACHE_TTL seconds, whichever is sooner. The TTL
+bounds staleness if an invalidation message is ever lost; a dropped
+subscription also clears the local tier.
+
+Settings:
+- NEAR_CACHE_MAX_ENTRIES: local entries per process (default 1024)
+- NEAR_CACHE_TTL: longest a local entry is served, in seconds (default 5)
+- NEAR_CACHE_CHANNEL: invalidation channel (default 'cache_invalidation')
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask_caching.backends.rediscache import RedisCache
+
+CLEAR_ALL = '*'
+
+
+class NearRedisCache(RedisCache):
+    def __init__(self, *args, max_entries=1024, near_ttl=5, channel='cache_invalidation', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_entries = max_entries
+        self.near_ttl = near_ttl
+        self.channel = channel
+        self.node_id = uuid.uuid4().hex
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._epoch = 0  # Bumped on every invalidation, so a read racing one is not kept locally
+        self._stats = {"local_hits": 0, "remote_hits": 0, "misses": 0, "invalidations": 0}
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            max_entries=int(config.get("NEAR_CACHE_MAX_ENTRIES", 1024)),
+            near_ttl=float(config.get("NEAR_CACHE_TTL", 5)),
+            channel=config.get("NEAR_CACHE_CHANNEL", "cache_invalidation"),
+        )
+        return super().factory(app, config, args, kwargs)
+
+    ### Local tier ###
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return raw
+
+    def _local_set(self, key, raw, ttl):
+        """Keep `raw` for at most `ttl` seconds (None: no remote expiry)."""
+        ttl = self.near_ttl if ttl is None else min(ttl, self.near_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, raw)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _local_discard(self, keys):
+        with self._lock:
+            self._epoch += 1
+            if CLEAR_ALL in keys:
+                self._local.clear()
+            else:
+                for key in keys:
+                    self._local.pop(key, None)
+
+    ### Invalidation channel ###
+
+    def _publish(self, keys):
+        self._local_discard(keys)
+        message = json.dumps({"node": self.node_id, "keys": list(keys)})
+        self._write_client.publish(self.channel, message)
+
+    def _ensure_listener(self):
+        # Started lazily and again after a fork, since threads do not survive fork()
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._local.clear()
+        threading.Thread(target=self._listen, name="near-cache-invalidation", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            pubsub = self._write_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self._local_discard([CLEAR_ALL])  # Anything cached before subscribing may have missed a message
+                for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload["node"] != self.node_id:
+                        self._stats["invalidations"] += 1
+                        self._local_discard(payload["keys"])
+            except Exception:
+                self._local_discard([CLEAR_ALL])
+                time.sleep(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    ### Reads ###
+
+    def _fetch(self, keys):
+        """Read keys and their remaining TTLs from Redis in one round trip."""
+        prefix = self._get_prefix()
+        pipe = self._read_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(f"{prefix}{key}")
+            pipe.pttl(f"{prefix}{key}")
+        results = pipe.execute()
+        return [(results[i], results[i + 1]) for i in range(0, len(results), 2)]
+
+    def _remember(self, key, raw, pttl, epoch):
+        if raw is None:
+            self._stats["misses"] += 1
+            return
+        self._stats["remote_hits"] += 1
+        if epoch == self._epoch:
+            self._local_set(key, raw, None if pttl is None or pttl < 0 else pttl / 1000)
+
+    def get(self, key):
+        self._ensure_listener()
+        raw = self._local_get(key)
+        if raw is not None:
+            self._stats["local_hits"] += 1
+            return self.serializer.loads(raw)
+
+        epoch = self._epoch
+        ((raw, pttl),) = self._fetch([key])
+        self._remember(key, raw, pttl, epoch)
+        return self.serializer.loads(raw)
+
+    def get_many(self, *keys):
+        self._ensure_listener()
+        raws = [self._local_get(key) for key in keys]
+        self._stats["local_hits"] += sum(raw is not None for raw in raws)
+
+        missing = [i for i, raw in enumerate(raws) if raw is None]
+        if missing:
+            epoch = self._epoch
+            for i, (raw, pttl) in zip(missing, self._fetch([keys[i] for i in missing])):
+                self._remember(keys[i], raw, pttl, epoch)
+                raws[i] = raw
+        return [self.serializer.loads(raw) for raw in raws]
+
+    def has(self, key):
+        return self._local_get(key) is not None or super().has(key)
+
+    ### Writes ###
+
+    def set(self, key, value, timeout=None):
+        self._ensure_listener()
+        result = super().set(key, value, timeout=timeout)
+        self._publish([key])
+        timeout = self._normalize_timeout(timeout)
+        self._local_set(key, self.serializer.dumps(value), timeout if timeout > 0 else None)
+        return result
+
+    def add(self, key, value, timeout=None):
+        result = super().add(key, value, timeout=timeout)
+        if result:
+            self._publish([key])
+        return result
+
+    def set_many(self, mapping, timeout=None):
+        result = super().set_many(mapping, timeout=timeout)
+        self._publish(list(mapping))
+        return result
+
+    def delete(self, key):
+        result = super().delete(key)
+        self._publish([key])
+        return result
+
+    def delete_many(self, *keys):
+        result = super().delete_many(*keys)
+        self._publish(keys)
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._publish([CLEAR_ALL])
+        return result
+
+    def inc(self, key, delta=1):
+        result = super().inc(key, delta=delta)
+        self._publish([key])
+        return result
+
+    def dec(self, key, delta=1):
+        result = super().dec(key, delta=delta)
+        self._publish([key])
+        return result
+
+    ### Reporting ###
+
+    def stats(self):
+        """Hit counts and ratios for this process."""
+        stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["remote_hits"] + stats["misses"]
+        stats["local_entries"] = len(self._local)
+        stats["local_hit_ratio"] = round(stats["local_hits"] / lookups, 3) if lookups else 0.0
+        stats["remote_hit_ratio"] = round(stats["remote_hits"] / lookups, 3) if lookups else 0.0
+        stats["hit_ratio"] = round((stats["local_hits"] + stats["remote_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
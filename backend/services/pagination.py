@@ -0,0 +1,66 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with `WHERE id > :last_id ORDER BY id LIMIT :n` instead of
+OFFSET, so a page costs one index range scan however deep it is, and rows
+inserted while a client is paging never shift or repeat the rows it has
+not seen yet.
+
+Cursors are opaque to clients: the last row's id, base64-encoded.
+"""
+
+import base64
+import json
+
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(json.dumps([last_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the id stored in a cursor, raising ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        (last_id,) = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(last_id, int):
+        raise ValueError('Invalid cursor')
+    return last_id
+
+
+def page_args(default_limit=DEFAULT_PAGE_SIZE):
+    """Read `?after=<cursor>&limit=<n>` from the request. Raises ValueError on bad input."""
+    after = request.args.get('after')
+    after = decode_cursor(after) if after else None
+
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return after, min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, id_column, after=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """
+    Fetch one page of `query` ordered by `id_column`.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if after is not None:
+        query = query.filter(id_column < after if descending else id_column > after)
+    query = query.order_by(id_column.desc() if descending else id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,107 @@
+"""
+Password hashing off the request thread.
+
+bcrypt is deliberately slow, so a burst of logins at exam start would
+otherwise keep every web worker busy hashing. Hashing and verification
+run in a small process pool instead:
+
+- PASSWORD_HASH_WORKERS: pool processes per web worker (default 2;
+  0 hashes inline, e.g. for the CLI or Celery)
+- PASSWORD_HASH_QUEUE_LIMIT: jobs allowed to wait for a process before
+  new ones are refused with PasswordHashingBusy (default 16)
+- PASSWORD_HASH_TIMEOUT: longest a request waits for its result (default 10s)
+- BCRYPT_LOG_ROUNDS: bcrypt cost for new hashes (default 12). Hashes made
+  with another cost are upgraded on the next successful login.
+
+Hashes are plain $2b$ bcrypt, as Flask-Bcrypt produced them. Passwords
+are cut to bcrypt's 72-byte limit, as older bcrypt releases did silently.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import bcrypt
+from flask import current_app
+
+MAX_PASSWORD_BYTES = 72
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing queue is full or a job took too long; the client should retry."""
+
+
+def _encode(password):
+    return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(pwhash, password):
+    try:
+        return bcrypt.checkpw(_encode(password), pwhash.encode('utf-8'))
+    except ValueError:  # Not a bcrypt hash
+        return False
+
+
+def _get_pool(workers, queue_limit):
+    global _pool, _pool_pid, _slots
+    # A forked web worker must not share its parent's pool
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=workers)
+                _slots = threading.BoundedSemaphore(workers + queue_limit)
+                _pool_pid = os.getpid()
+    return _pool, _slots
+
+
+def _run(fn, *args):
+    config = current_app.config
+    workers = int(config.get('PASSWORD_HASH_WORKERS', 2))
+    if workers <= 0:
+        return fn(*args)
+
+    pool, slots = _get_pool(workers, int(config.get('PASSWORD_HASH_QUEUE_LIMIT', 16)))
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=float(config.get('PASSWORD_HASH_TIMEOUT', 10)))
+    except FutureTimeout:
+        raise PasswordHashingBusy()
+
+
+def configured_rounds():
+    return int(current_app.config.get('BCRYPT_LOG_ROUNDS', 12))
+
+
+def hash_password(password):
+    """Return a bcrypt hash of `password` at the configured cost."""
+    return _run(_hash, password, configured_rounds())
+
+
+def verify_password(pwhash, password):
+    """Check `password` against a bcrypt hash."""
+    return _run(_verify, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True if `pwhash` was made with a different cost than the configured one."""
+    try:
+        return int(pwhash.split('$')[2]) != configured_rounds()
+    except (IndexError, ValueError):
+        return True
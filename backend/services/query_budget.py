@@ -0,0 +1,108 @@
+"""
+Per-endpoint SQL statement budgets.
+
+Views decorated with `query_budget(n)` count the statements they issue
+(authentication lookups in outer decorators are not counted). Going over
+budget is logged, or raised as an AssertionError when QUERY_BUDGET_STRICT
+is set, so an N+1 pattern shows up as soon as a lazy load sneaks back into
+a loop.
+
+`flask check-query-counts` calls every budgeted endpoint against the
+current database and fails if any of them goes over budget.
+"""
+
+from functools import wraps
+
+import click
+from flask import current_app, g, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import event, func
+
+from extensions import db
+from services.auth_tokens import issue_token
+from services.cache_tags import invalidate, user_tag
+
+BUDGETS = {}
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and g.get('query_count') is not None:
+        g.query_count += 1
+
+
+def install_query_counter(app):
+    """Count statements on every engine, including binds. Needs an app context."""
+    for bind in [None, *(app.config.get('SQLALCHEMY_BINDS') or {})]:
+        event.listen(db.get_engine(app, bind=bind), 'before_cursor_execute', _count_statement)
+
+
+def query_budget(max_queries):
+    """Limit the number of SQL statements a view may issue."""
+    def decorator(fn):
+        BUDGETS[fn.__name__] = max_queries
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            outer = g.get('query_count')
+            g.query_count = 0
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                count = g.query_count
+                g.query_count = None if outer is None else outer + count
+                g.last_query_count = count
+                if count > max_queries:
+                    message = f'{fn.__name__} issued {count} SQL statements (budget {max_queries})'
+                    if current_app.config.get('QUERY_BUDGET_STRICT'):
+                        raise AssertionError(message)
+                    current_app.logger.warning(message)
+        return wrapper
+    return decorator
+
+
+def _budget_requests():
+    """Return (view name, url, user) for each budgeted endpoint, using the busiest rows in the database."""
+    from models import Quiz, QuizAttempt, User  # Import here to avoid circular import
+
+    admin = User.query.filter_by(role='admin').first()
+    busiest = db.session.query(QuizAttempt.user_id).group_by(QuizAttempt.user_id).order_by(
+        func.count(QuizAttempt.id).desc()
+    ).first()
+    user = User.query.get(busiest.user_id) if busiest else admin
+    quiz = Quiz.query.filter(Quiz.remarks.isnot(None), Quiz.remarks != '').first()
+    term = quiz.remarks[:3] if quiz else '1'
+
+    return [
+        ('get_users', '/admin/users?limit=200', admin),
+        ('get_user_attempts', f'/admin/users/{user.id}/attempts?limit=200', admin),
+        ('search_quizzes', f'/admin/search/quizzes?q={term}', admin),
+        ('get_user_history_route', '/user/history?limit=200', user),
+    ]
+
+
+@click.command('check-query-counts')
+@with_appcontext
+def check_query_counts_command():
+    """Fail if any budgeted endpoint issues more SQL statements than its budget."""
+    app = current_app._get_current_object()
+    client = app.test_client()
+    failures = 0
+    for name, url, user in _budget_requests():
+        db.session.remove()
+        invalidate(user_tag(user.id))  # Measure the view, not a cached response
+        token = issue_token(user)
+
+        # The test request reuses this app context, so its count is left on g
+        g.last_query_count = None
+        response = client.get(url, headers={'Authorization': f'Bearer {token}'})
+
+        count = g.get('last_query_count')
+        budget = BUDGETS[name]
+        if response.status_code != 200 or count is None or count > budget:
+            failures += 1
+            click.echo(f'FAIL {name}: {count} statements (budget {budget}), HTTP {response.status_code}')
+        else:
+            click.echo(f'OK   {name}: {count} statements (budget {budget})')
+
+    if failures:
+        raise SystemExit(1)
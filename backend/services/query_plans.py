@@ -0,0 +1,171 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot queries in routes/ and jobs/tasks.py.
+
+Each entry rebuilds a query the way the application issues it, calling the
+application's own query builder where it has one, and lists the tables it
+is allowed to scan in full (e.g. the driving table of a report over every
+quiz). Anything else must be resolved through an index; a full scan or an
+automatic index means an index is missing.
+
+Run with `flask check-query-plans` against a SQLite database.
+"""
+
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from extensions import db
+from models import (AttemptAnswer, Chapter, Question, Quiz, QuizAttempt, QuizStats, Score, Subject, User,
+                    UserMonthSubjectStats)
+from services.user_month_stats import monthly_rankings_query
+
+NOW = datetime(2026, 1, 1)
+
+
+def _hot_queries():
+    """Return (name, query, tables allowed to be scanned in full)."""
+    session = db.session
+    return [
+        # routes/user.py
+        ("user.get_quizzes", Quiz.query.join(Chapter).filter(Chapter.subject_id == 1), set()),
+        ("user.active_attempt", QuizAttempt.query.filter_by(user_id=1, quiz_id=1, end_time=None), set()),
+        ("user.answer_key", session.query(Question.id, Question.correct_option).filter(Question.quiz_id == 1), set()),
+        ("user.questions_payload", Question.query.filter_by(quiz_id=1), set()),
+        ("user.review_attempt", session.query(AttemptAnswer.question_id, Question.question_text).join(
+            QuizAttempt, AttemptAnswer.quiz_attempt_id == QuizAttempt.id
+        ).join(
+            Question, AttemptAnswer.question_id == Question.id
+        ).filter(AttemptAnswer.quiz_attempt_id == 1, QuizAttempt.user_id == 1), set()),
+        ("user.history_page", QuizAttempt.query.filter(
+            QuizAttempt.user_id == 1, QuizAttempt.id < 1
+        ).order_by(QuizAttempt.id.desc()).limit(51), set()),
+        ("user.history_score", Score.query.filter_by(quiz_attempt_id=1), set()),
+        ("user.history_summary", session.query(
+            func.count(QuizAttempt.id), func.avg(Score.total_score), func.max(Score.total_score)
+        ).outerjoin(Score, Score.quiz_attempt_id == QuizAttempt.id).filter(QuizAttempt.user_id == 1), set()),
+
+        # services/catalog.py (reads every row of each level by design)
+        ("catalog.subjects", session.query(Subject.id, Subject.name).order_by(Subject.id), {"subject"}),
+        ("catalog.chapters", session.query(Chapter.id, Chapter.subject_id).order_by(Chapter.id), {"chapter"}),
+        ("catalog.quizzes", session.query(Quiz.id, Quiz.chapter_id).order_by(Quiz.id), {"quiz"}),
+
+        # routes/admin.py
+        ("admin.recent_users", User.query.order_by(User.created_at.desc()).limit(5), set()),
+        ("admin.quiz_statistics", session.query(
+            Quiz.id, QuizStats.attempt_count, QuizStats.score_sum
+        ).outerjoin(QuizStats, QuizStats.quiz_id == Quiz.id).order_by(Quiz.id).limit(5), {"quiz"}),
+        ("admin.subject_statistics", session.query(
+            Subject.name, func.count(Chapter.id)
+        ).outerjoin(Chapter).group_by(Subject.id), {"subject"}),
+        ("admin.get_chapters", Chapter.query.filter_by(subject_id=1), set()),
+        ("admin.get_quizzes", Quiz.query.filter_by(chapter_id=1), set()),
+        ("admin.get_questions", Question.query.filter_by(quiz_id=1), set()),
+        ("admin.users_page", User.query.filter(User.id > 1).order_by(User.id).limit(51), set()),
+        ("admin.user_attempts_page", QuizAttempt.query.filter(
+            QuizAttempt.user_id == 1, QuizAttempt.id < 1
+        ).order_by(QuizAttempt.id.desc()).limit(51), set()),
+        ("admin.item_analysis", session.query(AttemptAnswer.id).join(
+            QuizAttempt, AttemptAnswer.quiz_attempt_id == QuizAttempt.id
+        ).filter(QuizAttempt.quiz_id == 1, AttemptAnswer.id > 0), set()),
+
+        # jobs/tasks.py
+        ("tasks.daily_email_users", User.query.filter(User.last_login < NOW), set()),
+        ("tasks.export_user_statistics", session.query(
+            User.id, func.count(QuizAttempt.id), func.avg(Score.total_score)
+        ).outerjoin(QuizAttempt, User.id == QuizAttempt.user_id).outerjoin(
+            Score, QuizAttempt.id == Score.quiz_attempt_id
+        ).filter(User.role == 'user').group_by(User.id), {"user"}),
+        ("tasks.export_quiz_statistics", session.query(
+            Quiz.id, QuizStats.attempt_count, QuizStats.min_score
+        ).outerjoin(QuizStats, Quiz.id == QuizStats.quiz_id), {"quiz"}),
+        ("tasks.export_user_attempts", session.query(QuizAttempt.id, Subject.name, Score.total_score).join(
+            Quiz, QuizAttempt.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        ).outerjoin(
+            Score, QuizAttempt.id == Score.quiz_attempt_id
+        ).filter(
+            QuizAttempt.user_id == 1, QuizAttempt.end_time != None
+        ).order_by(QuizAttempt.end_time.desc()), set()),
+        ("tasks.monthly_rankings", monthly_rankings_query('2026-01'), set()),
+        ("tasks.monthly_attempts", session.query(QuizAttempt.user_id, Subject.name, Score.total_score).join(
+            Quiz, QuizAttempt.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        ).join(
+            Score, QuizAttempt.id == Score.quiz_attempt_id
+        ).filter(
+            QuizAttempt.end_time != None,
+            QuizAttempt.end_time >= NOW,
+            QuizAttempt.end_time < NOW
+        ), set()),
+        ("tasks.monthly_subject_stats", session.query(UserMonthSubjectStats.user_id, Subject.name).join(
+            Subject, Subject.id == UserMonthSubjectStats.subject_id
+        ).filter(UserMonthSubjectStats.month == '2026-01'), set()),
+        ("tasks.monthly_new_quizzes", session.query(Quiz, Chapter, Subject).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Subject, Chapter.subject_id == Subject.id
+        ).filter(Quiz.date_of_quiz >= NOW.date(), Quiz.date_of_quiz <= NOW.date()), set()),
+    ]
+
+
+def explain_sql(connection, statement, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines of a SQL statement."""
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def explain(query):
+    """Return the EXPLAIN QUERY PLAN detail lines of an ORM query."""
+    connection = db.session.connection()
+    compiled = query.statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    # Plans don't depend on parameter values, so every placeholder gets NULL
+    return explain_sql(connection, compiled, tuple(None for _ in (compiled.positiontup or [])))
+
+
+def full_scans(plan, allowed):
+    """Return plan lines that read a table without an index."""
+    problems = []
+    for line in plan:
+        words = line.split()
+        if "AUTOMATIC" in words:
+            problems.append(line)
+        elif words[:1] == ["SCAN"] and "USING" not in words:
+            table = words[2] if words[1] == "TABLE" else words[1]
+            # Scans of materialized subqueries (e.g. window functions) read no table
+            if not table.startswith("(") and table not in allowed:
+                problems.append(line)
+    return problems
+
+
+def check_query_plans():
+    """Return {query name: offending plan lines} for every hot query that regressed."""
+    failures = {}
+    for name, query, allowed in _hot_queries():
+        problems = full_scans(explain(query), allowed)
+        if problems:
+            failures[name] = problems
+    return failures
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot query falls back to a full table scan (SQLite only)."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("EXPLAIN QUERY PLAN checks only run against SQLite")
+
+    failures = check_query_plans()
+    for name, problems in failures.items():
+        for line in problems:
+            click.echo(f"FAIL {name}: {line}")
+    if failures:
+        raise SystemExit(1)
+    click.echo(f"OK: {len(_hot_queries())} hot queries use indexes")
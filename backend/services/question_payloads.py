@@ -0,0 +1,42 @@
+"""
+Pre-encoded question payloads for quiz attempts.
+
+The questions of a quiz are encoded to JSON bytes once per content version
+and cached with a strong ETag derived from the bytes. Start and poll
+responses only carry that ETag (as `questions_etag`); clients fetch the
+bytes from /user/quiz/<id>/questions, revalidating with If-None-Match, or
+skip the request when their stored copy already has that ETag.
+"""
+
+import hashlib
+import json
+
+from extensions import cache
+from models import Question
+from services.answer_keys import get_quiz_version
+
+PAYLOAD_TIMEOUT = 900  # Cache for 15 minutes
+
+
+def get_questions_payload(quiz_id, timeout=PAYLOAD_TIMEOUT, refresh=False):
+    """Return (json_bytes, etag) for the questions of a quiz."""
+    cache_key = f'quiz_questions_payload_{quiz_id}_v{get_quiz_version(quiz_id)}'
+    cached = None if refresh else cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    questions = Question.query.filter_by(quiz_id=quiz_id).all()
+    payload = json.dumps([{
+        "id": q.id,
+        "question": q.question_text,
+        "options": [q.option1, q.option2, q.option3, q.option4]
+    } for q in questions], separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(payload).hexdigest()[:32]
+
+    cache.set(cache_key, (payload, etag), timeout=timeout)
+    return payload, etag
+
+
+def get_questions_etag(quiz_id):
+    """Return the ETag of the quiz's current questions payload."""
+    return get_questions_payload(quiz_id)[1]
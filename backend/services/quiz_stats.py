@@ -0,0 +1,96 @@
+"""
+Maintenance of the quiz_stats rollup.
+
+Every Score insert goes through record_scores in the same transaction, so
+statistics endpoints and exports can read one row per quiz instead of
+aggregating over all attempts. rebuild_quiz_stats backfills the table
+from the score history.
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, case, func
+
+from extensions import db
+from models import QuizAttempt, QuizStats, Score
+from services.upserts import insert_missing
+
+
+def record_scores(scores):
+    """
+    Fold new scores into the rollup. `scores` is a list of
+    (quiz_id, user_id, total_score, timestamp) tuples; nothing is committed.
+    """
+    if not scores:
+        return
+
+    # Aggregate per quiz first so each quiz gets one UPDATE
+    totals = {}
+    for quiz_id, _, total_score, timestamp in scores:
+        entry = totals.setdefault(quiz_id, {"q_id": quiz_id, "n": 0, "s": 0, "sq": 0,
+                                            "mn": total_score, "mx": total_score, "ts": timestamp})
+        entry["n"] += 1
+        entry["s"] += total_score
+        entry["sq"] += total_score * total_score
+        entry["mn"] = min(entry["mn"], total_score)
+        entry["mx"] = max(entry["mx"], total_score)
+        entry["ts"] = max(entry["ts"], timestamp)
+
+    table = QuizStats.__table__
+    insert_missing(table, [{"quiz_id": quiz_id, "attempt_count": 0, "score_sum": 0, "score_sq_sum": 0}
+                           for quiz_id in totals], ["quiz_id"])
+
+    db.session.execute(
+        table.update().where(table.c.quiz_id == bindparam("q_id")).values(
+            attempt_count=table.c.attempt_count + bindparam("n"),
+            score_sum=table.c.score_sum + bindparam("s"),
+            score_sq_sum=table.c.score_sq_sum + bindparam("sq"),
+            min_score=case(
+                (table.c.min_score == None, bindparam("mn")),
+                (table.c.min_score > bindparam("mn"), bindparam("mn")),
+                else_=table.c.min_score
+            ),
+            max_score=case(
+                (table.c.max_score == None, bindparam("mx")),
+                (table.c.max_score < bindparam("mx"), bindparam("mx")),
+                else_=table.c.max_score
+            ),
+            last_attempt_at=case(
+                (table.c.last_attempt_at == None, bindparam("ts")),
+                (table.c.last_attempt_at < bindparam("ts"), bindparam("ts")),
+                else_=table.c.last_attempt_at
+            )
+        ),
+        list(totals.values())
+    )
+
+
+def rebuild_quiz_stats():
+    """Recompute the whole rollup from the score table. Returns the number of quizzes."""
+    db.session.query(QuizStats).delete(synchronize_session=False)
+    aggregates = db.session.query(
+        QuizAttempt.quiz_id,
+        func.count(Score.id),
+        func.sum(Score.total_score),
+        func.sum(Score.total_score * Score.total_score),
+        func.min(Score.total_score),
+        func.max(Score.total_score),
+        func.max(Score.timestamp)
+    ).join(
+        QuizAttempt, Score.quiz_attempt_id == QuizAttempt.id
+    ).group_by(
+        QuizAttempt.quiz_id
+    )
+    db.session.execute(QuizStats.__table__.insert().from_select(
+        ["quiz_id", "attempt_count", "score_sum", "score_sq_sum", "min_score", "max_score", "last_attempt_at"],
+        aggregates
+    ))
+    db.session.commit()
+    return QuizStats.query.count()
+
+
+@click.command("rebuild-quiz-stats")
+@with_appcontext
+def rebuild_quiz_stats_command():
+    """Backfill the quiz_stats rollup from existing scores."""
+    click.echo(f"Rebuilt statistics for {rebuild_quiz_stats()} quizzes")
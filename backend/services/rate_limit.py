@@ -0,0 +1,182 @@
+"""
+Token-bucket rate limiting for expensive endpoints.
+
+`rate_limit(name, ip=..., identity=...)` gives a view one bucket per
+client IP and/or one per identity (the JWT identity by default). A limit
+such as '5/minute' holds 5 tokens and refills at 5 per minute, so short
+bursts pass and sustained traffic is held to the rate. A request takes a
+token from every bucket it belongs to, or from none if any of them is
+empty, and is then answered with 429 and Retry-After.
+
+Buckets live in Redis (RATE_LIMIT_URL) and are updated by one Lua script,
+so every web worker shares them and concurrent requests cannot both take
+the last token. If Redis is unreachable, each process falls back to its
+own in-memory buckets and tries Redis again after REDIS_RETRY_SECONDS.
+
+Settings:
+- RATE_LIMIT_ENABLED: turn limiting off entirely (default true)
+- RATE_LIMIT_URL: Redis URL for the buckets (default CELERY_BROKER_URL;
+  unset keeps buckets in process)
+- RATE_LIMITS: per-route overrides, e.g. 'login.ip=50/minute,register.ip=off'
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import redis
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+REDIS_RETRY_SECONDS = 5
+LOCAL_MAX_BUCKETS = 10000
+
+# KEYS: bucket keys. ARGV: now (ms), then capacity and refill rate (tokens/ms) per key.
+# Returns {allowed, retry_after_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    available = math.min(capacity, available + elapsed * rate)
+    tokens[i] = available
+    if available < 1 then
+        retry = math.max(retry, math.ceil((1 - available) / rate))
+    end
+end
+local allowed = retry == 0 and 1 or 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - allowed), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate))
+end
+return {allowed, retry}
+"""
+
+
+def parse_limit(limit):
+    """Parse '5/minute' into (capacity, tokens per second); None or 'off' disables the bucket."""
+    if not limit or limit == 'off':
+        return None
+    count, period = limit.split('/')
+    return int(count), int(count) / PERIODS[period.rstrip('s')]
+
+
+def _configured_limits():
+    overrides = {}
+    for item in (current_app.config.get('RATE_LIMITS') or '').split(','):
+        if '=' in item:
+            name, limit = item.split('=', 1)
+            overrides[name.strip()] = limit.strip()
+    return overrides
+
+
+class LocalBuckets:
+    """In-process token buckets, used while Redis is unreachable."""
+
+    def __init__(self, max_buckets=LOCAL_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now_ms):
+        """Same contract as the Lua script: buckets is [(key, capacity, tokens per ms)]."""
+        with self._lock:
+            levels = []
+            retry = 0
+            for key, capacity, rate in buckets:
+                available, ts = self._buckets.get(key, (capacity, now_ms))
+                available = min(capacity, available + max(0, now_ms - ts) * rate)
+                levels.append(available)
+                if available < 1:
+                    retry = max(retry, math.ceil((1 - available) / rate))
+            allowed = 1 if retry == 0 else 0
+            for (key, capacity, rate), available in zip(buckets, levels):
+                self._buckets[key] = (available - allowed, now_ms)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return allowed, retry
+
+
+class RateLimiter:
+    def __init__(self, url=None):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2) if url else None
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT) if self.client else None
+        self.local = LocalBuckets()
+        self._redis_down_until = 0
+
+    def take(self, buckets):
+        """Take a token from every bucket, or from none. Returns (allowed, retry_after_seconds)."""
+        now_ms = int(time.time() * 1000)
+        buckets = [(key, capacity, per_second / 1000) for key, capacity, per_second in buckets]
+        allowed, retry_ms = None, 0
+        if self.script and time.monotonic() >= self._redis_down_until:
+            try:
+                args = [now_ms]
+                for _, capacity, rate in buckets:
+                    args += [capacity, repr(rate)]
+                allowed, retry_ms = self.script(keys=[key for key, _, _ in buckets], args=args)
+            except redis.RedisError as e:
+                current_app.logger.warning(f'Rate limiting in process, Redis unavailable: {e}')
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        if allowed is None:
+            allowed, retry_ms = self.local.take(buckets, now_ms)
+        return bool(allowed), max(1, math.ceil(int(retry_ms) / 1000))
+
+
+def get_limiter():
+    limiter = current_app.extensions.get('rate_limit')
+    if limiter is None:
+        limiter = RateLimiter(current_app.config.get('RATE_LIMIT_URL'))
+        current_app.extensions['rate_limit'] = limiter
+    return limiter
+
+
+def login_email():
+    """Identity for unauthenticated routes: the email in the JSON body."""
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+def rate_limit(name, ip=None, identity=None, identity_key=get_jwt_identity):
+    """
+    Limit a view per client IP and/or per identity, e.g. rate_limit('login', ip='60/minute').
+    Put it below @jwt_required() when limiting by JWT identity.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+                return fn(*args, **kwargs)
+
+            overrides = _configured_limits()
+            buckets = []
+            for scope, default in (('ip', ip), ('identity', identity)):
+                limit = parse_limit(overrides.get(f'{name}.{scope}', default))
+                if limit is None:
+                    continue
+                subject = request.remote_addr if scope == 'ip' else identity_key()
+                if subject is None:
+                    continue
+                buckets.append((f'rate_limit:{name}:{scope}:{subject}', *limit))
+
+            if buckets:
+                allowed, retry_after = get_limiter().take(buckets)
+                if not allowed:
+                    return jsonify({"message": "Too many requests, please retry later"}), 429, {
+                        "Retry-After": str(retry_after)
+                    }
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
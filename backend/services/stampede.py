@@ -0,0 +1,100 @@
+"""
+Stampede-protected view caching.
+
+`cached_view` is a drop-in for `@cache.cached(timeout, key_prefix)` on GET
+views. It adds:
+
+- probabilistic early refresh (XFetch): as an entry nears expiry, each
+  request refreshes it early with a probability that grows with how long
+  the view takes to compute, so a hot entry is usually rebuilt before it
+  expires at all
+- single-flight recomputation: a short lock lets one worker rebuild an
+  entry while everyone else keeps serving the stale copy, which is kept
+  for STALE_SECONDS past its expiry for that purpose
+
+Only a request that finds no copy at all waits for the worker holding
+the lock (up to LOCK_TIMEOUT seconds) before computing on its own.
+Only successful (2xx) responses are cached; errors are passed through
+and recomputed on the next request.
+"""
+
+import math
+import random
+import time
+from functools import wraps
+
+from extensions import cache
+
+STALE_SECONDS = 60  # How long an expired entry may still be served during a rebuild
+LOCK_TIMEOUT = 30  # Longest a rebuild may hold the lock
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(cache_key):
+    return f'{cache_key}_rebuild_lock'
+
+
+def _status_code(value):
+    """Status of a view's return value: a response, a (body, status[, headers]) tuple or a bare body."""
+    if isinstance(value, tuple):
+        if len(value) > 1 and isinstance(value[1], int):
+            return value[1]
+        value = value[0]
+    return getattr(value, 'status_code', 200)
+
+
+def _store(cache_key, value, delta, timeout):
+    entry = {"value": value, "delta": delta, "expires": time.time() + timeout}
+    cache.set(cache_key, entry, timeout=timeout + STALE_SECONDS)
+
+
+def _is_fresh(entry, beta):
+    # XFetch: refresh early with probability rising as expiry approaches
+    early = entry["delta"] * beta * -math.log(random.random() or 1e-12)
+    return time.time() + early < entry["expires"]
+
+
+def extend(cache_key, timeout):
+    """Keep an existing entry fresh for `timeout` seconds from now. Returns False if it is missing."""
+    entry = cache.get(cache_key)
+    if entry is None:
+        return False
+    _store(cache_key, entry["value"], entry["delta"], timeout)
+    return True
+
+
+def cached_view(timeout, key_prefix, beta=1.0):
+    """Cache a view's response like @cache.cached, with single-flight, early-refreshing rebuilds."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache_key = key_prefix() if callable(key_prefix) else key_prefix
+            entry = cache.get(cache_key)
+            if entry is not None and _is_fresh(entry, beta):
+                return entry["value"]
+
+            lock_key = _lock_key(cache_key)
+            owns_lock = cache.add(lock_key, True, timeout=LOCK_TIMEOUT)
+            if not owns_lock:
+                if entry is not None:
+                    return entry["value"]  # Someone else is rebuilding; serve the stale copy
+                deadline = time.time() + LOCK_TIMEOUT
+                while time.time() < deadline:
+                    time.sleep(WAIT_INTERVAL)
+                    entry = cache.get(cache_key)
+                    if entry is not None:
+                        return entry["value"]
+                    if not cache.get(lock_key):
+                        break  # The rebuild failed; compute here instead
+
+            try:
+                started = time.perf_counter()
+                value = fn(*args, **kwargs)
+                if 200 <= _status_code(value) < 300:
+                    _store(cache_key, value, time.perf_counter() - started, timeout)
+                return value
+            finally:
+                if owns_lock:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
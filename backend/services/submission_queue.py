@@ -0,0 +1,236 @@
+"""
+Write-behind queue for quiz submissions.
+
+When ASYNC_SUBMISSIONS is enabled the submit endpoint only validates the
+attempt and pushes the answers onto a Redis list. A Celery task drains the
+list in batches, grades them and commits each batch in one transaction.
+
+Batches are moved to a processing list with RPOPLPUSH before grading, so a
+worker that dies mid-batch leaves them to be picked up by the next drain.
+A redelivered submission whose attempt is already closed keeps the status
+it was given, or has it rebuilt if it closed the attempt itself before the
+drainer died. The drain lock holds a random token and is only extended or
+released by the drainer that owns it.
+"""
+
+from datetime import datetime, timezone
+import json
+import uuid
+
+import redis
+from flask import current_app
+
+from extensions import db
+from models import QuizAttempt
+from services.cache_tags import invalidate, user_tag
+from services.grading import grade_attempt, record_scores, save_responses, score_answers
+
+QUEUE_KEY = 'submission_queue'
+PROCESSING_KEY = 'submission_queue:processing'
+LOCK_KEY = 'submission_queue:lock'
+LOCK_TIMEOUT = 60
+STATUS_TIMEOUT = 86400  # Keep results for a day
+
+# KEYS: lock key. ARGV: owner token, then a timeout in seconds to extend, or none to release.
+OWNED_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('DEL', KEYS[1])
+"""
+
+
+def get_queue_client():
+    """Return the Redis client used for the submission queue."""
+    client = current_app.extensions.get('submission_queue')
+    if client is None:
+        client = redis.Redis.from_url(current_app.config["SUBMISSION_QUEUE_URL"])
+        current_app.extensions['submission_queue'] = client
+    return client
+
+
+def _status_key(handle):
+    return f'submission_status:{handle}'
+
+
+def _queued_key(attempt_id):
+    return f'submission_attempt:{attempt_id}'
+
+
+def enqueue_submission(quiz_attempt, answers):
+    """
+    Queue a validated submission and return its handle.
+    Returns None if the attempt was already queued.
+    """
+    client = get_queue_client()
+    handle = uuid.uuid4().hex
+
+    # Only the first submission for an attempt gets queued
+    if not client.set(_queued_key(quiz_attempt.id), handle, nx=True, ex=STATUS_TIMEOUT):
+        return None
+
+    payload = json.dumps({
+        "handle": handle,
+        "attempt_id": quiz_attempt.id,
+        "user_id": quiz_attempt.user_id,
+        "answers": answers,
+        "submitted_at": datetime.now(timezone.utc).isoformat()
+    })
+    status = json.dumps({"status": "QUEUED", "user_id": quiz_attempt.user_id, "attempt_id": quiz_attempt.id})
+
+    pipe = client.pipeline()
+    pipe.set(_status_key(handle), status, ex=STATUS_TIMEOUT)
+    pipe.lpush(QUEUE_KEY, payload)
+    pipe.execute()
+    return handle
+
+
+def queued_attempt_ids(attempt_ids):
+    """Return the subset of attempt ids that have a submission waiting in the queue."""
+    attempt_ids = list(attempt_ids)
+    if not attempt_ids:
+        return set()
+    pipe = get_queue_client().pipeline()
+    for attempt_id in attempt_ids:
+        pipe.exists(_queued_key(attempt_id))
+    return {attempt_id for attempt_id, queued in zip(attempt_ids, pipe.execute()) if queued}
+
+
+def get_submission_status(handle):
+    """Return the stored status of a queued submission, or None if unknown."""
+    status = get_queue_client().get(_status_key(handle))
+    return json.loads(status) if status else None
+
+
+def _closed_attempt_status(item, quiz_attempt, stored):
+    """
+    Return the status for a submission whose attempt is already closed, or
+    None to keep the one already stored for it.
+    """
+    if stored and stored["status"] != "QUEUED":
+        return None  # Its batch was graded and reported before the drainer died
+
+    submitted_at = datetime.fromisoformat(item["submitted_at"]).replace(tzinfo=None)
+    if quiz_attempt.end_time.replace(tzinfo=None) == submitted_at and quiz_attempt.score is not None:
+        # This submission closed the attempt; its batch committed but its status was never written
+        result, _ = score_answers(quiz_attempt.quiz_id, item["answers"])
+        return {"status": "GRADED", "user_id": item["user_id"], "attempt_id": item["attempt_id"],
+                **result, "score": quiz_attempt.score.total_score}
+
+    return {"status": "REJECTED", "user_id": item["user_id"],
+            "attempt_id": item["attempt_id"], "error": "Quiz already submitted"}
+
+
+def _grade_batch(payloads):
+    """Grade a batch of queued submissions and commit them together."""
+
+    items = [json.loads(payload) for payload in payloads]
+    attempts = {
+        attempt.id: attempt
+        for attempt in QuizAttempt.query.filter(
+            QuizAttempt.id.in_([item["attempt_id"] for item in items])
+        ).all()
+    }
+
+    # Statuses already stored for submissions whose attempt is closed (normally only after a crash)
+    closed = [item for item in items
+              if item["attempt_id"] in attempts and attempts[item["attempt_id"]].end_time is not None]
+    stored = {}
+    if closed:
+        pipe = get_queue_client().pipeline()
+        for item in closed:
+            pipe.get(_status_key(item["handle"]))
+        stored = {item["handle"]: json.loads(status) if status else None
+                  for item, status in zip(closed, pipe.execute())}
+
+    statuses = {}
+    responses = []
+    invalid_attempt_ids = []
+    rollups = []
+    for item in items:
+        quiz_attempt = attempts.get(item["attempt_id"])
+        if quiz_attempt is None:
+            statuses[item["handle"]] = {"status": "REJECTED", "user_id": item["user_id"],
+                                        "attempt_id": item["attempt_id"], "error": "Quiz already submitted"}
+            continue
+        if quiz_attempt.end_time is not None:
+            status = _closed_attempt_status(item, quiz_attempt, stored.get(item["handle"]))
+            if status is not None:
+                statuses[item["handle"]] = status
+            continue
+
+        try:
+            end_time = datetime.fromisoformat(item["submitted_at"])
+            result, attempt_responses = grade_attempt(quiz_attempt, item["answers"], end_time, rollups)
+        except Exception as e:
+            # A malformed submission must not hold back the rest of the batch
+            current_app.logger.warning(f'Rejected queued submission {item["handle"]}: {e}')
+            invalid_attempt_ids.append(item["attempt_id"])
+            statuses[item["handle"]] = {"status": "REJECTED", "user_id": item["user_id"],
+                                        "attempt_id": item["attempt_id"], "error": "Invalid submission"}
+            continue
+        if current_app.config.get("CAPTURE_RESPONSES", True):
+            responses.extend(attempt_responses)
+        statuses[item["handle"]] = {"status": "GRADED", "user_id": item["user_id"],
+                                    "attempt_id": item["attempt_id"], **result}
+
+    try:
+        record_scores(rollups)
+        save_responses(responses)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    pipe = get_queue_client().pipeline()
+    for handle, status in statuses.items():
+        pipe.set(_status_key(handle), json.dumps(status), ex=STATUS_TIMEOUT)
+    for attempt_id in invalid_attempt_ids:
+        pipe.delete(_queued_key(attempt_id))  # The attempt is still open and may be submitted again
+    pipe.execute()
+
+    invalidate(*{user_tag(item["user_id"]) for item in items})
+
+    return sum(1 for status in statuses.values() if status["status"] == "GRADED")
+
+
+def drain_submissions(batch_size=None):
+    """
+    Grade queued submissions until the queue is empty.
+    Only one drainer runs at a time; returns the number of graded submissions.
+    """
+    client = get_queue_client()
+    batch_size = batch_size or current_app.config.get("SUBMISSION_BATCH_SIZE", 100)
+
+    token = uuid.uuid4().hex
+    if not client.set(LOCK_KEY, token, nx=True, ex=LOCK_TIMEOUT):
+        return 0
+    owned_lock = client.register_script(OWNED_LOCK_SCRIPT)
+
+    graded = 0
+    try:
+        # Resume a batch left behind by a drainer that died mid-way
+        payloads = client.lrange(PROCESSING_KEY, 0, -1)
+        while True:
+            if not payloads:
+                pipe = client.pipeline()
+                for _ in range(batch_size):
+                    pipe.rpoplpush(QUEUE_KEY, PROCESSING_KEY)
+                payloads = [payload for payload in pipe.execute() if payload]
+                if not payloads:
+                    break
+
+            graded += _grade_batch(payloads)
+            client.delete(PROCESSING_KEY)
+            payloads = []
+            if not owned_lock(keys=[LOCK_KEY], args=[token, LOCK_TIMEOUT]):
+                # The lock expired and another drainer may hold it now; leave the queue to it
+                current_app.logger.warning('Submission drain lock expired mid-drain')
+                break
+    finally:
+        owned_lock(keys=[LOCK_KEY], args=[token])
+
+    return graded
@@ -0,0 +1,39 @@
+"""
+Race-free creation of rollup rows.
+
+Rollup writers create missing rows with zero counters and then add to
+them with one UPDATE. When transactions run concurrently (e.g. the
+server-db profile), two of them can both find a row missing; a plain
+INSERT would then fail one of them on the primary key. insert_missing
+lets the database skip rows that already exist instead.
+"""
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from extensions import db
+
+
+def insert_missing(table, rows, keys):
+    """Insert `rows` into `table`, skipping any whose `keys` already exist. Nothing is committed."""
+    if not rows:
+        return
+    dialect = db.session.get_bind(clause=table.insert()).dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite.insert(table).on_conflict_do_nothing(index_elements=keys)
+    elif dialect == 'postgresql':
+        statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=keys)
+    elif dialect == 'mysql':
+        statement = mysql.insert(table).prefix_with('IGNORE')
+    else:
+        # No conflict clause available: only insert keys not seen by this transaction
+        key_columns = [table.c[key] for key in keys]
+        existing = {
+            tuple(row) for row in db.session.query(*key_columns).filter(
+                *[column.in_({row[key] for row in rows}) for column, key in zip(key_columns, keys)]
+            ).all()
+        }
+        rows = [row for row in rows if tuple(row[key] for key in keys) not in existing]
+        if not rows:
+            return
+        statement = table.insert()
+    db.session.execute(statement, rows)
@@ -0,0 +1,143 @@
+"""
+Maintenance of the monthly per-user activity rollups.
+
+user_month_stats and user_month_subject_stats are updated in the same
+transaction as every Score insert, so the monthly report can rank users
+with one window-function query and build every user's report with a
+fixed number of queries.
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, case, func
+
+from extensions import db
+from models import Chapter, Quiz, QuizAttempt, Score, UserMonthStats, UserMonthSubjectStats, User
+from services.upserts import insert_missing
+
+REBUILD_CHUNK = 1000
+
+
+def month_key(value):
+    return value.strftime('%Y-%m')
+
+
+def _upsert(model, keys, rows, update_values):
+    """Insert zero rows for missing keys, then apply `update_values` to every row with one executemany."""
+    table = model.__table__
+    key_columns = [table.c[key] for key in keys]
+    insert_missing(table, [{**{key: row[key] for key in keys}, "attempts": 0, "score_sum": 0} for row in rows], keys)
+
+    where = and_(*[column == bindparam(f"k_{key}") for column, key in zip(key_columns, keys)])
+    db.session.execute(
+        table.update().where(where).values(**update_values(table)),
+        [{**{f"k_{key}": row[key] for key in keys}, **{k: v for k, v in row.items() if k not in keys}}
+         for row in rows]
+    )
+
+
+def record_scores(scores):
+    """
+    Fold new scores into the monthly rollups. `scores` is a list of
+    (quiz_id, user_id, total_score, timestamp) tuples; nothing is committed.
+    """
+    if not scores:
+        return
+
+    subjects = dict(db.session.query(Quiz.id, Chapter.subject_id).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).filter(
+        Quiz.id.in_({quiz_id for quiz_id, _, _, _ in scores})
+    ).all())
+
+    users = {}
+    user_subjects = {}
+    for quiz_id, user_id, total_score, timestamp in scores:
+        month = month_key(timestamp)
+        entry = users.setdefault((user_id, month), {"user_id": user_id, "month": month,
+                                                    "n": 0, "s": 0, "mx": total_score})
+        entry["n"] += 1
+        entry["s"] += total_score
+        entry["mx"] = max(entry["mx"], total_score)
+
+        subject_id = subjects.get(quiz_id)
+        if subject_id is not None:
+            entry = user_subjects.setdefault((user_id, month, subject_id), {
+                "user_id": user_id, "month": month, "subject_id": subject_id, "n": 0, "s": 0})
+            entry["n"] += 1
+            entry["s"] += total_score
+
+    _upsert(UserMonthStats, ["user_id", "month"], list(users.values()), lambda table: {
+        "attempts": table.c.attempts + bindparam("n"),
+        "score_sum": table.c.score_sum + bindparam("s"),
+        "max_score": case(
+            (table.c.max_score == None, bindparam("mx")),
+            (table.c.max_score < bindparam("mx"), bindparam("mx")),
+            else_=table.c.max_score
+        )
+    })
+    if user_subjects:
+        _upsert(UserMonthSubjectStats, ["user_id", "month", "subject_id"], list(user_subjects.values()),
+                lambda table: {
+                    "attempts": table.c.attempts + bindparam("n"),
+                    "score_sum": table.c.score_sum + bindparam("s")
+                })
+
+
+def monthly_rankings_query(month):
+    """Users with role 'user' who attempted a quiz in `month`, ranked by their average score."""
+    average = func.round(UserMonthStats.score_sum * 1.0 / UserMonthStats.attempts, 1)
+    return db.session.query(
+        UserMonthStats.user_id,
+        UserMonthStats.attempts,
+        UserMonthStats.max_score,
+        average.label('average_score'),
+        func.rank().over(order_by=average.desc()).label('rank')
+    ).join(
+        User, User.id == UserMonthStats.user_id
+    ).filter(
+        UserMonthStats.month == month,
+        UserMonthStats.attempts > 0,
+        User.role == 'user'
+    )
+
+
+def monthly_rankings(month):
+    """
+    Rank users for the month in a single query.
+    Returns {user_id: {'attempts', 'average_score', 'highest_score', 'rank'}}.
+    """
+    rows = monthly_rankings_query(month).all()
+    return {row.user_id: {
+        'attempts': row.attempts,
+        'average_score': float(row.average_score),
+        'highest_score': row.max_score or 0,
+        'rank': row.rank
+    } for row in rows}
+
+
+def rebuild_user_month_stats():
+    """Recompute both monthly rollups from the score table. Returns the number of user-months."""
+    db.session.query(UserMonthStats).delete(synchronize_session=False)
+    db.session.query(UserMonthSubjectStats).delete(synchronize_session=False)
+
+    rows = db.session.query(
+        QuizAttempt.quiz_id,
+        Score.user_id,
+        Score.total_score,
+        func.coalesce(QuizAttempt.end_time, Score.timestamp)
+    ).join(
+        QuizAttempt, Score.quiz_attempt_id == QuizAttempt.id
+    ).all()
+    scores = [tuple(row) for row in rows if row[3] is not None]
+    for start in range(0, len(scores), REBUILD_CHUNK):
+        record_scores(scores[start:start + REBUILD_CHUNK])
+    db.session.commit()
+    return UserMonthStats.query.count()
+
+
+@click.command("rebuild-user-month-stats")
+@with_appcontext
+def rebuild_user_month_stats_command():
+    """Backfill the monthly user activity rollups from existing scores."""
+    click.echo(f"Rebuilt {rebuild_user_month_stats()} user-month rows")
@@ -0,0 +1,64 @@
+"""
+Shared fixtures: an app on a fresh SQLite file per test, an in-process
+cache, inline password hashing and no rate limiting unless a test turns
+it on. Redis-backed features get a fakeredis client.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app.py builds its module-level app; keep it off the .env database and Redis
+os.environ.update({
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "CACHE_TYPE": "SimpleCache",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "PASSWORD_HASH_WORKERS": "0",
+    "BCRYPT_LOG_ROUNDS": "4",
+    "RATE_LIMIT_ENABLED": "false",
+})
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "TESTING": True,
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user; returns (user id, Authorization headers for them)."""
+    # Import here to avoid circular import
+    from models import User
+    from services.auth_tokens import issue_token
+
+    def make(email, full_name="Test User", role="user", password="secret"):
+        user = User(email=email, full_name=full_name, role=role)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user.id, {"Authorization": f"Bearer {issue_token(user)}"}
+    return make
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
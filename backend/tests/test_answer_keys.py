@@ -0,0 +1,91 @@
+"""
+Submissions are graded from a cached answer key that admin question writes
+refresh through the quiz:<id> tag, so a submit issues the same statements
+whatever the size of the quiz.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.seed import seed_dataset
+from extensions import db
+from models import Question
+from services.answer_keys import get_answer_key, get_quiz_version
+
+
+@pytest.fixture
+def quiz(app):
+    seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=3, attempts=0)
+    quiz_id = seeded.quiz_ids[0]
+    return quiz_id, dict(seeded.answer_key[quiz_id])
+
+
+def _submit(client, headers, quiz_id, answers):
+    attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+    return client.post("/user/quiz/submit", json={"attempt_id": attempt_id, "answers": answers}, headers=headers)
+
+
+def test_question_update_refreshes_the_answer_key(client, make_user, quiz):
+    quiz_id, key = quiz
+    question_id = next(iter(key))
+    changed = (key[question_id] + 1) % 4
+    _, admin = make_user("root@example.com", role="admin")
+    _, headers = make_user("taker@example.com")
+    assert get_answer_key(quiz_id) == key
+
+    # Without the tag, the cached key is still served
+    Question.query.get(question_id).correct_option = changed
+    db.session.commit()
+    assert get_answer_key(quiz_id)[question_id] == key[question_id]
+
+    version = get_quiz_version(quiz_id)
+    response = client.put(f"/admin/questions/{question_id}", json={"correct_option": changed}, headers=admin)
+    assert response.status_code == 200
+    assert get_quiz_version(quiz_id) != version
+    assert get_answer_key(quiz_id) == {**key, question_id: changed}
+
+    answers = {str(qid): option + 1 for qid, option in {**key, question_id: changed}.items()}
+    assert _submit(client, headers, quiz_id, answers).get_json()["score"] == 100
+
+
+def test_question_create_and_delete_refresh_the_answer_key(client, make_user, quiz):
+    quiz_id, key = quiz
+    _, admin = make_user("root@example.com", role="admin")
+    get_answer_key(quiz_id)
+
+    response = client.post(f"/admin/quizzes/{quiz_id}/questions", headers=admin,
+                           json={"text": "New?", "options": ["a", "b", "c", "d"], "correct_option": 2})
+    new_id = response.get_json()["question_id"]
+    assert get_answer_key(quiz_id) == {**key, new_id: 2}
+
+    client.delete(f"/admin/questions/{new_id}", headers=admin)
+    assert get_answer_key(quiz_id) == key
+
+
+def test_submit_statement_count_does_not_grow_with_questions(client, make_user):
+    _, headers = make_user("taker@example.com")
+    counts = []
+    for questions in (5, 200):
+        seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=questions, attempts=0)
+        quiz_id = seeded.quiz_ids[0]
+        answers = {str(qid): option + 1 for qid, option in seeded.answer_key[quiz_id]}
+        _submit(client, headers, quiz_id, answers)  # Warms the answer key
+
+        attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.remove()
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            response = client.post("/user/quiz/submit", json={"attempt_id": attempt_id, "answers": answers},
+                                   headers=headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+        assert response.get_json()["score"] == 100
+        assert not any(statement.startswith("SELECT question") for statement in statements)
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,74 @@
+"""
+Token-version checks: admin routes authorize without SQL, revoked tokens
+are rejected, and the app refuses to start without a cache to keep the
+versions in.
+"""
+
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from app import create_app
+from extensions import cache, db
+from models import User
+from services.auth_tokens import revoke_tokens
+
+
+@pytest.fixture
+def statements(app):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(db.engine, "before_cursor_execute", capture)
+
+
+def test_admin_route_authorizes_without_sql(client, make_user, statements):
+    _, headers = make_user("root@example.com", role="admin")
+    db.session.remove()
+    statements.clear()
+
+    g.last_query_count = None
+    response = client.get("/admin/users", headers=headers)
+    assert response.status_code == 200
+    # Everything the request issued was the view's own query
+    assert len(statements) == g.last_query_count == 1
+
+
+def test_authorization_after_cache_eviction_reads_the_version_once(client, make_user, statements):
+    _, headers = make_user("root@example.com", role="admin")
+    cache.clear()
+    statements.clear()
+
+    assert client.get("/admin/users", headers=headers).status_code == 200
+    assert client.get("/admin/users", headers=headers).status_code == 200
+    version_reads = [statement for statement in statements if statement.lstrip().startswith("SELECT user.token_version")]
+    assert len(version_reads) == 1
+
+
+def test_token_issued_before_revoke_is_rejected(client, make_user):
+    user_id, old_headers = make_user("taker@example.com")
+    assert client.get("/me", headers=old_headers).status_code == 200
+
+    revoke_tokens(User.query.get(user_id))
+    assert client.get("/me", headers=old_headers).status_code == 401
+
+    login = client.post("/login", json={"email": "taker@example.com", "password": "secret"})
+    new_headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+    assert client.get("/me", headers=new_headers).status_code == 200
+
+
+def test_demoted_admin_token_is_rejected(client, make_user):
+    user_id, headers = make_user("root@example.com", role="admin")
+    user = User.query.get(user_id)
+    user.role = "user"
+    revoke_tokens(user)
+    assert client.get("/admin/users", headers=headers).status_code == 401
+
+
+def test_app_requires_a_cache(tmp_path):
+    with pytest.raises(RuntimeError, match="CACHE_TYPE"):
+        create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}", "CACHE_TYPE": "NullCache"})
@@ -0,0 +1,34 @@
+"""Conditional GETs on tag-versioned views revalidate by ETag alone."""
+
+from email.utils import formatdate
+
+
+def test_etag_revalidation(client, make_user):
+    _, admin_headers = make_user("root@example.com", role="admin")
+    _, headers = make_user("alice@example.com")
+    client.post("/admin/subjects", json={"name": "Maths"}, headers=admin_headers)
+
+    response = client.get("/user/subjects", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and "Last-Modified" not in response.headers
+
+    response = client.get("/user/subjects", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+
+    client.post("/admin/subjects", json={"name": "Physics"}, headers=admin_headers)
+    response = client.get("/user/subjects", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [subject["name"] for subject in response.get_json()] == ["Maths", "Physics"]
+
+
+def test_if_modified_since_cannot_hide_a_same_second_write(client, make_user):
+    _, admin_headers = make_user("root@example.com", role="admin")
+    _, headers = make_user("alice@example.com")
+    client.post("/admin/subjects", json={"name": "Maths"}, headers=admin_headers)
+    client.get("/user/subjects", headers=headers)
+
+    client.post("/admin/subjects", json={"name": "Physics"}, headers=admin_headers)
+    in_the_future = formatdate(2000000000, usegmt=True)
+    response = client.get("/user/subjects", headers={**headers, "If-Modified-Since": in_the_future})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
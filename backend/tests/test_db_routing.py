@@ -0,0 +1,108 @@
+"""
+Replica routing with two SQLite files kept in step by `flask sync-replica`:
+uncached reads go to the replica, and a user's reads go back to the
+primary for READ_YOUR_WRITES_SECONDS after they write.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.seed import seed_dataset
+from db_routing import REPLICA_BIND, _recent_write_key
+from extensions import cache, db
+from models import User
+from services.auth_tokens import issue_token
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "SQLALCHEMY_BINDS": {REPLICA_BIND: f"sqlite:///{tmp_path / 'replica.db'}"},
+        "READ_YOUR_WRITES_SECONDS": 5,
+        "TESTING": True,
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(replica_app):
+    return replica_app.test_client()
+
+
+@pytest.fixture
+def replica_statements(replica_app):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    engine = db.get_engine(replica_app, bind=REPLICA_BIND)
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def _sync(app):
+    result = app.test_cli_runner().invoke(args=["sync-replica"])
+    assert result.exit_code == 0, result.output
+
+
+def _get(client, url, headers):
+    db.session.remove()  # A fresh session per request, as in a real worker
+    return client.get(url, headers=headers)
+
+
+def _admin_headers():
+    admin = User(email="root@example.com", full_name="Root", role="admin")
+    admin.set_password("secret")
+    db.session.add(admin)
+    db.session.commit()
+    return {"Authorization": f"Bearer {issue_token(admin)}"}
+
+
+def test_uncached_reads_go_to_the_replica(replica_app, client, replica_statements):
+    admin = _admin_headers()
+    _sync(replica_app)
+
+    # Written to the primary outside any request, so nobody's reads are pinned to it
+    db.session.add(User(email="late@example.com", full_name="Late", role="user", password="x"))
+    db.session.commit()
+
+    emails = [user["email"] for user in _get(client, "/admin/users", admin).get_json()["items"]]
+    assert "late@example.com" not in emails  # The replica has not caught up yet
+    assert any(statement.lstrip().startswith("SELECT") for statement in replica_statements)
+
+    _sync(replica_app)
+    emails = [user["email"] for user in _get(client, "/admin/users", admin).get_json()["items"]]
+    assert "late@example.com" in emails
+
+
+def test_own_writes_are_read_from_the_primary(replica_app, client, replica_statements):
+    seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=3, attempts=0)
+    quiz_id = seeded.quiz_ids[0]
+    headers = {"Authorization": f"Bearer {issue_token(User.query.get(seeded.user_ids[0]))}"}
+    _sync(replica_app)
+
+    attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+    answers = {str(question_id): 1 for question_id, _ in seeded.answer_key[quiz_id]}
+    assert client.post("/user/quiz/submit", json={"attempt_id": attempt_id, "answers": answers},
+                       headers=headers).status_code == 200
+    assert cache.get(_recent_write_key(seeded.user_ids[0]))
+
+    # Within the window the review comes from the primary, although the replica lacks the attempt
+    replica_statements.clear()
+    review = _get(client, f"/user/attempts/{attempt_id}/review", headers)
+    assert review.status_code == 200 and len(review.get_json()["responses"]) == 3
+    assert replica_statements == []
+
+    # Once the window has passed, the same read goes to the (still lagging) replica
+    cache.delete(_recent_write_key(seeded.user_ids[0]))
+    assert _get(client, f"/user/attempts/{attempt_id}/review", headers).status_code == 404
+    assert replica_statements
+
+    _sync(replica_app)
+    assert _get(client, f"/user/attempts/{attempt_id}/review", headers).status_code == 200
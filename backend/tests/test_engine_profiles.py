@@ -0,0 +1,71 @@
+"""DB_PROFILE tunes every new SQLite connection, including replica binds."""
+
+import pytest
+
+from app import create_app
+from extensions import db
+
+
+def _pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+@pytest.fixture
+def profile_app(tmp_path):
+    apps = []
+
+    def make(profile, **config):
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / f'{profile}.db'}",
+            "DB_PROFILE": profile,
+            **config,
+        })
+        context = app.app_context()
+        context.push()
+        apps.append(context)
+        return app
+
+    yield make
+    for context in reversed(apps):
+        db.session.remove()
+        context.pop()
+
+
+def test_sqlite_prod_sets_wal_and_busy_timeout_on_new_connections(profile_app):
+    app = profile_app("sqlite-prod")
+    engine = db.get_engine(app)
+    engine.dispose()  # Drop the connection create_app used, so the next one is new
+
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "busy_timeout") == 30000
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "temp_store") == 2  # MEMORY
+
+    # Every pooled connection gets them, not just the first
+    with engine.connect() as first, engine.connect() as second:
+        assert first.connection.connection is not second.connection.connection  # Two DBAPI connections
+        for connection in (first, second):
+            assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 30000
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+
+
+def test_sqlite_prod_applies_to_replica_binds(profile_app, tmp_path):
+    app = profile_app("sqlite-prod", SQLALCHEMY_BINDS={"replica": f"sqlite:///{tmp_path / 'replica.db'}"})
+    assert _pragma(db.get_engine(app, bind="replica"), "busy_timeout") == 30000
+
+
+def test_dev_profile_keeps_sqlite_defaults(profile_app):
+    app = profile_app("dev")
+    assert _pragma(db.get_engine(app), "journal_mode") == "delete"
+
+
+def test_explicit_engine_options_win(profile_app):
+    app = profile_app("sqlite-prod", SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 2})
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"] == 2
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["max_overflow"] == 10
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown DB_PROFILE"):
+        create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'x.db'}", "DB_PROFILE": "fast"})
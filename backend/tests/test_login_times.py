@@ -0,0 +1,138 @@
+"""Write-behind last_login: buffering, flushing, and flushes that overlap or die midway."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from extensions import db
+from models import User
+from services import login_times
+from services.login_times import (BUFFER_KEY, FLUSHING_KEY, LOCK_KEY, flush_logins, latest_login, pending_logins,
+                                  record_login)
+
+T0 = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def buffer(app, fake_redis):
+    app.config["COALESCE_LOGINS"] = True
+    app.extensions["login_times"] = fake_redis
+    return fake_redis
+
+
+@pytest.fixture
+def users(app, make_user):
+    ids = [make_user(f"user{i}@example.com")[0] for i in range(3)]
+    # Known starting point, older than every login below
+    User.query.update({User.last_login: T0 - timedelta(days=1)})
+    db.session.commit()
+    return [User.query.get(user_id) for user_id in ids]
+
+
+def _column(user):
+    db.session.expire_all()
+    return User.query.get(user.id).last_login
+
+
+def _naive(when):
+    return when.replace(tzinfo=None)
+
+
+def test_logins_are_buffered_until_flushed(buffer, users):
+    alice, bob, _ = users
+    record_login(alice, T0)
+    record_login(alice, T0 + timedelta(minutes=1))
+    record_login(bob, T0)
+
+    assert _column(alice) == _naive(T0 - timedelta(days=1))
+    assert pending_logins() == {alice.id: _naive(T0 + timedelta(minutes=1)), bob.id: _naive(T0)}
+    assert latest_login(alice) == _naive(T0 + timedelta(minutes=1))
+
+    assert flush_logins() == 2
+    assert _column(alice) == _naive(T0 + timedelta(minutes=1))
+    assert _column(bob) == _naive(T0)
+    assert pending_logins() == {}
+    assert not buffer.exists(BUFFER_KEY, FLUSHING_KEY, LOCK_KEY)
+    assert flush_logins() == 0
+
+
+def test_login_during_a_flush_is_kept_for_the_next_one(buffer, users, monkeypatch):
+    alice, bob, _ = users
+    record_login(alice, T0)
+    execute = db.session.execute
+
+    def login_midway(*args, **kwargs):
+        # The buffer was moved aside before this UPDATE, so this lands in a new one
+        record_login(alice, T0 + timedelta(minutes=5))
+        record_login(bob, T0 + timedelta(minutes=5))
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(db.session, "execute", login_midway)
+    assert flush_logins() == 1
+    monkeypatch.undo()
+
+    assert _column(alice) == _naive(T0)
+    assert latest_login(alice) == _naive(T0 + timedelta(minutes=5))
+    assert flush_logins() == 2
+    assert _column(alice) == _naive(T0 + timedelta(minutes=5))
+    assert _column(bob) == _naive(T0 + timedelta(minutes=5))
+
+
+def test_stale_buffered_login_does_not_overwrite_a_newer_one(buffer, users):
+    alice, _, _ = users
+    record_login(alice, T0)
+
+    # Written directly, e.g. by a worker running with COALESCE_LOGINS off
+    User.query.get(alice.id).last_login = T0 + timedelta(hours=1)
+    db.session.commit()
+
+    assert flush_logins() == 1
+    assert _column(alice) == _naive(T0 + timedelta(hours=1))
+    assert latest_login(User.query.get(alice.id)) == _naive(T0 + timedelta(hours=1))
+
+
+def test_flush_that_died_is_resumed(buffer, users, monkeypatch):
+    alice, bob, carol = users
+    record_login(alice, T0)
+    record_login(bob, T0)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(db.session, "execute", fail)
+    with pytest.raises(RuntimeError):
+        flush_logins()
+    monkeypatch.undo()
+
+    # The renamed buffer is left behind and the lock released; newer logins go to a new buffer
+    assert buffer.exists(FLUSHING_KEY) and not buffer.exists(LOCK_KEY)
+    record_login(alice, T0 + timedelta(minutes=10))
+    record_login(carol, T0 + timedelta(minutes=10))
+    assert pending_logins() == {
+        alice.id: _naive(T0 + timedelta(minutes=10)),
+        bob.id: _naive(T0),
+        carol.id: _naive(T0 + timedelta(minutes=10)),
+    }
+
+    # The next flush finishes the one that died before taking the new buffer
+    assert flush_logins() == 2
+    assert (_column(alice), _column(bob)) == (_naive(T0), _naive(T0))
+    assert not buffer.exists(FLUSHING_KEY)
+
+    assert flush_logins() == 2
+    assert _column(alice) == _naive(T0 + timedelta(minutes=10))
+    assert _column(carol) == _naive(T0 + timedelta(minutes=10))
+
+
+def test_only_one_flush_runs_at_a_time(buffer, users):
+    record_login(users[0], T0)
+    buffer.set(LOCK_KEY, "1", ex=login_times.LOCK_TIMEOUT)
+    assert flush_logins() == 0
+    assert buffer.exists(BUFFER_KEY)
+
+
+def test_logins_commit_directly_when_not_coalescing(app, users):
+    alice, _, _ = users
+    record_login(alice, T0)
+    assert _column(alice) == _naive(T0)
+    assert pending_logins() == {}
@@ -0,0 +1,83 @@
+"""
+The monthly report ranks users from the monthly rollup, so the number of
+statements it issues does not depend on how many users there are.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.seed import seed_dataset
+from extensions import db
+from services.app_time import app_today
+from services.user_month_stats import monthly_rankings
+
+
+@pytest.fixture
+def count_statements(app):
+    def count(fn, *args):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.remove()
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            result = fn(*args)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+        return result, len(statements)
+    return count
+
+
+def _report(monkeypatch):
+    from jobs import tasks
+    sent = []
+    monkeypatch.setattr(tasks, "send_html_email", lambda to, *args: sent.append(to) or True)
+    monkeypatch.setattr(tasks.send_monthly_activity_report, "update_state", lambda **kwargs: None)
+
+    def run():
+        sent.clear()
+        result = tasks.send_monthly_activity_report.run()
+        assert result["status"] == "SUCCESS", result
+        return len(sent)
+    return run
+
+
+def test_statement_count_does_not_grow_with_users(app, count_statements, monkeypatch):
+    month = app_today().strftime("%Y-%m")
+    report = _report(monkeypatch)
+
+    seed_dataset(users=10, subjects=2, chapters=1, quizzes=2, questions=2, attempts=3, answers=False, days=60)
+    small_rankings, small_ranking_count = count_statements(monthly_rankings, month)
+    small_sent, small_report_count = count_statements(report)
+
+    seed_dataset(users=990, subjects=2, chapters=1, quizzes=2, questions=2, attempts=3, answers=False, days=60, seed=2)
+    large_rankings, large_ranking_count = count_statements(monthly_rankings, month)
+    large_sent, large_report_count = count_statements(report)
+
+    assert len(small_rankings) < len(large_rankings) and small_sent < large_sent
+    assert small_ranking_count == large_ranking_count == 1
+    assert small_report_count == large_report_count
+
+
+def test_rankings_match_the_scores(app):
+    from models import QuizAttempt, Score
+    month = app_today().strftime("%Y-%m")
+    seed_dataset(users=25, subjects=2, chapters=1, quizzes=2, questions=3, attempts=4, answers=False, days=20)
+
+    expected = {}
+    for score, attempt in db.session.query(Score, QuizAttempt).join(QuizAttempt, Score.quiz_attempt_id == QuizAttempt.id):
+        if attempt.end_time.strftime("%Y-%m") == month:
+            expected.setdefault(attempt.user_id, []).append(score.total_score)
+
+    rankings = monthly_rankings(month)
+    assert set(rankings) == set(expected)
+    for user_id, scores in expected.items():
+        assert rankings[user_id]["attempts"] == len(scores)
+        assert rankings[user_id]["highest_score"] == max(scores)
+        assert rankings[user_id]["average_score"] == pytest.approx(sum(scores) / len(scores), abs=0.051)  # Rounded to 1 place
+    # RANK(): one more than the number of users with a strictly higher average
+    averages = [entry["average_score"] for entry in rankings.values()]
+    for entry in rankings.values():
+        assert entry["rank"] == 1 + sum(average > entry["average_score"] for average in averages)
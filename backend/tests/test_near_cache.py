@@ -0,0 +1,102 @@
+"""
+NearRedisCache: two instances sharing one (fake) Redis stand in for two
+worker processes. A write through either drops the other's local copy via
+pub/sub, and the local TTL bounds staleness when no message arrives.
+"""
+
+import time
+
+import pytest
+
+from services.near_cache import NearRedisCache
+
+CHANNEL = "test_invalidation"
+
+
+@pytest.fixture
+def server():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_cache(server):
+    import fakeredis
+
+    def make(**kwargs):
+        cache = NearRedisCache(host=fakeredis.FakeRedis(server=server), key_prefix="near:", channel=CHANNEL,
+                               **kwargs)
+        cache._ensure_listener()
+        return cache
+    return make
+
+
+def _eventually(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def caches(server, make_cache):
+    import fakeredis
+    first, second = make_cache(), make_cache()
+    client = fakeredis.FakeRedis(server=server)
+    assert _eventually(lambda: dict(client.pubsub_numsub(CHANNEL)).get(CHANNEL.encode()) == 2)
+    return first, second
+
+
+def _delivered(cache, count):
+    """Wait until `cache` has handled `count` invalidations from other instances."""
+    return _eventually(lambda: cache.stats()["invalidations"] == count)
+
+
+def test_write_in_one_process_drops_the_others_local_copy(caches):
+    first, second = caches
+    first.set("subjects", ["Maths"])
+    assert _delivered(second, 1)
+    assert second.get("subjects") == ["Maths"]
+    assert "subjects" in second._local
+
+    first.set("subjects", ["Maths", "Physics"])
+    assert _delivered(second, 2)
+    assert "subjects" not in second._local
+    assert second.get("subjects") == ["Maths", "Physics"]
+
+
+def test_delete_and_clear_are_broadcast(caches):
+    first, second = caches
+    first.set_many({"a": 1, "b": 2})
+    assert _delivered(second, 1)
+    assert second.get_many("a", "b") == [1, 2]
+
+    first.delete("a")
+    assert _delivered(second, 2)
+    assert "a" not in second._local and "b" in second._local
+    assert second.get("a") is None
+
+    first.clear()
+    assert _delivered(second, 3)
+    assert not second._local
+
+
+def test_own_writes_keep_the_local_copy(caches):
+    first, _ = caches
+    first.set("subjects", ["Maths"])
+    time.sleep(0.05)  # Let the listener see its own message
+    assert first.get("subjects") == ["Maths"]
+    assert first.stats()["local_hits"] == 1 and first.stats()["invalidations"] == 0
+
+
+def test_local_ttl_bounds_a_missed_invalidation(make_cache):
+    cache = make_cache(near_ttl=0.2)
+    cache.set("subjects", ["Maths"])
+    # Changed behind the cache's back, so no invalidation is published
+    cache._write_client.set("near:subjects", cache.serializer.dumps(["Physics"]))
+
+    assert cache.get("subjects") == ["Maths"]
+    time.sleep(0.25)
+    assert cache.get("subjects") == ["Physics"]
@@ -0,0 +1,108 @@
+"""
+Keyset pagination: following next_cursor visits every row exactly once,
+across gaps in the ids and rows inserted mid-walk, and bad cursors or
+limits are rejected.
+"""
+
+import pytest
+
+from benchmarks.seed import seed_dataset
+from extensions import db
+from models import QuizAttempt, User
+from services.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def attempts(app):
+    seeded = seed_dataset(users=2, subjects=1, chapters=1, quizzes=2, questions=2, attempts=60, answers=False)
+    user_id = seeded.user_ids[0]
+    ids = sorted(attempt_id for attempt_id in seeded.attempt_ids
+                 if QuizAttempt.query.get(attempt_id).user_id == user_id)
+    # Gaps: every third attempt and a whole run in the middle
+    removed = set(ids[::3]) | set(ids[20:30])
+    QuizAttempt.query.filter(QuizAttempt.id.in_(removed)).delete(synchronize_session=False)
+    db.session.commit()
+    return user_id, [attempt_id for attempt_id in ids if attempt_id not in removed]
+
+
+def _walk(client, url, headers, key="attempt_id"):
+    seen, pages, cursor = [], 0, None
+    while True:
+        page = client.get(url + (f"&after={cursor}" if cursor else ""), headers=headers)
+        assert page.status_code == 200, page.get_json()
+        body = page.get_json()
+        seen += [item[key] for item in body["items"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen, pages
+
+
+@pytest.mark.parametrize("limit", [1, 7, 13])
+def test_cursors_visit_every_attempt_once(client, make_user, attempts, limit):
+    user_id, remaining = attempts
+    _, admin = make_user("root@example.com", role="admin")
+
+    seen, pages = _walk(client, f"/admin/users/{user_id}/attempts?limit={limit}", admin)
+    assert seen == sorted(remaining, reverse=True)
+    assert pages == -(-len(remaining) // limit)  # No empty page after the last one
+
+
+def test_page_size_that_divides_the_rows_ends_without_an_empty_page(app, attempts):
+    user_id, remaining = attempts
+    query = QuizAttempt.query.filter_by(user_id=user_id)
+    rows, cursor = keyset_page(query, QuizAttempt.id, limit=len(remaining))
+    assert [row.id for row in rows] == remaining and cursor is None
+
+    rows, cursor = keyset_page(query, QuizAttempt.id, limit=len(remaining) - 1)
+    rows, cursor = keyset_page(query, QuizAttempt.id, after=decode_cursor(cursor), limit=len(remaining) - 1)
+    assert [row.id for row in rows] == remaining[-1:] and cursor is None
+
+
+def test_rows_inserted_mid_walk_do_not_repeat_or_hide_unseen_rows(client, make_user):
+    _, admin = make_user("root@example.com", role="admin")
+    for n in range(9):
+        make_user(f"user{n}@example.com")
+
+    first = client.get("/admin/users?limit=4", headers=admin).get_json()
+    make_user("late@example.com")  # Sorts after every existing user
+    db.session.delete(User.query.filter_by(email="user7@example.com").first())
+    db.session.commit()
+
+    seen = [user["email"] for user in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/admin/users?limit=4&after={cursor}", headers=admin).get_json()
+        seen += [user["email"] for user in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert len(seen) == len(set(seen))
+    # Every row that still exists, including the one added mid-walk; the deleted one was not reached yet
+    assert set(seen) == {user.email for user in User.query.all()}
+    assert "late@example.com" in seen and "user7@example.com" not in seen
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor("12"),  # Not an int
+    "WzEsIDJd",  # [1, 2]
+    "e30",  # {}
+])
+def test_bad_cursor_is_rejected(client, make_user, cursor):
+    _, admin = make_user("root@example.com", role="admin")
+    response = client.get(f"/admin/users?after={cursor}", headers=admin)
+    assert response.status_code == 400 and response.get_json()["error"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("limit, error", [("0", "limit must be positive"), ("ten", "limit must be an integer")])
+def test_bad_limit_is_rejected(client, make_user, limit, error):
+    _, admin = make_user("root@example.com", role="admin")
+    response = client.get(f"/admin/users?limit={limit}", headers=admin)
+    assert response.status_code == 400 and response.get_json()["error"] == error
+
+
+def test_limit_is_capped(client, make_user):
+    _, admin = make_user("root@example.com", role="admin")
+    seed_dataset(users=MAX_PAGE_SIZE + 5, subjects=1, chapters=1, quizzes=1, questions=1, attempts=0)
+    page = client.get("/admin/users?limit=100000", headers=admin).get_json()
+    assert len(page["items"]) == MAX_PAGE_SIZE and page["next_cursor"]
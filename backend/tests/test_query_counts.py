@@ -0,0 +1,63 @@
+"""
+Exact SQL statement counts for the budgeted list endpoints.
+
+Each endpoint is called against a small and a large seeded history; the
+count must match the @query_budget exactly and must not grow with the
+number of rows, so an N+1 (or a budget left slack) fails here.
+"""
+
+import pytest
+from flask import g
+
+from benchmarks.common import auth_headers
+from benchmarks.seed import seed_dataset
+from extensions import db
+from services.query_budget import BUDGETS
+
+
+def _count(client, url, headers):
+    """Issue a GET and return (json, statements the view issued)."""
+    db.session.remove()  # Nothing left in the identity map from seeding
+    g.last_query_count = None  # The test request reuses this app context, so the view leaves its count on g
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, (url, response.get_json())
+    return response.get_json(), g.last_query_count
+
+
+@pytest.fixture(params=[3, 60], ids=["3-attempts", "60-attempts"])
+def history(request, app, make_user):
+    app.config["QUERY_BUDGET_STRICT"] = True
+    seeded = seed_dataset(users=2, subjects=2, chapters=2, quizzes=2, questions=4, attempts=request.param)
+    _, admin = make_user("root@example.com", role="admin")
+    return seeded, admin
+
+
+def test_get_user_attempts(client, history):
+    seeded, admin = history
+    url = f"/admin/users/{seeded.user_ids[0]}/attempts?limit=20"
+
+    page, count = _count(client, url, admin)
+    assert count == BUDGETS["get_user_attempts"] == 2  # User, attempts + quizzes + scores
+    while page["next_cursor"]:
+        page, count = _count(client, f"{url}&after={page['next_cursor']}", admin)
+        assert count == 2
+
+
+def test_user_history(client, history):
+    seeded, _ = history
+    headers = auth_headers(seeded.user_ids[0])
+
+    page, count = _count(client, "/user/history?limit=20", headers)
+    assert count == BUDGETS["get_user_history_route"] == 2  # Attempts + scores, summary
+    assert page["summary"]["attempts"] == len(seeded.attempt_ids) // 2
+    while page["next_cursor"]:
+        page, count = _count(client, f"/user/history?limit=20&after={page['next_cursor']}", headers)
+        assert count == 1  # No summary after the first page
+
+
+@pytest.mark.parametrize("term", ["chapter", "1"])
+def test_search_quizzes(client, history, term):
+    _, admin = history
+    results, count = _count(client, f"/admin/search/quizzes?q={term}", admin)
+    assert results
+    assert count == BUDGETS["search_quizzes"] == 1  # Quizzes + chapters + subjects
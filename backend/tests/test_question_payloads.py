@@ -0,0 +1,53 @@
+"""
+Quiz start/poll responses carry only the questions' ETag; the questions
+themselves come from /questions and revalidate with If-None-Match.
+"""
+
+import pytest
+
+from benchmarks.seed import seed_dataset
+
+
+@pytest.fixture
+def quiz(app):
+    seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=5, attempts=0)
+    return seeded.quiz_ids[0], [question_id for question_id, _ in seeded.answer_key[seeded.quiz_ids[0]]]
+
+
+def test_start_and_poll_leave_out_the_questions(client, make_user, quiz):
+    quiz_id, _ = quiz
+    _, headers = make_user("taker@example.com")
+
+    started = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()
+    polled = client.get(f"/user/quiz/{quiz_id}", headers=headers).get_json()
+    questions = client.get(f"/user/quiz/{quiz_id}/questions", headers=headers)
+
+    assert "questions" not in started and "questions" not in polled
+    assert started["questions_etag"] == polled["questions_etag"]
+    assert questions.headers["ETag"] == f'"{polled["questions_etag"]}"'
+    assert len(questions.get_json()) == 5
+
+
+def test_questions_revalidate_until_a_question_changes(client, make_user, quiz):
+    quiz_id, question_ids = quiz
+    _, admin_headers = make_user("root@example.com", role="admin")
+    _, headers = make_user("taker@example.com")
+    etag = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["questions_etag"]
+
+    response = client.get(f"/user/quiz/{quiz_id}/questions", headers={**headers, "If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304 and response.data == b""
+
+    client.put(f"/admin/questions/{question_ids[0]}", json={"question_text": "Reworded?"}, headers=admin_headers)
+    polled = client.get(f"/user/quiz/{quiz_id}", headers=headers).get_json()
+    assert polled["questions_etag"] != etag
+
+    response = client.get(f"/user/quiz/{quiz_id}/questions", headers={**headers, "If-None-Match": f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{polled["questions_etag"]}"'
+    assert response.get_json()[0]["question"] == "Reworded?"
+
+
+def test_questions_need_an_active_attempt(client, make_user, quiz):
+    quiz_id, _ = quiz
+    _, headers = make_user("taker@example.com")
+    assert client.get(f"/user/quiz/{quiz_id}/questions", headers=headers).status_code == 400
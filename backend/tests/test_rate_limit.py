@@ -0,0 +1,116 @@
+"""Token-bucket rate limiting: responses, overrides, shared buckets and the in-process fallback."""
+
+import pytest
+
+from services.rate_limit import TOKEN_BUCKET_SCRIPT, LocalBuckets, RateLimiter
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+def _limiter_on(client):
+    limiter = RateLimiter()
+    limiter.client = client
+    limiter.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+    return limiter
+
+
+@pytest.fixture
+def redis_limiter(fake_redis):
+    pytest.importorskip("lupa")  # fakeredis runs the Lua script with lupa
+    return _limiter_on(fake_redis)
+
+
+@pytest.fixture
+def limited_app(app, redis_limiter):
+    app.config["RATE_LIMIT_ENABLED"] = True
+    app.extensions["rate_limit"] = redis_limiter
+    return app
+
+
+def _login(client, email, password="secret"):
+    return client.post("/login", json={"email": email, "password": password})
+
+
+def test_login_is_limited_per_email(limited_app, client, make_user):
+    make_user("alice@example.com")
+    make_user("bob@example.com")
+
+    for _ in range(5):
+        assert _login(client, "alice@example.com").status_code == 200
+    response = _login(client, "Alice@Example.com ")  # Same bucket after normalising
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 12  # One token of 5/minute
+
+    assert _login(client, "bob@example.com").status_code == 200
+
+
+def test_failed_logins_use_up_the_bucket(limited_app, client, make_user):
+    make_user("alice@example.com")
+    for _ in range(5):
+        assert _login(client, "alice@example.com", password="wrong").status_code == 401
+    assert _login(client, "alice@example.com").status_code == 429
+
+
+def test_overrides(limited_app, client, make_user):
+    make_user("alice@example.com")
+    limited_app.config["RATE_LIMITS"] = "login.identity=2/minute, login.ip=off"
+    assert [_login(client, "alice@example.com").status_code for _ in range(3)] == [200, 200, 429]
+
+    limited_app.config["RATE_LIMITS"] = "login.identity=off"
+    assert [_login(client, "alice@example.com").status_code for _ in range(3)] == [200, 200, 200]
+
+    # A lowered limit caps the tokens already in the bucket
+    limited_app.config["RATE_LIMITS"] = "login.identity=off,login.ip=1/hour"
+    assert _login(client, "alice@example.com").status_code == 200
+    response = _login(client, "alice@example.com")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 60
+
+
+def test_disabled(app, client, make_user):
+    make_user("alice@example.com")
+    assert all(_login(client, "alice@example.com").status_code == 200 for _ in range(10))
+
+
+@pytest.mark.parametrize("backend", ["redis", "local"])
+def test_take_is_all_or_none(app, backend, request):
+    limiter = request.getfixturevalue("redis_limiter") if backend == "redis" else RateLimiter()
+    per_second = 1 / 3600
+    narrow = ("bucket:narrow", 1, per_second)
+    wide = ("bucket:wide", 3, per_second)
+
+    assert limiter.take([narrow, wide]) == (True, 1)
+    allowed, retry_after = limiter.take([narrow, wide])
+    assert not allowed and retry_after > 3000
+
+    # The refused request took nothing from the bucket that still had tokens
+    assert limiter.take([wide])[0]
+    assert limiter.take([wide])[0]
+    assert not limiter.take([wide])[0]
+
+
+def test_buckets_are_shared_through_redis(app, fake_redis, redis_limiter):
+    other_worker = _limiter_on(fake_redis)
+    bucket = ("bucket:shared", 2, 1 / 3600)
+
+    assert redis_limiter.take([bucket])[0]
+    assert other_worker.take([bucket])[0]
+    assert not redis_limiter.take([bucket])[0]
+
+
+def test_falls_back_to_local_buckets_when_redis_is_unreachable(app, client, make_user):
+    make_user("alice@example.com")
+    limiter = RateLimiter(UNREACHABLE_REDIS)
+    app.config["RATE_LIMIT_ENABLED"] = True
+    app.extensions["rate_limit"] = limiter
+
+    assert [_login(client, "alice@example.com").status_code for _ in range(6)] == [200] * 5 + [429]
+    assert limiter._redis_down_until > 0  # Redis is skipped until the retry interval passes
+
+
+def test_local_buckets_evict_the_oldest():
+    buckets = LocalBuckets(max_buckets=2)
+    for key in ("a", "b", "c"):
+        assert buckets.take([(key, 1, 1e-9)], now_ms=0)[0]
+    assert buckets.take([("a", 1, 1e-9)], now_ms=0)[0]  # Forgotten, so full again
+    assert not buckets.take([("c", 1, 1e-9)], now_ms=0)[0]
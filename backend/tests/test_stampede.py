@@ -0,0 +1,137 @@
+"""cached_view rebuilds an entry once however many requests arrive together."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app import create_app
+from extensions import cache
+from routes import auth
+from services import stampede
+from services.stampede import _store, cached_view
+
+THREADS = 16
+KEY = "stampede_test_view"
+
+
+@pytest.fixture
+def redis_app(tmp_path, fake_redis):
+    """An app whose cache is Redis (fakeredis), so the rebuild lock is a real atomic add."""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "CACHE_TYPE": "RedisCache",
+        "CACHE_REDIS_HOST": fake_redis,
+    })
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def view():
+    calls = []
+    lock = threading.Lock()
+
+    @cached_view(timeout=60, key_prefix=KEY)
+    def slow_view():
+        with lock:
+            calls.append(1)
+            generation = len(calls)
+        time.sleep(0.3)  # Long enough for every thread to arrive mid-rebuild
+        return f"generation {generation}"
+
+    slow_view.calls = calls
+    return slow_view
+
+
+def _hammer(app, view):
+    barrier = threading.Barrier(THREADS)
+
+    def request():
+        with app.app_context():
+            barrier.wait()
+            return view()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(lambda _: request(), range(THREADS)))
+
+
+def test_cold_entry_is_computed_once(redis_app, view):
+    results = _hammer(redis_app, view)
+    assert len(view.calls) == 1
+    assert results == ["generation 1"] * THREADS
+
+
+def test_expired_entry_is_rebuilt_once_while_stale_copy_is_served(redis_app, view):
+    _store(KEY, "stale", 0.3, timeout=-1)  # Expired, but within STALE_SECONDS
+    results = _hammer(redis_app, view)
+    assert len(view.calls) == 1
+    assert set(results) <= {"stale", "generation 1"}
+    assert view() == "generation 1"
+
+
+def test_entry_near_expiry_is_refreshed_early_once(redis_app, view, monkeypatch):
+    _store(KEY, "old", 0.3, timeout=1)
+    monkeypatch.setattr(stampede.random, "random", lambda: 1e-6)  # Every request draws an early refresh
+    results = _hammer(redis_app, view)
+    assert len(view.calls) == 1
+    assert set(results) <= {"old", "generation 1"}
+
+
+def test_fresh_entry_is_served_without_recomputing(redis_app, view, monkeypatch):
+    _store(KEY, "current", 0.3, timeout=60)
+    monkeypatch.setattr(stampede.random, "random", lambda: 0.5)
+    assert _hammer(redis_app, view) == ["current"] * THREADS
+    assert view.calls == []
+
+
+def test_failed_rebuild_lets_a_waiter_compute(redis_app):
+    calls = []
+
+    @cached_view(timeout=60, key_prefix=KEY)
+    def failing_once():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            raise RuntimeError("rebuild failed")
+        return "recovered"
+
+    def request():
+        with redis_app.app_context():
+            try:
+                return failing_once()
+            except RuntimeError:
+                return "failed"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(request)
+        time.sleep(0.05)
+        second = pool.submit(request)
+        assert sorted([first.result(), second.result()]) == ["failed", "recovered"]
+    assert not cache.get(stampede._lock_key(KEY))
+
+
+@pytest.mark.parametrize("error", [({"error": "User not found"}, 404), ({"error": "Failed to list exports"}, 500)])
+def test_error_responses_are_not_cached(app, error):
+    results = [error, ({"ok": True}, 200)]
+
+    @cached_view(timeout=60, key_prefix=KEY)
+    def flaky_view():
+        return results.pop(0)
+
+    assert flaky_view() == error
+    assert cache.get(KEY) is None
+    assert flaky_view() == ({"ok": True}, 200)  # Recomputed, and this one is kept
+    assert flaky_view() == ({"ok": True}, 200)
+    assert results == []
+
+
+def test_not_found_user_is_not_cached(client, make_user, monkeypatch):
+    _, headers = make_user("alice@example.com")
+    monkeypatch.setattr(auth.User, "query", SimpleNamespace(get=lambda user_id: None))  # e.g. a lagging replica
+    assert client.get("/me", headers=headers).status_code == 404
+    monkeypatch.undo()
+    response = client.get("/me", headers=headers)
+    assert response.status_code == 200 and response.get_json()["email"] == "alice@example.com"
@@ -0,0 +1,123 @@
+"""
+Write-behind submissions: a drainer that dies part-way leaves the queue
+recoverable without changing a result it already reached, and the drain
+lock is only released by the drainer that holds it.
+"""
+
+import pytest
+
+from benchmarks.seed import seed_dataset
+from extensions import db
+from models import QuizAttempt
+from services import submission_queue
+from services.grading import add_score
+from services.submission_queue import LOCK_KEY, PROCESSING_KEY, drain_submissions, get_submission_status
+
+
+class DrainerDied(Exception):
+    pass
+
+
+@pytest.fixture
+def queue(app, fake_redis, monkeypatch):
+    from jobs import tasks
+    app.config["ASYNC_SUBMISSIONS"] = True
+    app.extensions["submission_queue"] = fake_redis
+    monkeypatch.setattr(tasks.drain_submission_queue, "delay", lambda: None)
+    return fake_redis
+
+
+@pytest.fixture
+def submit(client, make_user, queue):
+    seeded = seed_dataset(users=1, subjects=1, chapters=1, quizzes=1, questions=4, attempts=0)
+    quiz_id = seeded.quiz_ids[0]
+    correct = {str(question_id): option + 1 for question_id, option in seeded.answer_key[quiz_id]}
+
+    def submit(email):
+        _, headers = make_user(email)
+        attempt_id = client.post(f"/user/quiz/{quiz_id}/start", headers=headers).get_json()["attempt_id"]
+        response = client.post("/user/quiz/submit", json={"attempt_id": attempt_id, "answers": correct},
+                               headers=headers)
+        assert response.status_code == 202
+        return attempt_id, response.get_json()["submission_id"]
+    return submit
+
+
+def _die_after(monkeypatch, owner, name):
+    """Make owner.name do its work and then raise, like a worker killed right after it."""
+    original = getattr(owner, name)
+
+    def work_then_die(*args, **kwargs):
+        original(*args, **kwargs)
+        raise DrainerDied()
+    monkeypatch.setattr(owner, name, work_then_die)
+
+
+def test_drain_grades_queued_submissions(submit):
+    handles = [submit(f"taker{n}@example.com")[1] for n in range(3)]
+    assert drain_submissions() == 3
+    assert [get_submission_status(handle)["status"] for handle in handles] == ["GRADED"] * 3
+
+
+def test_redelivered_batch_keeps_its_reported_status(submit, monkeypatch, queue):
+    _, handle = submit("taker@example.com")
+    # Dies after writing statuses, before clearing the processing list
+    _die_after(monkeypatch, submission_queue, "invalidate")
+    with pytest.raises(DrainerDied):
+        drain_submissions()
+    assert queue.llen(PROCESSING_KEY) == 1
+    monkeypatch.undo()
+
+    drain_submissions()
+    status = get_submission_status(handle)
+    assert status["status"] == "GRADED" and status["score"] == 100
+    assert queue.llen(PROCESSING_KEY) == 0
+
+
+def test_redelivered_batch_rebuilds_an_unreported_result(submit, monkeypatch, queue):
+    attempt_id, handle = submit("taker@example.com")
+    # Dies after the commit, before any status is written
+    _die_after(monkeypatch, db.session, "commit")
+    with pytest.raises(DrainerDied):
+        drain_submissions()
+    monkeypatch.undo()
+    db.session.remove()
+    assert QuizAttempt.query.get(attempt_id).end_time is not None
+    assert get_submission_status(handle)["status"] == "QUEUED"
+
+    drain_submissions()
+    status = get_submission_status(handle)
+    assert status["status"] == "GRADED"
+    assert (status["score"], status["correct"], status["total"]) == (100, 4, 4)
+
+
+def test_submission_for_an_attempt_closed_elsewhere_is_rejected(submit):
+    attempt_id, handle = submit("taker@example.com")
+    attempt = QuizAttempt.query.get(attempt_id)
+    add_score(attempt, 0)  # e.g. closed by the expired-attempt sweeper
+    db.session.commit()
+
+    drain_submissions()
+    status = get_submission_status(handle)
+    assert status["status"] == "REJECTED" and status["error"] == "Quiz already submitted"
+
+
+def test_drainer_does_not_release_a_lock_it_lost(submit, monkeypatch, queue):
+    submit("taker@example.com")
+    original = submission_queue._grade_batch
+
+    def slow_batch(payloads):
+        # The lock expires mid-batch and another drainer takes it
+        queue.set(LOCK_KEY, "other-drainer")
+        return original(payloads)
+    monkeypatch.setattr(submission_queue, "_grade_batch", slow_batch)
+
+    assert drain_submissions() == 1
+    assert queue.get(LOCK_KEY) == b"other-drainer"
+
+
+def test_drain_releases_its_own_lock(submit, queue):
+    submit("taker@example.com")
+    drain_submissions()
+    assert queue.get(LOCK_KEY) is None
+    assert drain_submissions() == 0  # Nothing left, and the lock can be taken again
@@ -0,0 +1,125 @@
+"""Per-user cached responses (/me, /user/history) never leak across users."""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import pytest
+
+from extensions import db
+from models import Chapter, Quiz, QuizAttempt, Score, Subject, User
+from services import cache_tags
+from services.cache_tags import invalidate, user_tag
+
+
+@pytest.fixture(autouse=True)
+def same_generations(monkeypatch):
+    """Start every tag at the same generation, so entries are told apart by their key alone."""
+    later = count(2)
+    monkeypatch.setattr(cache_tags, "generations", _first_generations(cache_tags.generations))
+    monkeypatch.setattr(cache_tags, "_new_generation", lambda: next(later))
+
+
+def _first_generations(generations):
+    def wrapper(*tags):
+        for tag in tags:
+            cache_tags.cache.add(cache_tags._generation_key(tag), 1, timeout=0)
+        return generations(*tags)
+    return wrapper
+
+
+def _quiz():
+    subject = Subject(name="Maths")
+    db.session.add(subject)
+    db.session.flush()
+    chapter = Chapter(subject_id=subject.id, name="Algebra")
+    db.session.add(chapter)
+    db.session.flush()
+    quiz = Quiz(chapter_id=chapter.id, time_duration=10)
+    db.session.add(quiz)
+    db.session.commit()
+    return quiz.id
+
+
+def _attempt(user_id, quiz_id, score):
+    attempt = QuizAttempt(user_id=user_id, quiz_id=quiz_id)
+    db.session.add(attempt)
+    db.session.flush()
+    db.session.add(Score(quiz_attempt_id=attempt.id, user_id=user_id, total_score=score))
+    db.session.commit()
+
+
+def test_me_is_cached_per_user(client, make_user):
+    alice, alice_headers = make_user("alice@example.com", full_name="Alice")
+    bob, bob_headers = make_user("bob@example.com", full_name="Bob")
+    admin, admin_headers = make_user("root@example.com", full_name="Root", role="admin")
+
+    for _ in range(2):  # The second round is served from the cache
+        assert client.get("/me", headers=alice_headers).get_json()["id"] == alice
+        assert client.get("/me", headers=bob_headers).get_json()["id"] == bob
+        me = client.get("/me", headers=admin_headers).get_json()
+        assert (me["id"], me["role"]) == (admin, "admin")
+
+
+def test_history_is_cached_per_user(client, make_user):
+    alice, alice_headers = make_user("alice@example.com")
+    bob, bob_headers = make_user("bob@example.com")
+    quiz_id = _quiz()
+    _attempt(alice, quiz_id, 80)
+    _attempt(alice, quiz_id, 40)
+
+    for _ in range(2):
+        history = client.get("/user/history", headers=alice_headers).get_json()
+        assert [item["score"] for item in history["items"]] == [40, 80]
+        assert history["summary"] == {"attempts": 2, "average_score": 60, "highest_score": 80}
+
+        history = client.get("/user/history", headers=bob_headers).get_json()
+        assert history["items"] == []
+        assert history["summary"]["attempts"] == 0
+
+    # The query string is part of the key
+    page = client.get("/user/history?limit=1", headers=alice_headers).get_json()
+    assert len(page["items"]) == 1 and page["next_cursor"]
+
+
+def test_concurrent_requests_stay_isolated(app, make_user):
+    users = [make_user(f"user{i}@example.com", full_name=f"User {i}") for i in range(6)]
+
+    def fetch(user):
+        user_id, headers = user
+        with app.test_client() as client:
+            return user_id, [client.get("/me", headers=headers).get_json()["id"] for _ in range(5)]
+
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        for user_id, seen in pool.map(fetch, users * 3):
+            assert seen == [user_id] * 5
+
+
+def test_profile_update_invalidates_only_that_user(client, make_user):
+    alice, alice_headers = make_user("alice@example.com", full_name="Alice")
+    bob, bob_headers = make_user("bob@example.com", full_name="Bob")
+    client.get("/me", headers=alice_headers)
+    client.get("/me", headers=bob_headers)
+
+    # A direct write without invalidation keeps serving the cached copy
+    User.query.get(bob).full_name = "Robert"
+    db.session.commit()
+
+    response = client.put("/profile", json={"full_name": "Alice Smith"}, headers=alice_headers)
+    assert response.status_code == 200
+    assert client.get("/me", headers=alice_headers).get_json()["full_name"] == "Alice Smith"
+    assert client.get("/me", headers=bob_headers).get_json()["full_name"] == "Bob"
+
+
+def test_user_tag_invalidation_refreshes_history(client, make_user):
+    alice, alice_headers = make_user("alice@example.com")
+    quiz_id = _quiz()
+    _attempt(alice, quiz_id, 50)
+    assert len(client.get("/user/history", headers=alice_headers).get_json()["items"]) == 1
+
+    _attempt(alice, quiz_id, 70)
+    assert len(client.get("/user/history", headers=alice_headers).get_json()["items"]) == 1
+
+    invalidate(user_tag(alice))
+    history = client.get("/user/history", headers=alice_headers).get_json()
+    assert [item["score"] for item in history["items"]] == [70, 50]
+    assert history["summary"]["highest_score"] == 70